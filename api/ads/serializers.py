@@ -1,6 +1,8 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
 
 from apps.ads.models import Ad
+from apps.ads.services import AdService, ProposalCounterService
 
 
 class UserSerializer(serializers.Serializer):
@@ -39,15 +41,21 @@ class AdSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
     def get_received_proposals_count(self, obj):
-        return obj.received_proposals.count()
+        return ProposalCounterService.get_counts(obj)['received']
 
     def get_sent_proposals_count(self, obj):
-        return obj.sent_proposals.count()
+        return ProposalCounterService.get_counts(obj)['sent']
 
     def create(self, validated_data):
         # Устанавливаем текущего пользователя как владельца
         request = self.context.get('request')
         if (request and hasattr(request, 'user') and
                 request.user.is_authenticated):
-            validated_data['user'] = request.user
+            # Через сервис: квота объявлений и статистика пользователя
+            try:
+                return AdService.create_ad(
+                    user=request.user, **validated_data
+                )
+            except DjangoValidationError as e:
+                raise serializers.ValidationError(e.messages)
         return super().create(validated_data)
@@ -1,15 +1,31 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django_filters.rest_framework import DjangoFilterBackend
-from drf_spectacular.utils import extend_schema, extend_schema_view
-from rest_framework import filters, permissions
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import (OpenApiParameter, extend_schema,
+                                   extend_schema_view)
+from rest_framework import permissions
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.viewsets import ModelViewSet
 
-from apps.ads.filters import AdFilter
-from apps.ads.models import Ad
+from apps.ads.filters import AdFilter, RelevanceOrderingFilter
+from apps.ads.models import Ad, ExchangeProposal
+from apps.ads.pagination import KeysetPaginator
+from apps.ads.services import (AdService, ExchangeProposalService,
+                               ProposalCounterService)
+from apps.ads.surrogate import ad_detail_keys, ad_list_keys
 
+from ..fragments import FragmentCache
+from ..mixins import (BATCH_PARAMETERS, BatchRetrieveMixin,
+                      ConditionalListMixin, SparseFieldsMixin,
+                      SuggestionMixin, SurrogateKeyMixin, ValuesListMixin)
+from ..pagination import KeysetPagination
+from ..projection import ValuesSerializer
+from ..sparse import SPARSE_PARAMETERS
 from .serializers import AdListSerializer, AdSerializer
 
 
@@ -23,7 +39,7 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
         # Редактирование только для владельца
-        return obj.user == request.user
+        return obj.user_id == request.user.id
 
 
 @extend_schema_view(
@@ -32,7 +48,8 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
         description=(
             "Возвращает список всех объявлений с возможностью фильтрации"
         ),
-        tags=['Объявления']
+        tags=['Объявления'],
+        parameters=SPARSE_PARAMETERS + BATCH_PARAMETERS
     ),
     create=extend_schema(
         summary="Создать объявление",
@@ -42,7 +59,8 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
     retrieve=extend_schema(
         summary="Получить объявление",
         description="Возвращает детальную информацию об объявлении",
-        tags=['Объявления']
+        tags=['Объявления'],
+        parameters=SPARSE_PARAMETERS
     ),
     update=extend_schema(
         summary="Обновить объявление",
@@ -60,22 +78,40 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
         tags=['Объявления']
     )
 )
-class AdViewSet(ModelViewSet):
+class AdViewSet(SurrogateKeyMixin, ConditionalListMixin, SuggestionMixin,
+                BatchRetrieveMixin, SparseFieldsMixin, ValuesListMixin,
+                ModelViewSet):
     """
     ViewSet для объявлений с полным CRUD функционалом
     """
     queryset = Ad.objects.select_related('user').order_by('-created_at')
     permission_classes = [IsOwnerOrReadOnly]
     authentication_classes = [TokenAuthentication]
+    # Параметр search обрабатывается AdFilter через полнотекстовый индекс
     filter_backends = [
         DjangoFilterBackend,
-        filters.SearchFilter,
-        filters.OrderingFilter
+        RelevanceOrderingFilter
     ]
     filterset_class = AdFilter
-    search_fields = ['title', 'description']
     ordering_fields = ['created_at', 'title']
     ordering = ['-created_at']
+    suggestion_params = ('search', 'fuzzy')
+    suggestion_field = 'title'
+    # Общее количество в ответе списка (см. api.pagination)
+    count_strategy = 'cached'
+    # Список строится по values() без экземпляров моделей
+    list_projection = ValuesSerializer(AdListSerializer)
+    # Представления объявлений кэшируются по id и updated_at
+    fragment_cache = FragmentCache(owner_field='user_id')
+    # Счетчики предложений загружаются, только если запрошены (?fields=)
+    sparse_prefetch = {
+        'received_proposals_count': 'proposal_counters',
+        'sent_proposals_count': 'proposal_counters',
+    }
+
+    def get_suggestion_queryset(self):
+        # Заголовки всех объявлений: выборка берется из кэша запросов
+        return Ad.objects.cached()
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -85,6 +121,9 @@ class AdViewSet(ModelViewSet):
     def get_queryset(self):
         """Фильтрация объявлений"""
         queryset = super().get_queryset()
+        if self.action != 'list':
+            # Счетчики предложений для AdSerializer одним запросом
+            queryset = queryset.prefetch_related('proposal_counters')
 
         # Дополнительные фильтры
         category = self.request.query_params.get('category')
@@ -100,6 +139,32 @@ class AdViewSet(ModelViewSet):
 
         return queryset
 
+    def get_surrogate_keys(self):
+        if self.batch:
+            return ad_list_keys(self.get_batch_ids())
+        if self.action == 'retrieve':
+            return ad_detail_keys(self.kwargs['pk'])
+        if self.action == 'list':
+            params = self.request.query_params
+            return ad_list_keys(
+                self.page_ids(), params.get('category'), params.get('search')
+            )
+        return None
+
+    def perform_update(self, serializer):
+        # Через сервис: очистка кэша прокси (apps/ads/surrogate.py)
+        try:
+            serializer.instance = AdService.update_ad(
+                serializer.instance, self.request.user,
+                **serializer.validated_data
+            )
+        except DjangoValidationError as e:
+            raise ValidationError(e.messages)
+
+    def perform_destroy(self, instance):
+        # Через сервис, чтобы обновить счетчики второй стороны предложений
+        AdService.delete_ad(instance, self.request.user)
+
     def get_permissions(self):
         """Настройка разрешений для разных действий"""
         if self.action in ['create']:
@@ -113,28 +178,81 @@ class AdViewSet(ModelViewSet):
     @extend_schema(
         summary="Получить предложения для объявления",
         description=(
-            "Возвращает все предложения обмена связанные с данным объявлением"
+            "Возвращает предложения обмена объявления. С параметром "
+            "direction - курсорная пагинация по одному направлению, без "
+            "него - первые страницы обоих направлений и ссылки на "
+            "следующие. counts_only=true возвращает только количество "
+            "по направлениям и статусам"
         ),
         tags=['Объявления'],
+        parameters=[
+            OpenApiParameter(
+                'direction', OpenApiTypes.STR, enum=['received', 'sent']
+            ),
+            OpenApiParameter(
+                'status', OpenApiTypes.STR,
+                enum=[value for value, _ in ExchangeProposal.STATUS_CHOICES]
+            ),
+            OpenApiParameter('counts_only', OpenApiTypes.BOOL),
+            OpenApiParameter('cursor', OpenApiTypes.STR),
+            OpenApiParameter('page_size', OpenApiTypes.INT),
+        ],
     )
     @action(detail=True, methods=['get'])
     def proposals(self, request, pk=None):
-        """Получить все предложения для объявления"""
+        """Получить предложения для объявления (по страницам)"""
         from api.proposals.serializers import ExchangeProposalSerializer
 
         ad = self.get_object()
-        received_proposals = ad.received_proposals.select_related(
-            'ad_sender__user', 'ad_receiver__user'
-        )
-        sent_proposals = ad.sent_proposals.select_related(
-            'ad_sender__user', 'ad_receiver__user'
-        )
-
-        return Response({
-            'received_proposals': ExchangeProposalSerializer(
-                received_proposals, many=True, context={'request': request}
-            ).data,
-            'sent_proposals': ExchangeProposalSerializer(
-                sent_proposals, many=True, context={'request': request}
+        params = request.query_params
+        direction = params.get('direction')
+        status_filter = params.get('status') or None
+        if ((direction and
+                direction not in ProposalCounterService.DIRECTIONS) or
+                (status_filter and
+                 status_filter not in dict(ExchangeProposal.STATUS_CHOICES))):
+            raise ValidationError('Неверный параметр direction или status')
+
+        # Количество берется из счетчиков объявления, без COUNT
+        counts = ProposalCounterService.get_status_counts(ad)
+        if params.get('counts_only', '').lower() in ('1', 'true'):
+            return Response({'counts': counts})
+
+        def serialize(proposals):
+            return ExchangeProposalSerializer(
+                proposals, many=True, context={'request': request}
             ).data
-        })
+
+        # Отдельный пагинатор: общее количество здесь не нужно
+        paginator = KeysetPagination()
+        if direction:
+            page = paginator.paginate_queryset(
+                ExchangeProposalService.ad_proposals(
+                    ad, direction, status_filter
+                ),
+                request
+            )
+            response = paginator.get_paginated_response(serialize(page))
+            response.data['counts'] = counts[direction]
+            return response
+
+        data = {}
+        url = request.build_absolute_uri()
+        page_size = paginator.get_page_size(request)
+        for direction in ProposalCounterService.DIRECTIONS:
+            page = KeysetPaginator(
+                ExchangeProposalService.ad_proposals(
+                    ad, direction, status_filter
+                ),
+                page_size
+            ).page()
+            next_link = None
+            if page.next_cursor:
+                next_link = replace_query_param(
+                    replace_query_param(url, 'direction', direction),
+                    paginator.cursor_query_param, page.next_cursor
+                )
+            data[f'{direction}_proposals'] = serialize(page)
+            data[f'{direction}_next'] = next_link
+        data['counts'] = counts
+        return Response(data)
@@ -2,6 +2,8 @@ from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
 from rest_framework import serializers
 
+from apps.users.services import UserStatsService
+
 
 class LoginSerializer(serializers.Serializer):
     """Сериализатор для авторизации"""
@@ -57,4 +59,4 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'username', 'date_joined', 'ads_count']
 
     def get_ads_count(self, obj):
-        return obj.ads.count()
+        return UserStatsService.get_stats(obj).ads_count
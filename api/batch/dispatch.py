@@ -0,0 +1,163 @@
+"""
+Выполнение подзапросов пакетного эндпоинта /api/batch/.
+
+Подзапрос вызывает представление API напрямую, без HTTP и middleware,
+с пользователем и токеном родительского запроса (повторной
+аутентификации нет). Подряд идущие запросы на чтение (GET, HEAD)
+выполняются параллельно в общем ограниченном пуле потоков, запросы на
+изменение - последовательно, в порядке списка.
+"""
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import orjson
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.http import Http404
+from django.urls import Resolver404, resolve
+from django.utils import translation
+from rest_framework.exceptions import APIException, NotFound
+
+logger = logging.getLogger(__name__)
+
+READ_METHODS = ('GET', 'HEAD')
+
+# Ключи META родительского запроса, которые нужны подзапросу
+_COPIED_META = (
+    'SERVER_NAME', 'SERVER_PORT', 'SERVER_PROTOCOL', 'REMOTE_ADDR',
+    'SCRIPT_NAME', 'wsgi.url_scheme', 'wsgi.version', 'wsgi.errors',
+    'wsgi.multithread', 'wsgi.multiprocess', 'wsgi.run_once',
+)
+
+# Условные заголовки относятся к ответу пакета, а не к подзапросам
+_DROPPED_META = (
+    'HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE', 'HTTP_IF_MATCH',
+    'HTTP_IF_UNMODIFIED_SINCE',
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Общий для всех пакетов пул потоков (API_BATCH_MAX_WORKERS)"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.API_BATCH_MAX_WORKERS,
+                thread_name_prefix='api-batch'
+            )
+    return _executor
+
+
+def build_request(parent, method, path, body=None):
+    """WSGIRequest подзапроса с пользователем родительского запроса"""
+    url = urlsplit(path)
+    payload = orjson.dumps(body) if body is not None else b''
+    environ = {
+        key: value for key, value in parent.META.items()
+        if (key.startswith('HTTP_') and key not in _DROPPED_META or
+            key in _COPIED_META)
+    }
+    environ.update({
+        'REQUEST_METHOD': method,
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(payload)),
+        'wsgi.input': io.BytesIO(payload),
+    })
+    request = WSGIRequest(environ)
+    # rest_framework.request.Request подставляет ForcedAuthentication
+    request._force_auth_user = parent.user
+    request._force_auth_token = parent.auth
+    return request
+
+
+def resolve_api_view(path):
+    """Представление API для пути или None"""
+    try:
+        match = resolve(urlsplit(path).path)
+    except Resolver404:
+        return None
+    # Только API и без вложенных пакетов
+    if match.namespaces[:1] != ['api'] or match.url_name == 'batch':
+        return None
+    return match
+
+
+def dispatch(parent, item):
+    """Выполняет подзапрос, возвращает {"status": ..., "body": ...}"""
+    method = item['method']
+    path = item['path']
+    match = resolve_api_view(path)
+    if match is None:
+        return {'status': 404, 'body': {'detail': NotFound().detail}}
+
+    request = build_request(parent, method, path, item.get('body'))
+    try:
+        response = match.func(request, *match.args, **match.kwargs)
+    except Http404:
+        return {'status': 404, 'body': {'detail': NotFound().detail}}
+    except Exception:
+        logger.exception(f'Batch sub-request {method} {path} failed')
+        return {'status': 500, 'body': {'detail': APIException().detail}}
+
+    if hasattr(response, 'data'):
+        body = response.data
+    elif response.content:
+        body = response.content.decode(response.charset or 'utf-8')
+    else:
+        body = None
+    return {'status': response.status_code, 'body': body}
+
+
+def _dispatch_in_thread(parent, item, language):
+    # Язык и соединения с БД привязаны к потоку
+    translation.activate(language)
+    try:
+        return dispatch(parent, item)
+    finally:
+        translation.deactivate()
+        connections.close_all()
+
+
+def run_batch(parent, items):
+    """
+    Выполняет подзапросы и возвращает ответы в порядке items.
+    Группа подряд идущих чтений выполняется параллельно, изменение
+    дожидается завершения предыдущих подзапросов.
+    """
+    results = [None] * len(items)
+    parallel = settings.API_BATCH_MAX_WORKERS > 1
+    language = translation.get_language()
+
+    def flush(reads):
+        if len(reads) > 1 and parallel:
+            futures = [
+                (index, get_executor().submit(
+                    _dispatch_in_thread, parent, item, language
+                ))
+                for index, item in reads
+            ]
+            for index, future in futures:
+                results[index] = future.result()
+        else:
+            for index, item in reads:
+                results[index] = dispatch(parent, item)
+        reads.clear()
+
+    reads = []
+    for index, item in enumerate(items):
+        if item['method'] in READ_METHODS:
+            reads.append((index, item))
+            continue
+        flush(reads)
+        results[index] = dispatch(parent, item)
+    flush(reads)
+    return results
@@ -0,0 +1,37 @@
+from django.conf import settings
+from rest_framework import serializers
+
+
+class BatchItemSerializer(serializers.Serializer):
+    """Подзапрос пакета"""
+    method = serializers.ChoiceField(
+        choices=['GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE']
+    )
+    path = serializers.RegexField(
+        r'^/api/', max_length=2000,
+        help_text='Путь API со строкой запроса, например /api/ads/?page_size=5'
+    )
+    body = serializers.JSONField(required=False)
+
+
+class BatchRequestSerializer(serializers.Serializer):
+    """Пакет подзапросов"""
+    requests = BatchItemSerializer(many=True, allow_empty=False)
+
+    def validate_requests(self, value):
+        if len(value) > settings.API_BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(
+                f'Не более {settings.API_BATCH_MAX_REQUESTS} подзапросов'
+            )
+        return value
+
+
+class BatchItemResponseSerializer(serializers.Serializer):
+    """Ответ на подзапрос"""
+    status = serializers.IntegerField()
+    body = serializers.JSONField(allow_null=True)
+
+
+class BatchResponseSerializer(serializers.Serializer):
+    """Ответы в порядке подзапросов"""
+    responses = BatchItemResponseSerializer(many=True)
@@ -0,0 +1,39 @@
+from drf_spectacular.utils import extend_schema
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.generics import GenericAPIView
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from .dispatch import run_batch
+from .serializers import BatchRequestSerializer, BatchResponseSerializer
+
+
+class BatchView(GenericAPIView):
+    """
+    Пакетный API: несколько запросов к API за один HTTP запрос
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = [TokenAuthentication]
+    serializer_class = BatchRequestSerializer
+
+    @extend_schema(
+        summary="Пакет запросов",
+        description=(
+            "Выполняет список подзапросов к API с аутентификацией "
+            "текущего запроса. Запросы на чтение выполняются параллельно, "
+            "у каждого ответа свой статус. Права проверяются "
+            "представлением каждого подзапроса"
+        ),
+        tags=['Пакетные запросы'],
+        request=BatchRequestSerializer,
+        responses={200: BatchResponseSerializer}
+    )
+    def post(self, request):
+        """Выполнить пакет подзапросов"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response({
+            'responses': run_batch(
+                request, serializer.validated_data['requests']
+            )
+        })
@@ -0,0 +1,99 @@
+"""
+Кэш представлений объектов для списков API.
+
+Представление объекта (словарь, который затем выводит рендерер)
+кэшируется по ключу (id, updated_at, сериализатор, язык). Список
+строится так: запрос страницы выбирает только id, updated_at и поля
+сортировки, представления берутся из кэша одним get_many, а промахи
+сериализуются одним запросом через ValuesSerializer и записываются
+set_many. Изменение объекта меняет updated_at, поэтому устаревшие ключи
+просто перестают использоваться и истекают по таймауту. Если задано
+owner_field, ключ включает и версию данных владельца строки
+(owner_scope в apps/ads/cache.py): переименование пользователя сбрасывает
+только представления его объектов.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import translation
+
+from apps.ads.cache import get_versions, owner_scope
+
+
+class FragmentCache:
+    """Представления строк ValuesSerializer с кэшированием по версии"""
+    key_prefix = 'api:fragment'
+
+    def __init__(self, version_field='updated_at', owner_field=None):
+        self.version_field = version_field
+        self.owner_field = owner_field
+
+    def columns(self, queryset) -> list:
+        """Колонки страницы: первичный ключ, версия и владелец"""
+        columns = [queryset.model._meta.pk.name, self.version_field]
+        if self.owner_field:
+            columns.append(self.owner_field)
+        return columns
+
+    def _key_prefix(self, projection):
+        # Набор колонок однозначно задает поля ответа
+        serializer_class = projection.serializer_class
+        variant = hashlib.md5(
+            f'{serializer_class.__module__}.{serializer_class.__qualname__}:'
+            f'{",".join(projection.columns)}'.encode()
+        ).hexdigest()
+        return f'{self.key_prefix}:{variant}:{translation.get_language()}'
+
+    def _owner_versions(self, rows) -> dict:
+        if not self.owner_field:
+            return {}
+        return get_versions(
+            {owner_scope(row[self.owner_field]) for row in rows}
+        )
+
+    def _key(self, prefix, row, pk_name, owners):
+        key = f'{prefix}:{row[pk_name]}:{row[self.version_field].isoformat()}'
+        if self.owner_field:
+            key += f':{owners[owner_scope(row[self.owner_field])]}'
+        return key
+
+    def render(self, projection, rows, source) -> list:
+        """
+        Представления для строк страницы rows в их порядке. source -
+        queryset, из которого сериализуются промахи кэша.
+        """
+        pk_name = source.model._meta.pk.name
+        prefix = self._key_prefix(projection)
+        owners = self._owner_versions(rows)
+        keys = [self._key(prefix, row, pk_name, owners) for row in rows]
+        fragments = cache.get_many(keys)
+
+        missing = [
+            row[pk_name] for row, key in zip(rows, keys)
+            if key not in fragments
+        ]
+        fresh = {}
+        if missing:
+            values = list(projection.values(
+                source.filter(pk__in=missing).order_by(),
+                extra=self.columns(source)
+            ))
+            # Владелец мог смениться после выборки страницы
+            owners.update(self._owner_versions(values))
+            to_cache = {}
+            for row, data in zip(values,
+                                 projection.to_representation(values)):
+                fresh[row[pk_name]] = data
+                to_cache[self._key(prefix, row, pk_name, owners)] = data
+            cache.set_many(
+                to_cache, timeout=settings.API_FRAGMENT_CACHE_TIMEOUT
+            )
+
+        result = []
+        for row, key in zip(rows, keys):
+            data = fragments.get(key) or fresh.get(row[pk_name])
+            # Объект мог быть удален между запросами
+            if data is not None:
+                result.append(data)
+        return result
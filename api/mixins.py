@@ -0,0 +1,294 @@
+"""
+Общие миксины для ViewSet'ов API
+"""
+from django.core.exceptions import ImproperlyConfigured
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from apps.ads.conditional import list_validators, not_modified, set_validators
+from apps.ads.pagination import get_keyset_ordering
+from apps.ads.search import suggest
+from apps.ads.surrogate import set_surrogate_keys
+
+from .sparse import (EXPAND_PARAM, FIELDS_PARAM, get_sparse_projection,
+                     parse_list, shape_fields, shape_queryset)
+
+
+class ConditionalListMixin:
+    """
+    Условный GET для действия list (см. apps/ads/conditional.py): ETag и
+    Last-Modified по версиям областей кэша conditional_models (по
+    умолчанию - модель queryset), ответ 304 без запросов к таблицам.
+    Ставится первым из миксинов list.
+    """
+    conditional_models = None
+
+    def get_conditional_models(self):
+        return self.conditional_models or (self.queryset.model,)
+
+    def list(self, request, *args, **kwargs):
+        if getattr(self, 'batch', False):
+            return super().list(request, *args, **kwargs)
+
+        etag, last_modified = list_validators(
+            request, self.get_conditional_models()
+        )
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            set_validators(response, etag, last_modified)
+        return response
+
+
+class SurrogateKeyMixin:
+    """
+    Заголовки кэширования для обратного прокси (apps/ads/surrogate.py):
+    успешные ответы на чтение помечаются тегами get_surrogate_keys()
+    """
+
+    def get_surrogate_keys(self):
+        """Теги ответа или None, если ответ не кэшируется прокси"""
+        return None
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if request.method in SAFE_METHODS and response.status_code == 200:
+            keys = self.get_surrogate_keys()
+            if keys is not None:
+                set_surrogate_keys(response, request, keys)
+        return response
+
+    def page_ids(self):
+        """Первичные ключи строк текущей страницы списка"""
+        page = getattr(self.paginator, 'page', None) or ()
+        return [
+            row['id'] if isinstance(row, dict) else row.pk for row in page
+        ]
+
+
+class SuggestionMixin:
+    """
+    Добавляет в пустой ответ поиска подсказку "возможно, вы имели в виду"
+    (ключ suggestion рядом с results): наиболее похожее на запрос значение
+    поля suggestion_field.
+    """
+    suggestion_params = ('search',)
+    suggestion_field = None
+
+    def get_suggestion_queryset(self):
+        return self.get_queryset()
+
+    def get_suggestion(self, query):
+        if self.suggestion_field is None:
+            raise ImproperlyConfigured(
+                f'{type(self).__name__} must define suggestion_field'
+            )
+        return suggest(
+            self.get_suggestion_queryset(), self.suggestion_field, query
+        )
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        data = response.data
+        if not isinstance(data, dict) or data.get('results'):
+            return response
+
+        for param in self.suggestion_params:
+            query = request.query_params.get(param)
+            if query:
+                data['suggestion'] = self.get_suggestion(query)
+                break
+        return response
+
+
+class ValuesListMixin:
+    """
+    Действие list через ValuesSerializer (см. api/projection.py): строки
+    выбираются queryset.values() без создания экземпляров моделей и
+    ModelSerializer. Ответ совпадает с ответом обычного list.
+
+    Если задан fragment_cache (api/fragments.py), запрос страницы
+    выбирает только ключи и версии, а представления строк берутся из
+    кэша; сериализуются только промахи.
+    """
+    list_projection = None
+    fragment_cache = None
+
+    def get_list_projection(self):
+        return self.list_projection
+
+    def get_count_queryset(self, queryset):
+        """Подсчет по выборке без JOIN'ов проекции"""
+        return getattr(self, '_count_queryset', queryset)
+
+    def list(self, request, *args, **kwargs):
+        projection = self.get_list_projection()
+        if projection is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        self._count_queryset = queryset
+        # Поля сортировки нужны пагинатору для курсора
+        ordering = [
+            name.lstrip('-') for name in get_keyset_ordering(queryset)
+        ]
+        fragments = self.fragment_cache
+        if fragments is None:
+            rows = projection.values(queryset, extra=ordering)
+        else:
+            rows = queryset.values(*dict.fromkeys(
+                fragments.columns(queryset) + ordering
+            ))
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(
+                self.represent_rows(projection, page, queryset)
+            )
+        return Response(self.represent_rows(projection, rows, queryset))
+
+    def represent_rows(self, projection, rows, queryset):
+        if self.fragment_cache is None:
+            return projection.to_representation(rows)
+        return self.fragment_cache.render(
+            projection, list(rows), queryset.model._default_manager.all()
+        )
+
+
+class SparseFieldsMixin:
+    """
+    Параметры ?fields= и ?expand= (см. api/sparse.py) для действий из
+    sparse_actions: по ним строятся и набор полей сериализатора, и запрос.
+    sparse_prefetch - {вычисляемое поле: lookup для prefetch_related}.
+    Ставится перед ValuesListMixin.
+    """
+    sparse_actions = ('list', 'retrieve')
+    sparse_prefetch = {}
+
+    def get_sparse_params(self):
+        """(fields, expand) или None, если параметры не переданы"""
+        if self.action not in self.sparse_actions:
+            return None
+        params = self.request.query_params
+        fields = parse_list(params.get(FIELDS_PARAM))
+        expand = parse_list(params.get(EXPAND_PARAM))
+        if fields is None and expand is None:
+            return None
+        return fields, expand
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        params = self.get_sparse_params()
+        if params is not None:
+            shape_fields(getattr(serializer, 'child', serializer), *params)
+        return serializer
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        params = self.get_sparse_params()
+        if params is None:
+            return queryset
+
+        serializer = shape_fields(self.get_serializer_class()(), *params)
+        # Поля сортировки читает пагинатор: без них only() дал бы
+        # дополнительный запрос на каждую строку
+        annotations = queryset.query.annotations
+        ordering = [
+            name.lstrip('-') for name in get_keyset_ordering(queryset)
+            if name.lstrip('-') not in annotations
+        ]
+        return shape_queryset(
+            queryset, serializer, self.sparse_prefetch, extra=ordering
+        )
+
+    def get_list_projection(self):
+        projection = super().get_list_projection()
+        params = self.get_sparse_params()
+        if projection is None or params is None:
+            return projection
+        return get_sparse_projection(projection.serializer_class, *params)
+
+
+BATCH_PARAMETERS = [
+    OpenApiParameter(
+        'ids', OpenApiTypes.STR,
+        description=(
+            'Идентификаторы через запятую: объекты как в детальном ответе, '
+            'в порядке запроса, и список missing ненайденных'
+        )
+    ),
+]
+
+
+class BatchRetrieveMixin:
+    """
+    Пакетное получение объектов: GET список?ids=1,2,3.
+
+    Запрос обрабатывается как несколько retrieve одним запросом IN:
+    тот же queryset, сериализатор и проверки доступа к объекту. Ответ -
+    {"results": [...], "missing": [...]}: объекты в порядке ids и
+    идентификаторы, которые не найдены или недоступны пользователю.
+    Ставится первым из миксинов list.
+    """
+    batch_param = 'ids'
+    batch_max_size = 100
+    batch = False
+
+    def initialize_request(self, request, *args, **kwargs):
+        request = super().initialize_request(request, *args, **kwargs)
+        # retrieve определяет queryset, сериализатор и права в
+        # get_queryset, get_serializer_class и get_permissions
+        self.batch = (self.action == 'list' and
+                      self.batch_param in request.query_params)
+        if self.batch:
+            self.action = 'retrieve'
+        return request
+
+    def get_batch_ids(self):
+        raw = self.request.query_params.get(self.batch_param, '')
+        try:
+            ids = [int(value) for value in raw.split(',') if value.strip()]
+        except ValueError:
+            raise ValidationError(
+                {self.batch_param: 'Идентификаторы должны быть числами'}
+            )
+        ids = list(dict.fromkeys(ids))
+        if not ids or len(ids) > self.batch_max_size:
+            raise ValidationError({
+                self.batch_param: (
+                    f'Нужно от 1 до {self.batch_max_size} идентификаторов'
+                )
+            })
+        return ids
+
+    def has_batch_object_permission(self, obj, permissions):
+        return all(
+            permission.has_object_permission(self.request, self, obj)
+            for permission in permissions
+        )
+
+    def list(self, request, *args, **kwargs):
+        if not self.batch:
+            return super().list(request, *args, **kwargs)
+
+        ids = self.get_batch_ids()
+        queryset = self.filter_queryset(self.get_queryset())
+        permissions = self.get_permissions()
+        found = {
+            obj.pk: obj for obj in queryset.filter(pk__in=ids)
+            if self.has_batch_object_permission(obj, permissions)
+        }
+        serializer = self.get_serializer(
+            [found[pk] for pk in ids if pk in found], many=True
+        )
+        return Response({
+            'results': serializer.data,
+            'missing': [pk for pk in ids if pk not in found],
+        })
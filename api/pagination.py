@@ -0,0 +1,142 @@
+"""
+Пагинация API
+"""
+from collections import OrderedDict
+
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from apps.ads.counting import count_queryset
+from apps.ads.pagination import InvalidCursor, KeysetPaginator
+
+
+class KeysetPagination(BasePagination):
+    """
+    Курсорная пагинация по ключу сортировки (например, created_at + id).
+    Учитывает сортировку, выбранную OrderingFilter, не выполняет COUNT(*)
+    и OFFSET, поэтому глубокие страницы стоят столько же, сколько первая.
+
+    Общее количество добавляется в ответ, только если представление
+    задает атрибут ``count_strategy`` (см. apps/ads/counting.py).
+    Номер страницы (``?page=``) не поддерживается: запрос с ним
+    отклоняется, а не возвращает молча первую страницу.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор'
+    page_query_param = 'page'
+    page_not_supported_message = (
+        'Номера страниц не поддерживаются, используйте параметр cursor '
+        'из ссылок next и previous'
+    )
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.page_query_param in request.query_params:
+            raise ValidationError(
+                {self.page_query_param: [self.page_not_supported_message]}
+            )
+        self.request = request
+        self.count = None
+        count_strategy = getattr(view, 'count_strategy', None)
+        if count_strategy:
+            # Представление может считать по выборке без проекции values()
+            get_count_queryset = getattr(view, 'get_count_queryset', None)
+            if get_count_queryset is not None:
+                queryset_to_count = get_count_queryset(queryset)
+            else:
+                queryset_to_count = queryset
+            self.count = count_queryset(queryset_to_count, count_strategy)
+
+        paginator = KeysetPaginator(queryset, self.get_page_size(request))
+        try:
+            self.page = paginator.page(
+                request.query_params.get(self.cursor_query_param)
+            )
+        except InvalidCursor:
+            raise NotFound(self.invalid_cursor_message)
+        return list(self.page)
+
+    def _cursor_link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        return self._cursor_link(self.page.next_cursor)
+
+    def get_previous_link(self):
+        return self._cursor_link(self.page.previous_cursor)
+
+    def get_first_link(self):
+        url = self.request.build_absolute_uri()
+        return remove_query_param(url, self.cursor_query_param)
+
+    def get_paginated_response(self, data):
+        response_data = OrderedDict()
+        if self.count is not None:
+            response_data['count'] = self.count.value
+            response_data['count_exact'] = self.count.exact
+        response_data['next'] = self.get_next_link()
+        response_data['previous'] = self.get_previous_link()
+        response_data['results'] = data
+        return Response(response_data)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {
+                    'type': 'integer',
+                    'example': 123,
+                },
+                'count_exact': {
+                    'type': 'boolean',
+                    'description': 'false, если count - оценка',
+                },
+                'next': {
+                    'type': 'string',
+                    'nullable': True,
+                    'format': 'uri',
+                },
+                'previous': {
+                    'type': 'string',
+                    'nullable': True,
+                    'format': 'uri',
+                },
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Курсор страницы из ссылок next/previous',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Количество результатов на странице',
+                'schema': {'type': 'integer'},
+            },
+        ]
@@ -0,0 +1,105 @@
+"""
+Быстрый путь чтения для списков API.
+
+ValuesSerializer строит тот же ответ, что и ModelSerializer, но без
+экземпляров моделей: queryset.values() выбирает только колонки, нужные
+полям сериализатора (вложенные сериализаторы - через JOIN), а строка
+превращается в словарь заранее подготовленным планом. Для каждого поля
+используется to_representation того же поля DRF, поэтому JSON совпадает
+с выводом исходного сериализатора байт в байт.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.functional import cached_property
+from rest_framework import serializers
+
+# Поля, для которых to_representation сводится к приведению типа
+_FAST_CONVERTERS = {
+    serializers.IntegerField: int,
+    serializers.CharField: str,
+}
+
+
+def _identity(value):
+    return value
+
+
+class ValuesSerializer:
+    """
+    Сериализатор только для чтения по строкам queryset.values().
+
+    План компилируется один раз из полей serializer_class: для каждого
+    поля - ключ ответа, колонка values() и функция преобразования либо
+    вложенный план. Поддерживаются обычные поля моделей и вложенные
+    сериализаторы по ForeignKey. shape - необязательная функция, которая
+    изменяет набор полей экземпляра сериализатора перед компиляцией.
+    """
+
+    def __init__(self, serializer_class, shape=None):
+        self.serializer_class = serializer_class
+        self.shape = shape
+
+    @cached_property
+    def _compiled(self):
+        serializer = self.serializer_class()
+        if self.shape is not None:
+            serializer = self.shape(serializer)
+        columns = []
+        plan = self._compile(serializer, '', columns)
+        return plan, columns
+
+    @property
+    def columns(self) -> list:
+        """Колонки values(), нужные сериализатору"""
+        return self._compiled[1]
+
+    def _compile(self, serializer, prefix, columns):
+        plan = []
+        for field in serializer._readable_fields:
+            if (field.source == '*' or '.' in field.source or
+                    isinstance(field, (serializers.SerializerMethodField,
+                                       serializers.ListSerializer))):
+                raise ImproperlyConfigured(
+                    f'{type(serializer).__name__}.{field.field_name} '
+                    f'cannot be projected to values()'
+                )
+            column = prefix + field.source
+            if column not in columns:
+                columns.append(column)
+            if isinstance(field, serializers.BaseSerializer):
+                # Значение колонки - id связанного объекта, проверка на None
+                nested = self._compile(field, column + '__', columns)
+                plan.append((field.field_name, column, None, nested))
+                continue
+            if (isinstance(field, serializers.PrimaryKeyRelatedField)
+                    and field.pk_field is None):
+                # values() уже возвращает значение первичного ключа
+                convert = _identity
+            else:
+                convert = _FAST_CONVERTERS.get(
+                    type(field), field.to_representation
+                )
+            plan.append((field.field_name, column, convert, None))
+        return plan
+
+    def values(self, queryset, extra=()):
+        """queryset.values() с колонками сериализатора и extra"""
+        columns = list(self.columns)
+        columns += [name for name in extra if name not in columns]
+        return queryset.values(*columns)
+
+    def to_representation(self, rows) -> list:
+        plan = self._compiled[0]
+        return [self._build(plan, row) for row in rows]
+
+    @classmethod
+    def _build(cls, plan, row):
+        data = {}
+        for key, column, convert, nested in plan:
+            value = row[column]
+            if value is None:
+                data[key] = None
+            elif nested is not None:
+                data[key] = cls._build(nested, row)
+            else:
+                data[key] = convert(value)
+        return data
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 
+from apps.ads.loaders import get_loader
 from apps.ads.models import Ad, ExchangeProposal
 
 
@@ -43,8 +44,19 @@ class ExchangeProposalSerializer(serializers.ModelSerializer):
             'id', 'created_at', 'updated_at', 'sender_user', 'receiver_user'
         ]
 
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.instance is not None:
+            # Объявления предложения не меняются после создания
+            fields.pop('ad_sender_id')
+            fields.pop('ad_receiver_id')
+        return fields
+
     def validate(self, data):
         """Дополнительная валидация"""
+        if self.instance is not None:
+            return data
+
         ad_sender_id = data.get('ad_sender_id')
         ad_receiver_id = data.get('ad_receiver_id')
 
@@ -53,23 +65,24 @@ class ExchangeProposalSerializer(serializers.ModelSerializer):
                 "Нельзя предложить обмен объявления на само себя"
             )
 
-        # Проверяем существование объявлений
-        try:
-            ad_sender = Ad.objects.get(id=ad_sender_id)
-            ad_receiver = Ad.objects.get(id=ad_receiver_id)
-        except Ad.DoesNotExist:
+        # Проверяем существование объявлений: оба одним запросом, их
+        # экземпляры потом использует perform_create
+        ads = get_loader(Ad).load_many([ad_sender_id, ad_receiver_id])
+        ad_sender = ads.get(ad_sender_id)
+        ad_receiver = ads.get(ad_receiver_id)
+        if ad_sender is None or ad_receiver is None:
             raise serializers.ValidationError(
                 "Одно из объявлений не существует")
 
         # Проверяем что пользователь не обменивает свои объявления между собой
-        if ad_sender.user == ad_receiver.user:
+        if ad_sender.user_id == ad_receiver.user_id:
             raise serializers.ValidationError(
                 "Нельзя предлагать обмен между собственными объявлениями"
             )
 
         # Проверяем что текущий пользователь является владельцем объявления-отправителя
         request = self.context.get('request')
-        if request and request.user != ad_sender.user:
+        if request and request.user.id != ad_sender.user_id:
             raise serializers.ValidationError(
                 "Вы можете предлагать обмен только от своих объявлений"
             )
@@ -77,6 +90,21 @@ class ExchangeProposalSerializer(serializers.ModelSerializer):
         return data
 
 
+class InboxProposalSerializer(ExchangeProposalSerializer):
+    """Предложение во входящих: с направлением относительно пользователя"""
+    direction = serializers.CharField(read_only=True)
+
+    class Meta(ExchangeProposalSerializer.Meta):
+        fields = ExchangeProposalSerializer.Meta.fields + ['direction']
+
+
+class InboxCountsSerializer(serializers.Serializer):
+    """Количество предложений по вкладкам"""
+    all = serializers.IntegerField()
+    sent = serializers.IntegerField()
+    received = serializers.IntegerField()
+
+
 class ExchangeProposalStatusSerializer(serializers.ModelSerializer):
     """Сериализатор для изменения статуса предложения"""
 
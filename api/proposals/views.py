@@ -1,18 +1,31 @@
-from django.db.models import Q
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
 from django_filters.rest_framework import DjangoFilterBackend
-from drf_spectacular.utils import extend_schema, extend_schema_view
-from rest_framework import filters, permissions, status
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import (OpenApiParameter, extend_schema,
+                                   extend_schema_view, inline_serializer)
+from rest_framework import filters, permissions, serializers, status
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 
+from apps.ads.conditional import PROPOSAL_VALIDATOR_MODELS
 from apps.ads.filters import ExchangeProposalFilter
-from apps.ads.models import ExchangeProposal
+from apps.ads.loaders import get_loader
+from apps.ads.models import Ad, ExchangeProposal
+from apps.ads.services import ExchangeProposalService
 
+from ..mixins import (BATCH_PARAMETERS, BatchRetrieveMixin,
+                      ConditionalListMixin, SparseFieldsMixin,
+                      ValuesListMixin)
+from ..projection import ValuesSerializer
+from ..sparse import SPARSE_PARAMETERS
 from .serializers import (ExchangeProposalSerializer,
-                          ExchangeProposalStatusSerializer)
+                          ExchangeProposalStatusSerializer,
+                          InboxCountsSerializer, InboxProposalSerializer)
 
 
 class IsProposalParticipant(permissions.BasePermission):
@@ -22,15 +35,15 @@ class IsProposalParticipant(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
         # Участники: отправитель и получатель
-        return (request.user == obj.sender_user or
-                request.user == obj.receiver_user)
+        return request.user.id in (obj.sender_user_id, obj.receiver_user_id)
 
 
 @extend_schema_view(
     list=extend_schema(
         summary="Получить список предложений обмена",
         description="Возвращает список предложений обмена пользователя",
-        tags=['Предложения обмена']
+        tags=['Предложения обмена'],
+        parameters=SPARSE_PARAMETERS + BATCH_PARAMETERS
     ),
     create=extend_schema(
         summary="Создать предложение обмена",
@@ -40,7 +53,8 @@ class IsProposalParticipant(permissions.BasePermission):
     retrieve=extend_schema(
         summary="Получить предложение обмена",
         description="Возвращает детальную информацию о предложении обмена",
-        tags=['Предложения обмена']
+        tags=['Предложения обмена'],
+        parameters=SPARSE_PARAMETERS
     ),
     update=extend_schema(
         summary="Обновить предложение обмена",
@@ -58,12 +72,14 @@ class IsProposalParticipant(permissions.BasePermission):
         tags=['Предложения обмена']
     )
 )
-class ExchangeProposalViewSet(ModelViewSet):
+class ExchangeProposalViewSet(ConditionalListMixin, BatchRetrieveMixin,
+                              SparseFieldsMixin, ValuesListMixin,
+                              ModelViewSet):
     """
     ViewSet для предложений обмена
     """
     queryset = ExchangeProposal.objects.select_related(
-        'ad_sender__user', 'ad_receiver__user'
+        'ad_sender__user', 'ad_receiver__user', 'sender_user', 'receiver_user'
     ).order_by('-created_at')
     serializer_class = ExchangeProposalSerializer
     permission_classes = [IsAuthenticated, IsProposalParticipant]
@@ -72,16 +88,54 @@ class ExchangeProposalViewSet(ModelViewSet):
     filterset_class = ExchangeProposalFilter
     ordering_fields = ['created_at', 'status']
     ordering = ['-created_at']
+    conditional_models = PROPOSAL_VALIDATOR_MODELS
+    # Список строится по values() без экземпляров моделей
+    list_projection = ValuesSerializer(ExchangeProposalSerializer)
 
     def get_queryset(self):
         """Показывать только предложения пользователя"""
         user = self.request.user
         if user.is_authenticated:
-            return self.queryset.filter(
-                Q(ad_sender__user=user) | Q(ad_receiver__user=user)
+            return ExchangeProposalService.participant_proposals(
+                user, self.queryset
             )
         return self.queryset.none()
 
+    def perform_create(self, serializer):
+        data = serializer.validated_data
+        # Объявления уже загружены в validate()
+        ads = get_loader(Ad)
+        try:
+            serializer.instance = ExchangeProposalService.create_proposal(
+                sender_user=self.request.user,
+                ad_sender=ads.load(data['ad_sender_id']),
+                ad_receiver=ads.load(data['ad_receiver_id']),
+                comment=data.get('comment', '')
+            )
+        except DjangoValidationError as e:
+            raise ValidationError(e.messages)
+
+    def perform_update(self, serializer):
+        # Статус меняется через сервис: права получателя, счетчики и
+        # отклонение остальных предложений при принятии
+        new_status = serializer.validated_data.pop('status', None)
+        with transaction.atomic():
+            proposal = serializer.save()
+            if new_status and new_status != proposal.status:
+                try:
+                    ExchangeProposalService.update_proposal_status(
+                        proposal, self.request.user, new_status
+                    )
+                except PermissionError:
+                    raise PermissionDenied(
+                        'Только получатель может изменить статус предложения'
+                    )
+                except DjangoValidationError as e:
+                    raise ValidationError(e.messages)
+
+    def perform_destroy(self, instance):
+        ExchangeProposalService.delete_proposal(instance)
+
     def get_permissions(self):
         """Настройка разрешений для разных действий"""
         if self.action in ['create']:
@@ -108,7 +162,7 @@ class ExchangeProposalViewSet(ModelViewSet):
         proposal = self.get_object()
 
         # Только получатель может изменять статус
-        if request.user != proposal.receiver_user:
+        if request.user.id != proposal.receiver_user_id:
             return Response(
                 {
                     'detail': (
@@ -121,9 +175,68 @@ class ExchangeProposalViewSet(ModelViewSet):
         serializer = self.get_serializer(
             proposal, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        new_status = serializer.validated_data.get('status')
+        if new_status:
+            try:
+                ExchangeProposalService.update_proposal_status(
+                    proposal, request.user, new_status
+                )
+            except DjangoValidationError as e:
+                raise ValidationError(e.messages)
 
         return Response(
             ExchangeProposalSerializer(
                 proposal, context={'request': request}).data
         )
+
+    @extend_schema(
+        summary="Входящие и исходящие предложения",
+        description=(
+            "Общий поток отправленных и полученных предложений с курсорной "
+            "пагинацией и количеством по вкладкам"
+        ),
+        tags=['Предложения обмена'],
+        parameters=[
+            OpenApiParameter(
+                'box', OpenApiTypes.STR, enum=['all', 'sent', 'received'],
+                description='Вкладка (по умолчанию all)'
+            ),
+            OpenApiParameter(
+                'status', OpenApiTypes.STR,
+                enum=[value for value, _ in ExchangeProposal.STATUS_CHOICES]
+            ),
+        ],
+        responses={200: inline_serializer(
+            name='ProposalInbox',
+            fields={
+                'counts': InboxCountsSerializer(),
+                'next': serializers.URLField(allow_null=True),
+                'previous': serializers.URLField(allow_null=True),
+                'results': InboxProposalSerializer(many=True),
+            }
+        )}
+    )
+    @action(detail=False, methods=['get'])
+    def inbox(self, request):
+        """Входящие и исходящие предложения пользователя"""
+        box = request.query_params.get('box', 'all')
+        status_filter = request.query_params.get('status') or None
+        statuses = dict(ExchangeProposal.STATUS_CHOICES)
+        if (box not in ExchangeProposalService.INBOX_BOXES
+                or (status_filter and status_filter not in statuses)):
+            raise ValidationError('Неверный параметр box или status')
+
+        queryset = ExchangeProposalService.inbox_queryset(
+            request.user, box, status_filter
+        )
+        page = self.paginate_queryset(queryset)
+        ExchangeProposalService.mark_directions(request.user, page)
+
+        response = self.get_paginated_response(InboxProposalSerializer(
+            page, many=True, context=self.get_serializer_context()
+        ).data)
+        response.data['counts'] = ExchangeProposalService.inbox_counts(
+            request.user, status_filter
+        )
+        response.data.move_to_end('counts', last=False)
+        return response
@@ -0,0 +1,101 @@
+"""
+Рендереры и парсеры API на orjson и MessagePack.
+
+ORJSONRenderer выводит тот же JSON, что и rest_framework JSONRenderer с
+настройками по умолчанию (UTF-8 без экранирования, компактные
+разделители), но сериализация выполняется в C: dict, list, str, datetime,
+date, time и UUID кодируются без вызова Python-кода на каждое значение.
+Остальные типы (Decimal, ленивые строки перевода, QuerySet) передаются в
+default кодировщика DRF.
+
+MessagePack (application/msgpack) выбирается клиентом через заголовок
+Accept или параметр ?format=msgpack. Datetime с часовым поясом кодируются
+расширением Timestamp, поэтому мобильные клиенты получают их без разбора
+строк.
+
+Отступ (параметр indent типа в Accept или renderer_context, например от
+BrowsableAPIRenderer) orjson поддерживает только в два пробела.
+"""
+import msgpack
+import orjson
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_encoder_default = JSONEncoder().default
+
+_ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+class ORJSONRenderer(BaseRenderer):
+    """JSON рендерер на orjson"""
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        options = _ORJSON_OPTIONS
+        if self._get_indent(accepted_media_type, renderer_context):
+            options |= orjson.OPT_INDENT_2
+
+        ret = orjson.dumps(data, default=_encoder_default, option=options)
+        # Как в JSONRenderer: U+2028 и U+2029 недопустимы в JavaScript
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028')
+            ret = ret.replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+    @staticmethod
+    def _get_indent(accepted_media_type, renderer_context):
+        # application/json; indent=4, как в JSONRenderer.get_indent
+        for param in (accepted_media_type or '').split(';')[1:]:
+            key, _, value = param.strip().partition('=')
+            if key == 'indent' and value.isdigit():
+                return int(value) > 0
+        return bool((renderer_context or {}).get('indent'))
+
+
+class ORJSONParser(BaseParser):
+    """JSON парсер на orjson"""
+    media_type = 'application/json'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+class MessagePackRenderer(BaseRenderer):
+    """MessagePack рендерер"""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # Timestamp требует часового пояса, наивные datetime кодируются
+        # строкой ISO 8601 через default
+        return msgpack.packb(
+            data, default=_encoder_default, use_bin_type=True,
+            datetime=settings.USE_TZ
+        )
+
+
+class MessagePackParser(BaseParser):
+    """MessagePack парсер"""
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            # timestamp=3: расширение Timestamp -> datetime в UTC
+            return msgpack.unpackb(stream.read(), raw=False, timestamp=3)
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise ParseError(f'MessagePack parse error - {exc}')
@@ -0,0 +1,140 @@
+"""
+Схема OpenAPI, сгенерированная заранее.
+
+SpectacularAPIView строит схему, обходя все ViewSet'ы и сериализаторы,
+на каждый запрос. Команда generate_api_schema сохраняет схему для всех
+языков из LANGUAGES в форматах YAML и JSON (и их gzip-версии) в
+API_SCHEMA_ROOT, а StaticSchemaView отдает эти файлы с сильным ETag.
+Без файлов схема генерируется на лету только при DEBUG.
+"""
+import gzip
+import hashlib
+import logging
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils import translation
+from django.utils.cache import (get_conditional_response,
+                                patch_cache_control, patch_vary_headers)
+from django.views import View
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.views import SpectacularAPIView
+
+logger = logging.getLogger(__name__)
+
+# Формат: (рендерер, Content-Type ответа)
+SCHEMA_FORMATS = {
+    'yaml': (OpenApiYamlRenderer, 'application/vnd.oai.openapi'),
+    'json': (OpenApiJsonRenderer, 'application/vnd.oai.openapi+json'),
+}
+
+
+def schema_languages() -> list:
+    return [code for code, _ in settings.LANGUAGES]
+
+
+def artifact_path(lang: str, fmt: str) -> Path:
+    return Path(settings.API_SCHEMA_ROOT) / f'schema.{lang}.{fmt}'
+
+
+def generate_schema(lang: str) -> dict:
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    with translation.override(lang):
+        return generator.get_schema(request=None, public=True)
+
+
+def write_artifacts() -> list:
+    """Генерирует схему для всех языков и форматов, возвращает пути"""
+    root = Path(settings.API_SCHEMA_ROOT)
+    root.mkdir(parents=True, exist_ok=True)
+    written = []
+    for lang in schema_languages():
+        schema = generate_schema(lang)
+        for fmt, (renderer_class, _) in SCHEMA_FORMATS.items():
+            content = renderer_class().render(schema, renderer_context={})
+            path = artifact_path(lang, fmt)
+            gz_path = path.with_name(path.name + '.gz')
+            # Запись через временный файл: работающий сервер не увидит
+            # частично записанную схему
+            for target, data in ((path, content),
+                                 (gz_path, gzip.compress(content, mtime=0))):
+                tmp = target.with_name(target.name + '.tmp')
+                tmp.write_bytes(data)
+                tmp.replace(target)
+                written.append(target)
+    _load.cache_clear()
+    return written
+
+
+@lru_cache(maxsize=32)
+def _load(path: Path, mtime_ns: int):
+    content = path.read_bytes()
+    return content, '"%s"' % hashlib.sha256(content).hexdigest()
+
+
+def load_artifact(path: Path):
+    """(содержимое, ETag) файла или None; перечитывается при изменении"""
+    try:
+        mtime_ns = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    return _load(path, mtime_ns)
+
+
+class StaticSchemaView(View):
+    """
+    Схема API из файлов generate_api_schema. Язык - параметр ?lang= или
+    язык запроса, формат - ?format=json|yaml или заголовок Accept
+    (как у SpectacularAPIView).
+    """
+
+    def get_language(self, request):
+        lang = request.GET.get('lang') or translation.get_language()
+        if lang not in schema_languages():
+            lang = settings.LANGUAGE_CODE
+        return lang
+
+    def get_format(self, request):
+        fmt = request.GET.get('format')
+        if fmt in SCHEMA_FORMATS:
+            return fmt
+        accept = request.headers.get('Accept', '')
+        return 'json' if 'json' in accept else 'yaml'
+
+    def get(self, request, *args, **kwargs):
+        fmt = self.get_format(request)
+        path = artifact_path(self.get_language(request), fmt)
+        gzipped = 'gzip' in request.headers.get('Accept-Encoding', '')
+        artifact = None
+        if gzipped:
+            artifact = load_artifact(path.with_name(path.name + '.gz'))
+            gzipped = artifact is not None
+        if artifact is None:
+            artifact = load_artifact(path)
+
+        if artifact is None:
+            if settings.DEBUG:
+                return SpectacularAPIView.as_view()(request, *args, **kwargs)
+            logger.error(
+                f'API schema artifact {path} is missing, '
+                f'run manage.py generate_api_schema'
+            )
+            raise Http404('Схема API не сгенерирована')
+
+        content, etag = artifact
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(
+                content, content_type=SCHEMA_FORMATS[fmt][1]
+            )
+            if gzipped:
+                response['Content-Encoding'] = 'gzip'
+        response['ETag'] = etag
+        # Схема меняется только при выкладке: проверка по ETag дешевая
+        patch_cache_control(response, no_cache=True)
+        patch_vary_headers(response, ('Accept', 'Accept-Encoding',
+                                      'Accept-Language'))
+        return response
@@ -0,0 +1,131 @@
+"""
+Разреженные наборы полей: параметры ?fields= и ?expand=.
+
+- ``fields=id,title,status`` - только перечисленные поля верхнего уровня;
+- ``expand=ad_sender,user`` - связи, которые выводятся вложенными
+  объектами.
+
+Если передан хотя бы один параметр, связи вне expand выводятся
+первичным ключом (значение колонки *_id, без JOIN и запросов). Без
+параметров ответ не меняется. По итоговому набору полей строятся
+only(), select_related() и prefetch_related() queryset, поэтому
+незапрошенные связи и вычисляемые поля не стоят ни одного запроса.
+"""
+from functools import lru_cache
+
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from .projection import ValuesSerializer
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+SPARSE_PARAMETERS = [
+    OpenApiParameter(
+        FIELDS_PARAM, OpenApiTypes.STR,
+        description='Поля ответа через запятую, например id,title,status'
+    ),
+    OpenApiParameter(
+        EXPAND_PARAM, OpenApiTypes.STR,
+        description=(
+            'Связи, выводимые вложенными объектами; остальные связи '
+            'выводятся идентификатором'
+        )
+    ),
+]
+
+
+def parse_list(value):
+    """'a, b' -> ('a', 'b'); None, если параметр не передан"""
+    if value is None:
+        return None
+    return tuple(name.strip() for name in value.split(',') if name.strip())
+
+
+def _is_relation(field):
+    return isinstance(field, serializers.BaseSerializer)
+
+
+def shape_fields(serializer, fields=None, expand=None):
+    """
+    Оставляет в serializer.fields поля из fields и заменяет связи вне
+    expand на PrimaryKeyRelatedField. Неизвестные имена - ошибка 400.
+    """
+    readable = {
+        name: field for name, field in serializer.fields.items()
+        if not field.write_only
+    }
+    errors = {}
+    if fields is not None:
+        unknown = [name for name in fields if name not in readable]
+        if unknown:
+            errors[FIELDS_PARAM] = f'Неизвестные поля: {", ".join(unknown)}'
+    if expand is not None:
+        unknown = [
+            name for name in expand
+            if name not in readable or not _is_relation(readable[name])
+        ]
+        if unknown:
+            errors[EXPAND_PARAM] = f'Неизвестные связи: {", ".join(unknown)}'
+    if errors:
+        raise ValidationError(errors)
+
+    for name in list(serializer.fields):
+        field = serializer.fields[name]
+        if field.write_only:
+            continue
+        if fields is not None and name not in fields:
+            serializer.fields.pop(name)
+        elif _is_relation(field) and name not in (expand or ()):
+            kwargs = {'source': field.source} if field.source != name else {}
+            serializer.fields[name] = serializers.PrimaryKeyRelatedField(
+                read_only=True, **kwargs
+            )
+    return serializer
+
+
+def queryset_plan(serializer, prefetch_map=None, prefix=''):
+    """
+    Возвращает (only, select_related, prefetch_related) для полей
+    сериализатора. prefetch_map - {имя вычисляемого поля: prefetch}.
+    """
+    only, related, prefetch = [], [], []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.SerializerMethodField):
+            lookup = (prefetch_map or {}).get(name)
+            if lookup and lookup not in prefetch:
+                prefetch.append(lookup)
+            continue
+        source = prefix + field.source.replace('.', '__')
+        if _is_relation(field):
+            related.append(source)
+            nested = queryset_plan(field, prefix=source + '__')
+            only += nested[0]
+            related += nested[1]
+        else:
+            # Для PrimaryKeyRelatedField грузится только колонка *_id
+            only.append(source)
+    return only, related, prefetch
+
+
+def shape_queryset(queryset, serializer, prefetch_map=None, extra=()):
+    """only()/select_related()/prefetch_related() по полям сериализатора"""
+    only, related, prefetch = queryset_plan(serializer, prefetch_map)
+    queryset = queryset.select_related(None).prefetch_related(None)
+    # select_related() без аргументов подключил бы все связи
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset.prefetch_related(*prefetch).only(*only, *extra)
+
+
+@lru_cache(maxsize=128)
+def get_sparse_projection(serializer_class, fields, expand):
+    """ValuesSerializer для набора полей (кэшируется по параметрам)"""
+    return ValuesSerializer(
+        serializer_class, shape=lambda s: shape_fields(s, fields, expand)
+    )
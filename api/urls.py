@@ -2,7 +2,9 @@
 Главные URL маршруты для API без версионирования
 """
 from django.urls import include, path
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from drf_spectacular.views import SpectacularSwaggerView
+
+from .schema import StaticSchemaView
 
 app_name = 'api'
 
@@ -19,8 +21,11 @@ urlpatterns = [
     # Аутентификация
     path('auth/', include('api.auth.urls')),
 
-    # Документация API
-    path('schema/', SpectacularAPIView.as_view(), name='schema'),
+    # Пакет подзапросов
+    path('batch/', include('api.batch.urls')),
+
+    # Документация API: схема из файлов generate_api_schema
+    path('schema/', StaticSchemaView.as_view(), name='schema'),
     path('docs/', SpectacularSwaggerView.as_view(url_name='api:schema'),
          name='swagger-ui'),
 ]
@@ -4,6 +4,8 @@
 from django.contrib.auth.models import User
 from rest_framework import serializers
 
+from apps.users.services import UserStatsService
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Базовый сериализатор для пользователя"""
@@ -18,7 +20,7 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'username', 'date_joined', 'ads_count']
 
     def get_ads_count(self, obj):
-        return obj.ads.count()
+        return UserStatsService.get_stats(obj).ads_count
 
     def validate_email(self, value):
         """Проверяем уникальность email"""
@@ -44,4 +46,4 @@ class UserProfileSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'username', 'date_joined', 'ads_count']
 
     def get_ads_count(self, obj):
-        return obj.ads.count()
+        return UserStatsService.get_stats(obj).ads_count
@@ -1,12 +1,17 @@
 from django.contrib.auth.models import User
+from django.db import transaction
 from drf_spectacular.utils import extend_schema, extend_schema_view
-from rest_framework import filters
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 
+from apps.ads.filters import RelevanceOrderingFilter
+from apps.ads.services import AdService
+from apps.users.filters import TrigramSearchFilter
+
+from ..mixins import BATCH_PARAMETERS, BatchRetrieveMixin, SuggestionMixin
 from .serializers import UserProfileSerializer, UserSerializer
 
 
@@ -14,7 +19,8 @@ from .serializers import UserProfileSerializer, UserSerializer
     list=extend_schema(
         summary="Получить список пользователей",
         description="Возвращает список всех пользователей",
-        tags=['Пользователи']
+        tags=['Пользователи'],
+        parameters=BATCH_PARAMETERS
     ),
     create=extend_schema(
         summary="Создать пользователя",
@@ -42,18 +48,20 @@ from .serializers import UserProfileSerializer, UserSerializer
         tags=['Пользователи']
     )
 )
-class UserViewSet(ModelViewSet):
+class UserViewSet(SuggestionMixin, BatchRetrieveMixin, ModelViewSet):
     """
     ViewSet для пользователей
     """
-    queryset = User.objects.all()
+    # Статистика для ads_count без COUNT по объявлениям
+    queryset = User.objects.select_related('stats')
     serializer_class = UserSerializer
     permission_classes = [AllowAny]
     authentication_classes = [TokenAuthentication]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [TrigramSearchFilter, RelevanceOrderingFilter]
     search_fields = ['username', 'first_name', 'last_name']
     ordering_fields = ['date_joined', 'username']
     ordering = ['-date_joined']
+    suggestion_field = 'username'
 
     def get_permissions(self):
         """Настройка разрешений для разных действий"""
@@ -72,6 +80,13 @@ class UserViewSet(ModelViewSet):
             )
         return obj
 
+    def perform_destroy(self, instance):
+        # Объявления удаляются через сервис, чтобы обновить счетчики
+        # и статистику второй стороны предложений обмена
+        with transaction.atomic():
+            AdService.delete_user_ads(instance)
+            instance.delete()
+
     @extend_schema(
         summary="Получить профиль текущего пользователя",
         description=(
@@ -118,6 +133,5 @@ class UserViewSet(ModelViewSet):
             permission_classes=[IsAuthenticated])
     def delete_account(self, request):
         """Удалить аккаунт пользователя"""
-        user = request.user
-        user.delete()
+        self.perform_destroy(request.user)
         return Response(status=204)
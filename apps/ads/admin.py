@@ -1,6 +1,79 @@
 from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
+from django.db import transaction
 
+from .counting import EstimatedCountPaginator
 from .models import Ad, ExchangeProposal
+from .services import AdService, ExchangeProposalService
 
-admin.site.register(Ad)
-admin.site.register(ExchangeProposal)
+
+@admin.register(Ad)
+class AdAdmin(admin.ModelAdmin):
+    list_display = ('title', 'user', 'category', 'condition', 'created_at')
+    list_filter = ('category', 'condition')
+    # Оценка количества строк вместо COUNT(*) на больших таблицах
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def save_model(self, request, obj, form, change):
+        """
+        Сохранение через AdService: статистика пользователей, снимки
+        списков и кэши. Смена владельца - через AdService.change_owner
+        (участники предложений).
+        """
+        if not change or 'user' not in form.changed_data:
+            AdService.save_ad(obj)
+            return
+        new_owner = obj.user
+        obj.user_id = form.initial['user']
+        with transaction.atomic():
+            AdService.save_ad(obj)
+            AdService.change_owner(obj, new_owner)
+
+    def delete_model(self, request, obj):
+        AdService.delete_ad(obj, obj.user)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            for ad in queryset.select_related('user'):
+                AdService.delete_ad(ad, ad.user)
+
+
+@admin.register(ExchangeProposal)
+class ExchangeProposalAdmin(admin.ModelAdmin):
+    list_display = ('ad_sender', 'ad_receiver', 'status', 'created_at')
+    list_filter = ('status',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def save_model(self, request, obj, form, change):
+        """Счетчики предложений и статистика пользователей"""
+        ExchangeProposalService.save_proposal(obj)
+
+    def delete_model(self, request, obj):
+        ExchangeProposalService.delete_proposal(obj)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            for proposal in queryset:
+                ExchangeProposalService.delete_proposal(proposal)
+
+
+class OwnerAdmin(UserAdmin):
+    """Объявления удаляемых пользователей удаляются через AdService"""
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            AdService.delete_user_ads(obj)
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            for user in queryset:
+                AdService.delete_user_ads(user)
+            super().delete_queryset(request, queryset)
+
+
+admin.site.unregister(get_user_model())
+admin.site.register(get_user_model(), OwnerAdmin)
@@ -1,6 +1,53 @@
 from django.apps import AppConfig
+from django.db.models.signals import (post_delete, post_migrate, post_save,
+                                      pre_save)
+
+
+def setup_search_index(sender, using, **kwargs):
+    """Создает индекс FTS5 для SQLite после миграций"""
+    from django.db import connections
+
+    from .search import install_sqlite_fts
+
+    install_sqlite_fts(connections[using])
 
 
 class AdsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.ads'
+
+    def ready(self):
+        from django.contrib.auth import get_user_model
+
+        from .cache import (invalidate_joined_model_cache,
+                            invalidate_model_cache, invalidate_owner_fragments,
+                            remember_owner_fields)
+        from .loaders import on_post_delete, on_post_save
+        from .querycache import register_joined_models, register_models
+        from .surrogate import purge_owner
+
+        post_migrate.connect(setup_search_index, sender=self)
+
+        # Сбрасываем закэшированные счетчики и результаты запросов при
+        # изменении данных
+        tracked = (self.get_model('Ad'), self.get_model('ExchangeProposal'))
+        for model in tracked:
+            post_save.connect(invalidate_model_cache, sender=model)
+            post_delete.connect(invalidate_model_cache, sender=model)
+        register_models(*tracked)
+        # Пользователи - владельцы в select_related, теги по строкам
+        post_save.connect(invalidate_joined_model_cache,
+                          sender=get_user_model())
+        post_delete.connect(invalidate_joined_model_cache,
+                            sender=get_user_model())
+        register_joined_models(get_user_model())
+        # Представления объявлений включают имя владельца
+        pre_save.connect(remember_owner_fields, sender=get_user_model())
+        post_save.connect(invalidate_owner_fragments, sender=get_user_model())
+        post_save.connect(purge_owner, sender=get_user_model())
+
+        # Карта идентичности запроса хранит актуальные экземпляры
+        post_save.connect(on_post_save, dispatch_uid='ads_identity_map_save')
+        post_delete.connect(
+            on_post_delete, dispatch_uid='ads_identity_map_delete'
+        )
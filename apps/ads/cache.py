@@ -0,0 +1,169 @@
+"""
+Версии кэша объявлений.
+
+Вместо удаления ключей по шаблону каждая область кэша (например,
+``ads.ad``) имеет номер версии, который входит в ключи закэшированных
+значений. Изменение данных увеличивает версию, и старые ключи просто
+перестают использоваться, истекая по таймауту.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+VERSION_KEY_PREFIX = 'ads:version'
+CHANGED_KEY_PREFIX = 'ads:changed'
+
+# Данные владельца, которые выводятся вместе с объявлениями
+OWNER_FIELDS = ('username', 'first_name', 'last_name')
+# Данные какого-либо владельца (целые страницы и валидаторы списков);
+# представления отдельных объявлений зависят от owner_scope(user_id)
+OWNERS_SCOPE = 'ads.owners'
+
+
+def _version_key(scope: str) -> str:
+    return f'{VERSION_KEY_PREFIX}:{scope}'
+
+
+def get_version(scope: str) -> int:
+    """Возвращает текущую версию области кэша"""
+    key = _version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        # add не перезапишет версию, уже установленную другим процессом
+        cache.add(key, 1, timeout=None)
+        version = cache.get(key, 1)
+    return version
+
+
+def get_versions(scopes) -> dict:
+    """Версии нескольких областей одним get_many: {область: версия}"""
+    keys = {_version_key(scope): scope for scope in scopes}
+    found = cache.get_many(keys)
+    return {
+        scope: found[key] if key in found else get_version(scope)
+        for key, scope in keys.items()
+    }
+
+
+def bump_version(scope: str) -> None:
+    """Инвалидирует все значения области кэша"""
+    key = _version_key(scope)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, get_version(scope) + 1, timeout=None)
+
+
+def _changed_key(scope: str) -> str:
+    return f'{CHANGED_KEY_PREFIX}:{scope}'
+
+
+def get_changed_at(scopes) -> dict:
+    """
+    Время последнего изменения данных областей (bump_versions(changed=)):
+    {область: datetime}. Неизвестное время (например, после вытеснения
+    из кэша) считается текущим.
+    """
+    keys = {_changed_key(scope): scope for scope in scopes}
+    changed_at = cache.get_many(keys)
+    for key in keys.keys() - changed_at.keys():
+        # add не перезапишет время, уже записанное другим процессом
+        cache.add(key, timezone.now(), timeout=None)
+        changed_at[key] = cache.get(key) or timezone.now()
+    return {scope: changed_at[key] for key, scope in keys.items()}
+
+
+def bump_versions(*scopes: str, using=None, changed=()) -> None:
+    """
+    Увеличивает версии областей сразу и еще раз после фиксации
+    транзакции: параллельный запрос мог закэшировать строки,
+    прочитанные до фиксации, уже под новой версией. Для областей changed
+    (целых моделей, не строк) запоминается и время изменения.
+    """
+    def bump():
+        for scope in scopes:
+            bump_version(scope)
+        if changed:
+            now = timezone.now()
+            cache.set_many(
+                {_changed_key(scope): now for scope in changed},
+                timeout=None
+            )
+    bump()
+    if transaction.get_connection(using).in_atomic_block:
+        transaction.on_commit(bump, using=using)
+
+
+def model_scope(model) -> str:
+    """Область кэша для модели, например ads.ad"""
+    return model._meta.label_lower
+
+
+def row_scope(model, pk) -> str:
+    """Область кэша одной строки модели, например ads.ad:42"""
+    return f'{model_scope(model)}:{pk}'
+
+
+def owner_scope(user_id) -> str:
+    """Область кэша данных владельца в представлениях объявлений"""
+    return f'ads.owner:{user_id}'
+
+
+def invalidate_model_cache(sender, instance=None, update_fields=None,
+                           **kwargs):
+    """
+    Обработчик post_save/post_delete: сбрасывает кэш модели и строки
+    (см. querycache.py)
+    """
+    # Вход пользователя меняет только last_login
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    scope = model_scope(sender)
+    scopes = [scope]
+    if instance is not None and instance.pk is not None:
+        scopes.append(row_scope(sender, instance.pk))
+    bump_versions(*scopes, using=kwargs.get('using'), changed=[scope])
+
+
+def invalidate_joined_model_cache(sender, created=False, **kwargs):
+    """
+    Обработчик post_save/post_delete моделей, которые кэшируются только
+    через select_related (querycache.register_joined_models): новая
+    строка не входит ни в один закэшированный результат
+    """
+    if not created:
+        invalidate_model_cache(sender, **kwargs)
+
+
+def remember_owner_fields(sender, instance, update_fields=None, **kwargs):
+    """
+    Обработчик pre_save пользователя: отмечает, изменились ли поля
+    OWNER_FIELDS (смена пароля или email представления не меняет)
+    """
+    instance._owner_fields_changed = False
+    if instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & set(
+            OWNER_FIELDS):
+        return
+    saved = sender._default_manager.filter(pk=instance.pk).values_list(
+        *OWNER_FIELDS
+    ).first()
+    instance._owner_fields_changed = saved is not None and saved != tuple(
+        getattr(instance, field) for field in OWNER_FIELDS
+    )
+
+
+def owner_fields_changed(instance, created=False) -> bool:
+    """Изменил ли сохраненный пользователь выводимые данные владельца"""
+    return not created and getattr(instance, '_owner_fields_changed', False)
+
+
+def invalidate_owner_fragments(sender, instance, created=False, **kwargs):
+    """
+    Обработчик post_save пользователя: представления объявлений содержат
+    данные владельца, а updated_at объявлений при этом не меняется
+    """
+    if owner_fields_changed(instance, created):
+        bump_versions(owner_scope(instance.pk), OWNERS_SCOPE,
+                      using=kwargs.get('using'), changed=[OWNERS_SCOPE])
@@ -0,0 +1,113 @@
+"""
+Условные GET-запросы для списков: ETag, Last-Modified и ответ 304.
+
+Валидаторы списка не обращаются к таблицам: ETag строится из версий
+областей кэша моделей, которые выводит список (apps/ads/cache.py), и
+времени их последнего изменения, а также версии данных владельцев
+(OWNERS_SCOPE), нормализованных параметров запроса, пользователя и
+языка. Last-Modified - время последнего изменения этих областей.
+Любая запись модели (в том числе удаление) меняет валидаторы всех ее
+списков.
+"""
+import hashlib
+from functools import wraps
+from typing import Iterable, Optional, Tuple
+
+from django.contrib import messages
+from django.utils import translation
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .cache import (OWNERS_SCOPE, get_changed_at, get_version, get_versions,
+                    model_scope)
+from .models import Ad, ExchangeProposal
+
+CONDITIONAL_METHODS = ('GET', 'HEAD')
+
+# Предложения выводятся вместе с объявлениями обеих сторон
+PROPOSAL_VALIDATOR_MODELS = (ExchangeProposal, Ad)
+
+
+def normalized_params(request) -> list:
+    """Отсортированные параметры запроса без пустых значений"""
+    params = []
+    for name, values in sorted(request.GET.lists()):
+        values = [value for value in values if value.strip()]
+        if values:
+            params.append((name, values))
+    return params
+
+
+def list_validators(request, models: Iterable = (Ad,),
+                    extra: Iterable = ()) -> Tuple[str, Optional[int]]:
+    """
+    (etag, last_modified) для списка объектов моделей models;
+    last_modified - timestamp.
+    """
+    scopes = [model_scope(model) for model in models] + [OWNERS_SCOPE]
+    versions = get_versions(scopes)
+    changed = get_changed_at(scopes)
+
+    parts = [
+        [(scope, versions[scope], changed[scope].isoformat())
+         for scope in scopes],
+        normalized_params(request),
+        request.user.id,
+        translation.get_language(),
+        *extra,
+    ]
+    etag = hashlib.md5(repr(parts).encode()).hexdigest()
+    last_modified = int(max(changed.values()).timestamp())
+    return etag, last_modified
+
+
+def page_extra(request) -> tuple:
+    """
+    Состояние страницы сайта вне списка: CSRF-токен форм и бейдж
+    ожидающих предложений в навигации
+    """
+    extra = (request.META.get('CSRF_COOKIE'),)
+    if request.user.is_authenticated:
+        extra += (get_version(model_scope(ExchangeProposal)),)
+    return extra
+
+
+def not_modified(request, etag, last_modified):
+    """Ответ 304 (или 412), если клиент передал актуальные валидаторы"""
+    return get_conditional_response(
+        request, etag=quote_etag(etag), last_modified=last_modified
+    )
+
+
+def set_validators(response, etag, last_modified):
+    """Добавляет валидаторы в ответ; клиент перепроверяет их каждый раз"""
+    response['ETag'] = quote_etag(etag)
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def conditional_page(get_validators):
+    """
+    Декоратор представления страницы-списка. get_validators(request)
+    возвращает (etag, last_modified). Страница с неотображенными
+    сообщениями (django.contrib.messages) не кэшируется клиентом.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            # len() не помечает сообщения прочитанными
+            if (request.method not in CONDITIONAL_METHODS or
+                    len(messages.get_messages(request))):
+                return view(request, *args, **kwargs)
+
+            etag, last_modified = get_validators(request)
+            response = not_modified(request, etag, last_modified)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200:
+                    set_validators(response, etag, last_modified)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,152 @@
+"""
+Стратегии подсчета количества строк для пагинируемых списков.
+
+COUNT(*) по большой таблице с фильтрами - самый дорогой запрос списка.
+Стратегия выбирается настройкой ``ADS_COUNT_STRATEGY`` или явно:
+
+- ``exact`` - обычный COUNT(*);
+- ``cached`` - COUNT(*), закэшированный для каждой комбинации фильтров
+  до следующего изменения модели (см. apps/ads/cache.py);
+- ``estimated`` - оценка планировщика PostgreSQL (pg_class.reltuples для
+  всей таблицы, EXPLAIN для выборки с фильтрами). Если оценка меньше
+  ``ADS_COUNT_ESTIMATE_THRESHOLD``, выполняется точный подсчет.
+"""
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+from .cache import get_version, model_scope
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CountResult:
+    """Количество строк и признак точного значения"""
+    value: int
+    exact: bool = True
+
+    def __int__(self):
+        return self.value
+
+
+class ExactCounter:
+    """Точный подсчет через COUNT(*)"""
+
+    def count(self, queryset: QuerySet) -> CountResult:
+        return CountResult(queryset.order_by().count())
+
+
+class CachedCounter(ExactCounter):
+    """Точный подсчет, закэшированный до изменения данных модели"""
+
+    def get_cache_key(self, queryset: QuerySet) -> str:
+        sql, params = queryset.order_by().query.sql_with_params()
+        digest = hashlib.md5(
+            repr((sql, params)).encode(), usedforsecurity=False
+        ).hexdigest()
+        scope = model_scope(queryset.model)
+        return f'ads:count:{scope}:{get_version(scope)}:{digest}'
+
+    def count(self, queryset: QuerySet) -> CountResult:
+        key = self.get_cache_key(queryset)
+        value = cache.get(key)
+        if value is None:
+            value = super().count(queryset).value
+            cache.set(key, value, settings.ADS_COUNT_CACHE_TIMEOUT)
+        return CountResult(value)
+
+
+class EstimatedCounter(ExactCounter):
+    """Оценка количества строк планировщиком PostgreSQL"""
+
+    def __init__(self, threshold: int = None):
+        if threshold is None:
+            threshold = settings.ADS_COUNT_ESTIMATE_THRESHOLD
+        self.threshold = threshold
+
+    def estimate(self, queryset: QuerySet):
+        """Возвращает оценку числа строк или None, если она недоступна"""
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+
+        queryset = queryset.order_by()
+        if not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class '
+                    'WHERE oid = %s::regclass',
+                    [queryset.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            # -1: таблица еще не анализировалась
+            if row and row[0] >= 0:
+                return row[0]
+            return None
+
+        plan = json.loads(queryset.explain(format='json'))
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    def count(self, queryset: QuerySet) -> CountResult:
+        try:
+            estimate = self.estimate(queryset)
+        except Exception as e:
+            logger.warning(f"Count estimate failed: {e}")
+            estimate = None
+
+        if estimate is None or estimate < self.threshold:
+            return super().count(queryset)
+        return CountResult(estimate, exact=False)
+
+
+COUNT_STRATEGIES = {
+    'exact': ExactCounter,
+    'cached': CachedCounter,
+    'estimated': EstimatedCounter,
+}
+
+
+def get_counter(strategy: str = None):
+    """Возвращает объект подсчета для стратегии или настройки по умолчанию"""
+    strategy = strategy or settings.ADS_COUNT_STRATEGY
+    try:
+        return COUNT_STRATEGIES[strategy]()
+    except KeyError:
+        raise ValueError(f'Unknown count strategy: {strategy!r}')
+
+
+def count_queryset(queryset: QuerySet, strategy: str = None) -> CountResult:
+    """Подсчитывает строки queryset выбранной стратегией"""
+    return get_counter(strategy).count(queryset)
+
+
+class CountingPaginator(Paginator):
+    """
+    Paginator, считающий строки через стратегию подсчета.
+    Подходит для ModelAdmin.paginator и списков с номерами страниц.
+    """
+    count_strategy = None
+
+    @cached_property
+    def count_result(self) -> CountResult:
+        if not isinstance(self.object_list, QuerySet):
+            return CountResult(len(self.object_list))
+        return count_queryset(self.object_list, self.count_strategy)
+
+    @cached_property
+    def count(self):
+        return self.count_result.value
+
+
+class EstimatedCountPaginator(CountingPaginator):
+    """Paginator с оценкой количества для больших таблиц (админка)"""
+    count_strategy = 'estimated'
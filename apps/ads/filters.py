@@ -1,8 +1,9 @@
 import django_filters
 from django.contrib.auth.models import User
-from django.db.models import Q
+from rest_framework import filters
 
 from .models import Ad, ExchangeProposal
+from .search import fuzzy_search, search_queryset
 
 
 class AdFilter(django_filters.FilterSet):
@@ -21,6 +22,10 @@ class AdFilter(django_filters.FilterSet):
         method='filter_search',
         label='Поиск по заголовку и описанию'
     )
+    fuzzy = django_filters.CharFilter(
+        method='filter_fuzzy',
+        label='Поиск по заголовку с учетом опечаток'
+    )
     user = django_filters.ModelChoiceFilter(
         queryset=User.objects.all(),
         label='Пользователь'
@@ -44,14 +49,34 @@ class AdFilter(django_filters.FilterSet):
         }
 
     def filter_search(self, queryset, name, value):
-        """Поиск по заголовку и описанию"""
+        """Полнотекстовый поиск по заголовку и описанию"""
+        if value:
+            return search_queryset(queryset, value)
+        return queryset
+
+    def filter_fuzzy(self, queryset, name, value):
+        """Триграммный поиск по заголовку"""
         if value:
-            return queryset.filter(
-                Q(title__icontains=value) | Q(description__icontains=value)
-            )
+            return fuzzy_search(queryset, ['title'], value)
         return queryset
 
 
+class RelevanceOrderingFilter(filters.OrderingFilter):
+    """
+    Сортировка, которая сохраняет порядок по релевантности для результатов
+    поиска, если клиент явно не передал параметр ordering.
+    """
+    relevance_annotations = ('search_rank', 'similarity')
+
+    def filter_queryset(self, request, queryset, view):
+        annotations = queryset.query.annotations
+        if (self.ordering_param not in request.query_params
+                and any(name in annotations
+                        for name in self.relevance_annotations)):
+            return queryset
+        return super().filter_queryset(request, queryset, view)
+
+
 class ExchangeProposalFilter(django_filters.FilterSet):
     """Фильтр для предложений обмена"""
     status = django_filters.ChoiceFilter(
@@ -0,0 +1,201 @@
+"""
+Карта идентичности и загрузчики объектов в рамках запроса.
+
+Каждая строка загружается за запрос один раз: сервисы, сериализаторы и
+представления получают объекты через get_loader(Model) и видят один и
+тот же экземпляр. Ключи, запрошенные через want(), копятся и
+загружаются одним запросом IN при первом load() (как DataLoader).
+Связи загруженных объектов (ad.user) подставляются из карты без
+запросов.
+
+Область действия задает IdentityMapMiddleware (apps/ads/middleware.py)
+или identity_scope(). Вне области get_loader() работает с временной
+картой, то есть просто загружает объекты пакетами.
+"""
+import contextvars
+from contextlib import contextmanager
+from typing import Iterable, Optional
+
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.http import Http404
+
+_current_map = contextvars.ContextVar('ads_identity_map', default=None)
+
+# Связи, которые загружаются вместе с объектом модели
+LOADER_SELECT_RELATED = {
+    'ads.Ad': ('user',),
+}
+
+
+def _model_key(model):
+    return model._meta.concrete_model._meta.label
+
+
+class IdentityMap:
+    """Объекты, загруженные в рамках запроса: {(модель, pk): объект}"""
+
+    def __init__(self):
+        self._objects = {}
+        self._loaders = {}
+
+    def get(self, model, pk):
+        return self._objects.get((_model_key(model), pk))
+
+    def add(self, instance):
+        """
+        Добавляет объект и связанные объекты из его кэша. Возвращает
+        экземпляр из карты: если объект уже загружен, прежний.
+        """
+        key = (_model_key(instance.__class__), instance.pk)
+        existing = self._objects.get(key)
+        if existing is not None:
+            return existing
+        self._objects[key] = instance
+        self.link(instance)
+        return instance
+
+    def link(self, instance):
+        """Подставляет в связи объекта экземпляры из карты"""
+        for field in instance._meta.concrete_fields:
+            if not (field.many_to_one or field.one_to_one):
+                continue
+            cached = field.get_cached_value(instance, default=None)
+            if cached is not None:
+                canonical = self.add(cached)
+                if canonical is not cached:
+                    field.set_cached_value(instance, canonical)
+                continue
+            value = getattr(instance, field.attname)
+            related = self.get(field.related_model, value)
+            if related is not None:
+                field.set_cached_value(instance, related)
+
+    def refresh(self, instance):
+        """После сохранения: карта хранит сохраненный экземпляр"""
+        key = (_model_key(instance.__class__), instance.pk)
+        if key in self._objects:
+            self._objects[key] = instance
+
+    def discard(self, instance):
+        self._objects.pop((_model_key(instance.__class__), instance.pk), None)
+
+    def loader(self, model) -> 'ModelLoader':
+        key = _model_key(model)
+        if key not in self._loaders:
+            self._loaders[key] = ModelLoader(self, model)
+        return self._loaders[key]
+
+
+class ModelLoader:
+    """Загрузчик объектов модели по первичному ключу через карту"""
+
+    def __init__(self, identity_map: IdentityMap, model):
+        self.identity_map = identity_map
+        self.model = model
+        self.select_related = LOADER_SELECT_RELATED.get(
+            _model_key(model), ()
+        )
+        self._pending = set()
+
+    def _to_python(self, pk):
+        try:
+            return self.model._meta.pk.to_python(pk)
+        except ValidationError:
+            return None
+
+    def want(self, *pks) -> None:
+        """Откладывает ключи: они загрузятся одним запросом с ближайшим"""
+        for pk in map(self._to_python, pks):
+            if pk is None or self.identity_map.get(self.model, pk):
+                continue
+            self._pending.add(pk)
+
+    def _flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, set()
+        queryset = self.model._default_manager.filter(pk__in=pending)
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        for instance in queryset:
+            self.identity_map.add(instance)
+
+    def cached(self, pks: Iterable) -> dict:
+        """Уже загруженные объекты из pks, без запросов"""
+        result = {}
+        for pk in map(self._to_python, pks):
+            instance = self.identity_map.get(self.model, pk)
+            if instance is not None:
+                result[pk] = instance
+        return result
+
+    def load_many(self, pks: Iterable) -> dict:
+        """{pk: объект} для найденных ключей, не более одного запроса"""
+        pks = list(pks)
+        self.want(*pks)
+        self._flush()
+        return self.cached(pks)
+
+    def load(self, pk):
+        instance = self.load_many([pk]).get(self._to_python(pk))
+        if instance is None:
+            raise self.model.DoesNotExist(
+                f'{self.model._meta.object_name} {pk!r} does not exist'
+            )
+        return instance
+
+    def get_or_404(self, pk):
+        try:
+            return self.load(pk)
+        except self.model.DoesNotExist:
+            raise Http404(
+                f'No {self.model._meta.object_name} matches {pk!r}'
+            )
+
+
+def current_identity_map() -> Optional[IdentityMap]:
+    return _current_map.get()
+
+
+@contextmanager
+def identity_scope():
+    """Область карты идентичности; вложенная область использует внешнюю"""
+    identity_map = _current_map.get()
+    if identity_map is not None:
+        yield identity_map
+        return
+    identity_map = IdentityMap()
+    token = _current_map.set(identity_map)
+    try:
+        yield identity_map
+    finally:
+        _current_map.reset(token)
+
+
+def get_loader(model) -> ModelLoader:
+    identity_map = _current_map.get() or IdentityMap()
+    return identity_map.loader(model)
+
+
+def prime(*instances) -> None:
+    """Добавляет уже загруженные объекты в карту текущей области"""
+    identity_map = _current_map.get()
+    if identity_map is None:
+        return
+    for instance in instances:
+        if isinstance(instance, models.Model) and instance.pk is not None:
+            identity_map.add(instance)
+            identity_map.link(instance)
+
+
+def on_post_save(sender, instance, **kwargs):
+    identity_map = _current_map.get()
+    if identity_map is not None:
+        identity_map.refresh(instance)
+
+
+def on_post_delete(sender, instance, **kwargs):
+    identity_map = _current_map.get()
+    if identity_map is not None:
+        identity_map.discard(instance)
@@ -0,0 +1,78 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from apps.ads.models import Ad, ExchangeProposal
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время построения страницы списка API через '
+        'ModelSerializer и через ValuesSerializer (api/projection.py) и '
+        'проверяет, что JSON совпадает'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations', type=int, default=200,
+            help='Количество повторов для каждого способа'
+        )
+        parser.add_argument(
+            '--page-size', type=int, default=20,
+            help='Количество строк на странице'
+        )
+
+    def handle(self, *args, **options):
+        from api.ads.serializers import AdListSerializer
+        from api.projection import ValuesSerializer
+        from api.proposals.serializers import ExchangeProposalSerializer
+
+        iterations = options['iterations']
+        page_size = options['page_size']
+        cases = [
+            ('ads', AdListSerializer,
+             Ad.objects.select_related('user').order_by('-created_at', '-id')),
+            ('proposals', ExchangeProposalSerializer,
+             ExchangeProposal.objects.select_related(
+                 'ad_sender__user', 'ad_receiver__user',
+                 'sender_user', 'receiver_user'
+             ).order_by('-created_at', '-id')),
+        ]
+        renderer = JSONRenderer()
+
+        for name, serializer_class, queryset in cases:
+            projection = ValuesSerializer(serializer_class)
+
+            def model_page():
+                rows = list(queryset[:page_size])
+                return renderer.render(
+                    serializer_class(rows, many=True).data
+                )
+
+            def values_page():
+                rows = list(projection.values(queryset)[:page_size])
+                return renderer.render(projection.to_representation(rows))
+
+            model_json, values_json = model_page(), values_page()
+            if model_json != values_json:
+                raise CommandError(f'{name}: outputs differ')
+
+            model_time = self._measure(model_page, iterations)
+            values_time = self._measure(values_page, iterations)
+            rows = len(queryset[:page_size])
+            self.stdout.write(
+                f'{name} ({rows} rows): '
+                f'serializer {model_time * 1000:.2f} ms/page, '
+                f'values {values_time * 1000:.2f} ms/page, '
+                f'speedup {model_time / values_time:.1f}x'
+            )
+
+        self.stdout.write(self.style.SUCCESS('Outputs are identical'))
+
+    @staticmethod
+    def _measure(func, iterations):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        return (time.perf_counter() - start) / iterations
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.schema import write_artifacts
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует схему OpenAPI для всех языков в API_SCHEMA_ROOT; '
+        'выполняется при сборке, /api/schema/ отдает готовые файлы'
+    )
+
+    def handle(self, *args, **options):
+        written = write_artifacts()
+        for path in written:
+            self.stdout.write(f'Wrote {path}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {len(written)} schema files in '
+            f'{settings.API_SCHEMA_ROOT}'
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from apps.ads.services import AdSnapshotService
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает снимки первых страниц списка объявлений '
+        '(например, после изменений в обход AdService)'
+    )
+
+    def handle(self, *args, **options):
+        fixed = AdSnapshotService.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {fixed} ad list snapshots'
+        ))
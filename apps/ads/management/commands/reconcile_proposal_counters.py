@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from apps.ads.models import Ad
+from apps.ads.services import ProposalCounterService
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счетчики предложений обмена объявлений пакетами '
+        'и сообщает о расхождениях'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Количество объявлений в пакете'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать расхождения, не исправляя их'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        fix = not options['dry_run']
+
+        checked = drifted = 0
+        last_id = 0
+        while True:
+            ad_ids = list(
+                Ad.objects.filter(id__gt=last_id).order_by('id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ad_ids:
+                break
+            last_id = ad_ids[-1]
+            checked += len(ad_ids)
+
+            for ad_id, direction, status, stored, actual in (
+                    ProposalCounterService.reconcile(ad_ids, fix=fix)):
+                drifted += 1
+                self.stdout.write(
+                    f'Ad {ad_id} {direction}/{status}: '
+                    f'stored {stored}, actual {actual}'
+                )
+
+        action = 'found' if not fix else 'fixed'
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {checked} ads, {action} {drifted} drifted counters'
+        ))
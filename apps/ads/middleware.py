@@ -0,0 +1,26 @@
+from .loaders import identity_scope
+from .surrogate import purge_batch
+
+
+class IdentityMapMiddleware:
+    """Карта идентичности объектов на время запроса (см. loaders.py)"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with identity_scope():
+            return self.get_response(request)
+
+
+class SurrogatePurgeMiddleware:
+    """
+    Очистка кэша прокси одним пакетом после запроса (см. surrogate.py)
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with purge_batch():
+            return self.get_response(request)
@@ -0,0 +1,71 @@
+# Generated by Django 4.2.7 on 2025-06-10 12:00
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Вектор объединяет русскую и английскую морфологию, чтобы запрос,
+# нормализованный конфигурацией активного языка, находил совпадения.
+SEARCH_CONFIGS = ("russian", "english")
+
+
+def _weighted(column, weight):
+    return " || ".join(
+        f"setweight(to_tsvector('{config}', coalesce({column}, '')), '{weight}')"
+        for config in SEARCH_CONFIGS
+    )
+
+
+CREATE_TRIGGER_SQL = f"""
+CREATE OR REPLACE FUNCTION ads_ad_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := {_weighted("NEW.title", "A")} || {_weighted("NEW.description", "B")};
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS ads_ad_search_vector_trigger ON ads_ad;
+CREATE TRIGGER ads_ad_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, description ON ads_ad
+    FOR EACH ROW EXECUTE FUNCTION ads_ad_search_vector_update();
+
+UPDATE ads_ad SET search_vector = {_weighted("title", "A")} || {_weighted("description", "B")};
+
+CREATE INDEX IF NOT EXISTS ads_ad_search_vector_gin
+    ON ads_ad USING gin (search_vector);
+"""
+
+DROP_TRIGGER_SQL = """
+DROP INDEX IF EXISTS ads_ad_search_vector_gin;
+DROP TRIGGER IF EXISTS ads_ad_search_vector_trigger ON ads_ad;
+DROP FUNCTION IF EXISTS ads_ad_search_vector_update();
+"""
+
+
+def create_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(CREATE_TRIGGER_SQL, params=None)
+
+
+def drop_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(DROP_TRIGGER_SQL, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ads", "0002_alter_ad_options_alter_exchangeproposal_options_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ad",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True, verbose_name="Поисковый вектор"
+            ),
+        ),
+        migrations.RunPython(create_search_trigger, drop_search_trigger),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2025-06-11 10:30
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+CREATE_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS ads_ad_title_trgm
+    ON ads_ad USING gin (title gin_trgm_ops);
+"""
+
+DROP_INDEX_SQL = "DROP INDEX IF EXISTS ads_ad_title_trgm;"
+
+
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(CREATE_INDEX_SQL, params=None)
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(DROP_INDEX_SQL, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ads", "0003_ad_search_vector"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.7 on 2025-06-12 09:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ads", "0004_ad_title_trigram_index"),
+    ]
+
+    operations = [
+        # Одноколоночные индексы заменяются составными с тем же префиксом
+        migrations.RemoveIndex(
+            model_name="ad",
+            name="ads_ad_categor_aafbda_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="ad",
+            name="ads_ad_conditi_1d704d_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="ad",
+            name="ads_ad_created_9f5b83_idx",
+        ),
+        migrations.AddIndex(
+            model_name="ad",
+            index=models.Index(
+                fields=["category", "-created_at", "-id"],
+                name="ads_ad_category_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ad",
+            index=models.Index(
+                fields=["condition", "-created_at", "-id"],
+                name="ads_ad_condition_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ad",
+            index=models.Index(
+                fields=["user", "-created_at", "-id"],
+                name="ads_ad_user_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ad",
+            index=models.Index(
+                fields=["-created_at", "-id"],
+                include=("user", "category", "condition"),
+                name="ads_ad_created_covering_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="exchangeproposal",
+            index=models.Index(
+                condition=models.Q(("status", "pending")),
+                fields=["ad_receiver"],
+                name="ads_proposal_pending_recv_idx",
+            ),
+        ),
+    ]
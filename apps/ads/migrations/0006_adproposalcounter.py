@@ -0,0 +1,106 @@
+# Generated by Django 4.2.7 on 2025-06-13 11:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_counters(apps, schema_editor):
+    """Заполняет нулевой шард счетчиков по существующим предложениям"""
+    ExchangeProposal = apps.get_model("ads", "ExchangeProposal")
+    AdProposalCounter = apps.get_model("ads", "AdProposalCounter")
+
+    for direction, field in (("received", "ad_receiver_id"),
+                             ("sent", "ad_sender_id")):
+        rows = (
+            ExchangeProposal.objects.values_list(field, "status")
+            .annotate(total=models.Count("id"))
+            .order_by()
+        )
+        AdProposalCounter.objects.bulk_create(
+            [
+                AdProposalCounter(
+                    ad_id=ad_id, direction=direction, status=status,
+                    shard=0, count=total,
+                )
+                for ad_id, status, total in rows
+            ],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ads", "0005_ad_composite_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AdProposalCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "direction",
+                    models.CharField(
+                        choices=[
+                            ("received", "Полученные"),
+                            ("sent", "Отправленные"),
+                        ],
+                        max_length=10,
+                        verbose_name="Направление",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Ожидает"),
+                            ("accepted", "Принята"),
+                            ("rejected", "Отклонена"),
+                        ],
+                        max_length=10,
+                        verbose_name="Статус",
+                    ),
+                ),
+                (
+                    "shard",
+                    models.PositiveSmallIntegerField(
+                        default=0, verbose_name="Шард"
+                    ),
+                ),
+                (
+                    "count",
+                    models.IntegerField(default=0, verbose_name="Количество"),
+                ),
+                (
+                    "ad",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="proposal_counters",
+                        to="ads.ad",
+                        verbose_name="Объявление",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Счетчик предложений",
+                "verbose_name_plural": "Счетчики предложений",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="adproposalcounter",
+            constraint=models.UniqueConstraint(
+                fields=("ad", "direction", "status", "shard"),
+                name="ads_proposal_counter_shard_uniq",
+            ),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
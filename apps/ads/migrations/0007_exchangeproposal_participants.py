@@ -0,0 +1,102 @@
+# Generated by Django 4.2.7 on 2025-06-15 12:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_participants(apps, schema_editor):
+    """Копирует владельцев объявлений в предложения обмена"""
+    Ad = apps.get_model("ads", "Ad")
+    ExchangeProposal = apps.get_model("ads", "ExchangeProposal")
+
+    ExchangeProposal.objects.update(
+        sender_user_id=models.Subquery(
+            Ad.objects.filter(id=models.OuterRef("ad_sender_id"))
+            .values("user_id")[:1]
+        ),
+        receiver_user_id=models.Subquery(
+            Ad.objects.filter(id=models.OuterRef("ad_receiver_id"))
+            .values("user_id")[:1]
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("ads", "0006_adproposalcounter"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="exchangeproposal",
+            name="sender_user",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="sent_exchange_proposals",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="Отправитель",
+            ),
+        ),
+        migrations.AddField(
+            model_name="exchangeproposal",
+            name="receiver_user",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="received_exchange_proposals",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="Получатель",
+            ),
+        ),
+        migrations.RunPython(backfill_participants, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="exchangeproposal",
+            name="sender_user",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                editable=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="sent_exchange_proposals",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="Отправитель",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="exchangeproposal",
+            name="receiver_user",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                editable=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="received_exchange_proposals",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="Получатель",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="exchangeproposal",
+            index=models.Index(
+                fields=["sender_user", "status", "-created_at"],
+                name="ads_proposal_sender_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="exchangeproposal",
+            index=models.Index(
+                fields=["receiver_user", "status", "-created_at"],
+                name="ads_proposal_receiver_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_snapshots(apps, schema_editor):
+    """Создает снимки первых страниц по существующим объявлениям"""
+    Ad = apps.get_model("ads", "Ad")
+    AdListSnapshot = apps.get_model("ads", "AdListSnapshot")
+
+    # Исторические модели не содержат атрибутов класса CATEGORY_CHOICES
+    categories = [""] + [
+        value for value, _ in Ad._meta.get_field("category").choices
+    ]
+    conditions = [""] + [
+        value for value, _ in Ad._meta.get_field("condition").choices
+    ]
+    snapshots = []
+    for category in categories:
+        for condition in conditions:
+            ads = Ad.objects.all()
+            if category:
+                ads = ads.filter(category=category)
+            if condition:
+                ads = ads.filter(condition=condition)
+            snapshots.append(
+                AdListSnapshot(
+                    key=f"{category}:{condition}",
+                    category=category,
+                    condition=condition,
+                    ad_ids=list(
+                        ads.order_by("-created_at", "-id").values_list(
+                            "id", flat=True
+                        )[: settings.ADS_LIST_SNAPSHOT_SIZE]
+                    ),
+                    total=ads.count(),
+                )
+            )
+    AdListSnapshot.objects.bulk_create(snapshots)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ads", "0007_exchangeproposal_participants"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AdListSnapshot",
+            fields=[
+                (
+                    "key",
+                    models.CharField(
+                        max_length=120,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Ключ",
+                    ),
+                ),
+                (
+                    "category",
+                    models.CharField(
+                        blank=True, max_length=100, verbose_name="Категория"
+                    ),
+                ),
+                (
+                    "condition",
+                    models.CharField(
+                        blank=True, max_length=10, verbose_name="Состояние"
+                    ),
+                ),
+                (
+                    "ad_ids",
+                    models.JSONField(
+                        default=list,
+                        verbose_name="Объявления первой страницы",
+                    ),
+                ),
+                (
+                    "total",
+                    models.IntegerField(
+                        default=0, verbose_name="Количество объявлений"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Дата обновления"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Снимок списка объявлений",
+                "verbose_name_plural": "Снимки списков объявлений",
+            },
+        ),
+        migrations.RunPython(backfill_snapshots, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,12 @@
 from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchVectorField
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
 
+from .querycache import CachedQuerySet
+
 
 class Ad(models.Model):
     CONDITION_CHOICES = [
@@ -60,15 +63,43 @@ class Ad(models.Model):
         auto_now=True,
         verbose_name=_('Дата обновления')
     )
+    # Заполняется триггером БД (см. миграцию 0003 и apps/ads/search.py)
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name=_('Поисковый вектор')
+    )
+
+    # Ad.objects.cached() - кэш результатов запросов (см. querycache.py)
+    objects = CachedQuerySet.as_manager()
 
     class Meta:
         verbose_name = _('Объявление')
         verbose_name_plural = _('Объявления')
         ordering = ['-created_at']
+        # Индексы повторяют порядок ключа keyset пагинации (-created_at, -id)
         indexes = [
-            models.Index(fields=['category']),
-            models.Index(fields=['condition']),
-            models.Index(fields=['created_at']),
+            # ads_list с фильтром по категории и/или состоянию
+            models.Index(
+                fields=['category', '-created_at', '-id'],
+                name='ads_ad_category_created_idx'
+            ),
+            models.Index(
+                fields=['condition', '-created_at', '-id'],
+                name='ads_ad_condition_created_idx'
+            ),
+            # my_ads: объявления пользователя по дате
+            models.Index(
+                fields=['user', '-created_at', '-id'],
+                name='ads_ad_user_created_idx'
+            ),
+            # Список без фильтров: условие user_id <> %s и подсчет
+            # проверяются по индексу без чтения строк таблицы
+            models.Index(
+                fields=['-created_at', '-id'],
+                include=['user', 'category', 'condition'],
+                name='ads_ad_created_covering_idx'
+            ),
         ]
 
     def __str__(self):
@@ -111,6 +142,27 @@ class ExchangeProposal(models.Model):
         related_name='received_proposals',
         verbose_name=_('Объявление получателя')
     )
+    # Владельцы объявлений, копируются из ad_sender/ad_receiver в save().
+    # Позволяют выбирать предложения пользователя по индексу без JOIN.
+    # Одиночные индексы не нужны: их заменяют составные из Meta.indexes
+    sender_user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='sent_exchange_proposals',
+        db_index=False,
+        editable=False,
+        blank=True,
+        verbose_name=_('Отправитель')
+    )
+    receiver_user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='received_exchange_proposals',
+        db_index=False,
+        editable=False,
+        blank=True,
+        verbose_name=_('Получатель')
+    )
     comment = models.TextField(
         blank=True,
         verbose_name=_('Комментарий'),
@@ -131,6 +183,9 @@ class ExchangeProposal(models.Model):
         verbose_name=_('Дата обновления')
     )
 
+    # update() сбрасывает кэш запросов модели (см. querycache.py)
+    objects = CachedQuerySet.as_manager()
+
     class Meta:
         verbose_name = _('Предложение обмена')
         verbose_name_plural = _('Предложения обмена')
@@ -139,6 +194,22 @@ class ExchangeProposal(models.Model):
         indexes = [
             models.Index(fields=['status']),
             models.Index(fields=['created_at']),
+            # Каскадное отклонение при принятии предложения: ожидающих
+            # предложений немного, поэтому частичный индекс мал
+            models.Index(
+                fields=['ad_receiver'],
+                condition=models.Q(status='pending'),
+                name='ads_proposal_pending_recv_idx'
+            ),
+            # Входящие и исходящие предложения пользователя
+            models.Index(
+                fields=['sender_user', 'status', '-created_at'],
+                name='ads_proposal_sender_idx'
+            ),
+            models.Index(
+                fields=['receiver_user', 'status', '-created_at'],
+                name='ads_proposal_receiver_idx'
+            ),
         ]
 
     def __str__(self):
@@ -159,32 +230,159 @@ class ExchangeProposal(models.Model):
                         _('Нельзя предложить обмен собственного товара '
                           'на себя же.')
                     )
-                if self.ad_sender.user == self.ad_receiver.user:
+                if self.ad_sender.user_id == self.ad_receiver.user_id:
                     raise ValidationError(
                         _('Нельзя предложить обмен между собственными '
                           'товарами.')
                     )
 
-    @property
-    def sender_user(self):
-        """Возвращает пользователя-отправителя"""
-        return self.ad_sender.user
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._synced_ads = (
+            instance.__dict__.get('ad_sender_id'),
+            instance.__dict__.get('ad_receiver_id'),
+        )
+        return instance
 
-    @property
-    def receiver_user(self):
-        """Возвращает пользователя-получателя"""
-        return self.ad_receiver.user
+    def save(self, *args, **kwargs):
+        self.sync_participants()
+        super().save(*args, **kwargs)
+        self._synced_ads = (self.ad_sender_id, self.ad_receiver_id)
+
+    def sync_participants(self):
+        """
+        Заполняет sender_user и receiver_user по объявлениям: для новых
+        предложений и при замене объявления
+        """
+        synced_sender, synced_receiver = getattr(
+            self, '_synced_ads', (None, None)
+        )
+        if self.ad_sender_id is not None and (
+                self.sender_user_id is None
+                or self.ad_sender_id != synced_sender):
+            self.sender_user_id = self.ad_sender.user_id
+        if self.ad_receiver_id is not None and (
+                self.receiver_user_id is None
+                or self.ad_receiver_id != synced_receiver):
+            self.receiver_user_id = self.ad_receiver.user_id
 
     def can_be_updated_by(self, user):
         """Проверяет может ли пользователь обновить статус"""
-        return user == self.receiver_user
+        return user.id == self.receiver_user_id
 
     def accept(self):
         """Принять предложение"""
-        self.status = 'accepted'
-        self.save()
+        self._set_status('accepted')
 
     def reject(self):
         """Отклонить предложение"""
-        self.status = 'rejected'
-        self.save()
+        self._set_status('rejected')
+
+    def _set_status(self, status):
+        from .services import ProposalCounterService
+
+        old_status = self.status
+        with transaction.atomic():
+            self.status = status
+            self.save()
+            ProposalCounterService.status_changed(self, old_status, status)
+
+
+class AdProposalCounter(models.Model):
+    """
+    Шард счетчика предложений обмена объявления.
+
+    Количество предложений по направлению и статусу - сумма count по всем
+    шардам. Инкремент попадает в случайный шард, поэтому одновременные
+    предложения к популярному объявлению не блокируют одну строку.
+    Поддерживается ProposalCounterService, расхождения исправляет команда
+    reconcile_proposal_counters.
+    """
+    DIRECTION_CHOICES = [
+        ('received', _('Полученные')),
+        ('sent', _('Отправленные')),
+    ]
+
+    ad = models.ForeignKey(
+        Ad,
+        on_delete=models.CASCADE,
+        related_name='proposal_counters',
+        verbose_name=_('Объявление')
+    )
+    direction = models.CharField(
+        max_length=10,
+        choices=DIRECTION_CHOICES,
+        verbose_name=_('Направление')
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=ExchangeProposal.STATUS_CHOICES,
+        verbose_name=_('Статус')
+    )
+    shard = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name=_('Шард')
+    )
+    count = models.IntegerField(
+        default=0,
+        verbose_name=_('Количество')
+    )
+
+    class Meta:
+        verbose_name = _('Счетчик предложений')
+        verbose_name_plural = _('Счетчики предложений')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['ad', 'direction', 'status', 'shard'],
+                name='ads_proposal_counter_shard_uniq'
+            ),
+        ]
+
+    def __str__(self):
+        return (f'{self.ad_id} {self.direction} {self.status} '
+                f'#{self.shard}: {self.count}')
+
+
+class AdListSnapshot(models.Model):
+    """
+    Первая страница списка объявлений для сочетания категории и
+    состояния (пустая строка - любое значение): id первых объявлений в
+    порядке списка и общее количество. Поддерживается AdSnapshotService
+    при изменениях через AdService, поэтому первая страница ads_list
+    открывается запросом по первичному ключу без сортировки и COUNT.
+    """
+    key = models.CharField(
+        max_length=120,
+        primary_key=True,
+        verbose_name=_('Ключ')
+    )
+    category = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name=_('Категория')
+    )
+    condition = models.CharField(
+        max_length=10,
+        blank=True,
+        verbose_name=_('Состояние')
+    )
+    ad_ids = models.JSONField(
+        default=list,
+        verbose_name=_('Объявления первой страницы')
+    )
+    total = models.IntegerField(
+        default=0,
+        verbose_name=_('Количество объявлений')
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name=_('Дата обновления')
+    )
+
+    class Meta:
+        verbose_name = _('Снимок списка объявлений')
+        verbose_name_plural = _('Снимки списков объявлений')
+
+    def __str__(self):
+        return f'Snapshot {self.key} ({self.total} ads)'
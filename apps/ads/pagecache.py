@@ -0,0 +1,215 @@
+"""
+Кэш целых страниц списка объявлений для анонимных пользователей.
+
+Ключ страницы - язык и нормализованные параметры фильтра (запросы с
+посторонними или повторяющимися параметрами не кэшируются). Запись
+хранит версии областей кэша, от которых зависит страница: категории
+фильтра (ADS_PAGE_CATEGORY_SCOPE, увеличивается AdService после
+фиксации транзакции) или всех объявлений (model_scope(Ad)), а также
+данных владельцев (OWNERS_SCOPE). Запись с устаревшей версией не
+используется.
+
+Запись свежая ADS_PAGE_CACHE_TIMEOUT секунд, затем еще
+ADS_PAGE_CACHE_STALE_TIMEOUT секунд отдается устаревшей
+(stale-while-revalidate): страницу пересчитывает только запрос,
+получивший блокировку, остальные получают старую копию. Если копии нет
+(первый запрос или изменились версии), остальные до
+ADS_PAGE_CACHE_LOCK_WAIT секунд ждут запись владельца блокировки, а
+затем строят страницу сами, не сохраняя ее.
+
+CSRF-токен формы выбора языка в закэшированной странице заменяется
+токеном текущего запроса. ETag списка зависит от CSRF-cookie клиента
+(conditional.page_extra), поэтому из кэша страница отдается только с
+Last-Modified.
+"""
+import hashlib
+import logging
+import re
+import time
+from functools import wraps
+from typing import Iterable
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils import translation
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from .cache import OWNERS_SCOPE, bump_version, get_version, model_scope
+from .models import Ad
+
+logger = logging.getLogger(__name__)
+
+PAGE_KEY_PREFIX = 'ads:page'
+ADS_PAGE_CATEGORY_SCOPE = 'ads.page.category'
+
+# Интервал проверки записи при ожидании владельца блокировки, секунды
+LOCK_POLL_INTERVAL = 0.05
+
+# Заголовки, которые не сохраняются вместе со страницей
+SKIPPED_HEADERS = {'etag', 'set-cookie', 'x-page-cache'}
+
+CSRF_INPUT_RE = re.compile(
+    rb'(name="csrfmiddlewaretoken" value=")[^"]*(")'
+)
+
+
+def category_scope(category: str) -> str:
+    return f'{ADS_PAGE_CATEGORY_SCOPE}.{category}'
+
+
+def invalidate_category_pages(*categories: str) -> None:
+    """
+    Сбрасывает страницы с фильтром по категориям после фиксации
+    транзакции: иначе параллельный запрос сохранил бы старые данные
+    под новой версией
+    """
+    categories = {category for category in categories if category}
+    if not categories:
+        return
+
+    def bump():
+        for category in categories:
+            bump_version(category_scope(category))
+    transaction.on_commit(bump)
+
+
+def normalize_params(request, allowed: Iterable[str]):
+    """
+    Отсортированные непустые параметры запроса или None, если страницу
+    нельзя кэшировать
+    """
+    allowed = set(allowed)
+    params = []
+    for name, values in request.GET.lists():
+        if name not in allowed or len(values) > 1:
+            return None
+        value = values[0].strip()
+        if value:
+            params.append((name, value))
+    return tuple(sorted(params))
+
+
+def page_versions(params) -> tuple:
+    category = dict(params).get('category')
+    scope = category_scope(category) if category else model_scope(Ad)
+    return get_version(scope), get_version(OWNERS_SCOPE)
+
+
+def page_key(params) -> str:
+    digest = hashlib.md5(repr(params).encode()).hexdigest()
+    return f'{PAGE_KEY_PREFIX}:{translation.get_language()}:{digest}'
+
+
+def store_page(key, response, versions) -> None:
+    now = time.time()
+    fresh = settings.ADS_PAGE_CACHE_TIMEOUT
+    stale = settings.ADS_PAGE_CACHE_STALE_TIMEOUT
+    cache.set(key, {
+        'versions': versions,
+        'fresh_until': now + fresh,
+        'content': response.content,
+        'headers': [
+            (name, value) for name, value in response.items()
+            if name.lower() not in SKIPPED_HEADERS
+        ],
+    }, timeout=fresh + stale)
+
+
+def wait_for_page(key, versions):
+    """
+    Запись с версиями versions, которую сохранит владелец блокировки,
+    или None, если она не появилась за ADS_PAGE_CACHE_LOCK_WAIT секунд
+    """
+    deadline = time.monotonic() + settings.ADS_PAGE_CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None and entry['versions'] == versions:
+            return entry
+    return None
+
+
+def replay_page(request, entry, state: str):
+    """Ответ из записи кэша с CSRF-токеном текущего запроса"""
+    token = get_token(request).encode()
+    content = CSRF_INPUT_RE.sub(
+        lambda match: match.group(1) + token + match.group(2),
+        entry['content']
+    )
+    response = HttpResponse(content)
+    for name, value in entry['headers']:
+        response[name] = value
+    response['X-Page-Cache'] = state
+
+    last_modified = response.get('Last-Modified')
+    if last_modified:
+        conditional = get_conditional_response(
+            request, last_modified=parse_http_date_safe(last_modified),
+            response=response
+        )
+        if conditional is not response:
+            conditional['X-Page-Cache'] = state
+            return conditional
+    return response
+
+
+def anonymous_page_cache(params: Iterable[str]):
+    """
+    Декоратор представления страницы-списка: кэширует ответы анонимным
+    пользователям. params - параметры запроса, от которых зависит
+    страница.
+    """
+    params = tuple(params)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            normalized = None
+            if (request.method == 'GET' and
+                    not request.user.is_authenticated and
+                    not len(messages.get_messages(request))):
+                normalized = normalize_params(request, params)
+            if normalized is None:
+                return view(request, *args, **kwargs)
+
+            key = page_key(normalized)
+            versions = page_versions(normalized)
+            entry = cache.get(key)
+            if entry is not None and entry['versions'] != versions:
+                # Категория изменилась: запись больше не используется
+                entry = None
+
+            if entry is not None and time.time() < entry['fresh_until']:
+                return replay_page(request, entry, 'hit')
+
+            lock = f'{key}:lock'
+            if not cache.add(lock, 1, settings.ADS_PAGE_CACHE_LOCK_TIMEOUT):
+                # Страницу уже пересчитывает другой запрос
+                if entry is not None:
+                    return replay_page(request, entry, 'stale')
+                entry = wait_for_page(key, versions)
+                if entry is not None:
+                    return replay_page(request, entry, 'hit')
+                response = view(request, *args, **kwargs)
+                response['X-Page-Cache'] = 'miss'
+                return response
+
+            try:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200:
+                    store_page(key, response, versions)
+            finally:
+                cache.delete(lock)
+            if entry is not None:
+                logger.debug(f'Page cache entry {key} revalidated')
+                response['X-Page-Cache'] = 'revalidated'
+            else:
+                response['X-Page-Cache'] = 'miss'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,204 @@
+"""
+Keyset (курсорная) пагинация.
+
+Вместо OFFSET и COUNT(*) страница выбирается условием по значениям полей
+сортировки последней показанной строки, например ``(created_at, id)``.
+Стоимость любой страницы одинакова и равна стоимости первой. Курсор -
+непрозрачный токен (base64 от JSON), хранящий значения ключа, направление
+и сортировку, для которой он был выдан.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """Курсор поврежден или выдан для другой сортировки"""
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f'Unsupported cursor value: {value!r}')
+
+
+def get_keyset_ordering(queryset) -> list:
+    """
+    Возвращает сортировку queryset в виде списка имен полей с уникальным
+    завершающим полем (первичным ключом).
+    """
+    pk_name = queryset.model._meta.pk.name
+    ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+
+    result = []
+    for field in ordering:
+        if not isinstance(field, str) or '__' in field or field == '?':
+            raise ValueError(
+                f'Keyset pagination does not support ordering by {field!r}'
+            )
+        name = field.lstrip('-')
+        if name == 'pk':
+            field = field.replace('pk', pk_name)
+        result.append(field)
+
+    if not any(field.lstrip('-') == pk_name for field in result):
+        descending = bool(result) and result[-1].startswith('-')
+        result.append(f'-{pk_name}' if descending else pk_name)
+    return result
+
+
+def encode_cursor(values, ordering, reverse=False) -> str:
+    payload = {'v': list(values), 'o': ordering}
+    if reverse:
+        payload['r'] = 1
+    raw = json.dumps(payload, default=_json_default, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token: str, ordering):
+    """Возвращает (values, reverse) или выбрасывает InvalidCursor"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values, cursor_ordering = payload['v'], payload['o']
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise InvalidCursor('Invalid cursor')
+
+    if cursor_ordering != ordering or len(values) != len(ordering):
+        raise InvalidCursor('Cursor does not match ordering')
+    return values, bool(payload.get('r'))
+
+
+def _flip(field: str) -> str:
+    return field[1:] if field.startswith('-') else f'-{field}'
+
+
+def keyset_filter(queryset, ordering, values):
+    """
+    Оставляет строки, идущие после ключа values в порядке ordering:
+    (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y).
+    Дополнительное условие a >= x по первому полю позволяет СУБД
+    использовать диапазонное сканирование индекса.
+    """
+    condition = Q()
+    equal = Q()
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= equal & Q(**{f'{name}__{lookup}': value})
+        equal &= Q(**{name: value})
+
+    first, first_value = ordering[0], values[0]
+    first_lookup = 'lte' if first.startswith('-') else 'gte'
+    return queryset.filter(
+        Q(**{f'{first.lstrip("-")}__{first_lookup}': first_value}),
+        condition
+    )
+
+
+def _row_value(row, name):
+    if isinstance(row, dict):
+        return row[name]
+    return getattr(row, name)
+
+
+class KeysetPage:
+    """Страница keyset пагинации (совместима с шаблонами списков)"""
+
+    def __init__(self, object_list, has_next, has_previous,
+                 next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self.object_list)} items>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+
+class KeysetPaginator:
+    """
+    Пагинатор по ключу сортировки queryset.
+    По аналогии с django.core.paginator.Paginator: page() строгий,
+    get_page() при неверном курсоре возвращает первую страницу.
+    """
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = get_keyset_ordering(queryset)
+
+    def _key(self, row):
+        return [_row_value(row, field.lstrip('-')) for field in self.ordering]
+
+    def page(self, cursor=None) -> KeysetPage:
+        values, reverse = (None, False)
+        if cursor:
+            values, reverse = decode_cursor(cursor, self.ordering)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [_flip(field) for field in self.ordering]
+
+        queryset = self.queryset.order_by(*ordering)
+        if values is not None:
+            queryset = keyset_filter(queryset, ordering, values)
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = encode_cursor(self._key(rows[-1]), self.ordering)
+        if rows and has_previous:
+            previous_cursor = encode_cursor(
+                self._key(rows[0]), self.ordering, reverse=True
+            )
+        return KeysetPage(rows, has_next and bool(next_cursor),
+                          has_previous and bool(previous_cursor),
+                          next_cursor, previous_cursor)
+
+    def first_page(self, rows, has_next: bool) -> KeysetPage:
+        """Первая страница из уже выбранных строк (например, снимка)"""
+        next_cursor = None
+        if rows and has_next:
+            next_cursor = encode_cursor(self._key(rows[-1]), self.ordering)
+        return KeysetPage(rows, bool(next_cursor), False, next_cursor)
+
+    def get_page(self, cursor=None) -> KeysetPage:
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page(None)
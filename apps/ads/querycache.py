@@ -0,0 +1,278 @@
+"""
+Кэш результатов запросов ORM.
+
+Включается явно: ``Ad.objects.filter(...).cached()``. Признак
+сохраняется при дальнейших filter()/values()/срезах, а закэшированным
+становится результат каждого выполненного запроса выборки строк
+(count(), exists() и агрегаты выполняются как обычно).
+
+Ключ - отпечаток скомпилированного SQL с параметрами, базы данных и
+вида результата (объекты, values(), values_list()) вместе с версиями
+тегов:
+
+- тег таблицы - версия области модели (apps/ads/cache.py), ее
+  увеличивают post_save/post_delete и массовый update() этого
+  QuerySet - сразу и повторно после фиксации транзакции;
+- теги строк - ``cached(rows=[pk, ...])`` для выборки заранее
+  известных строк: запись зависит от версий этих строк (и массовых
+  изменений модели), а не от всей таблицы;
+- присоединенные select_related строки моделей register_joined_models
+  (пользователи-владельцы) тегируются по результату: запись хранит
+  версии строк, попавших в нее, и при чтении сверяет их.
+
+Кэширование запроса к таблице модели без тегов (см. register_models)
+вызывает ImproperlyConfigured: его результат нечем инвалидировать.
+Результаты хранятся в pickle, большие - сжатыми zlib. О каждом
+обращении к кэшу отправляется сигнал query_cache_lookup (метрики
+попаданий).
+"""
+import hashlib
+import logging
+import pickle
+import zlib
+from typing import Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, ImproperlyConfigured
+from django.db import connections, models
+from django.dispatch import Signal
+
+from .cache import (bump_versions, get_version, get_versions, model_scope,
+                    row_scope)
+
+logger = logging.getLogger(__name__)
+
+QUERY_KEY_PREFIX = 'ads:query'
+
+# sender - модель запроса; аргументы hit (bool) и key
+query_cache_lookup = Signal()
+
+# Таблицы моделей, изменения которых увеличивают версии тегов
+_tracked_tables = {}
+# Модели, которые попадают в кэш только через select_related
+_joined_models = set()
+
+
+def register_models(*models_to_track) -> None:
+    """Модели, версии которых поддерживает invalidate_model_cache"""
+    for model in models_to_track:
+        _tracked_tables[model._meta.db_table] = model
+
+
+def register_joined_models(*models_to_track) -> None:
+    """
+    Модели, строки которых кэшируются только вместе с другими
+    (select_related): тег - версии строк результата, а не таблицы
+    """
+    register_models(*models_to_track)
+    _joined_models.update(models_to_track)
+
+
+def bulk_scope(model) -> str:
+    """Область массовых изменений модели (update() без сигналов)"""
+    return f'{model_scope(model)}:bulk'
+
+
+def query_tables(query, using: str, sql: str) -> set:
+    """
+    Таблицы запроса: соединения самого запроса и известные таблицы,
+    встречающиеся в SQL (подзапросы)
+    """
+    quote_name = connections[using].ops.quote_name
+    tables = {join.table_name for join in query.alias_map.values()}
+    tables.update(
+        table for table in _tracked_tables if quote_name(table) in sql
+    )
+    return tables
+
+
+def joined_tables(queryset, tables: set) -> set:
+    """
+    Таблицы моделей register_joined_models, которые присоединены только
+    select_related: строки из них есть в объектах результата
+    """
+    if (queryset._iterable_class is not models.query.ModelIterable or
+            not queryset.query.select_related):
+        return set()
+    query = queryset.query.chain()
+    query.select_related = False
+    sql, _ = query.get_compiler(using=queryset.db).as_sql()
+    return {
+        table for table in tables - query_tables(query, queryset.db, sql)
+        if _tracked_tables[table] in _joined_models
+    }
+
+
+def result_row_scopes(result: list) -> list:
+    """Теги строк моделей register_joined_models в объектах результата"""
+    scopes = set()
+    stack = [obj for obj in result if isinstance(obj, models.Model)]
+    while stack:
+        obj = stack.pop()
+        for related in obj._state.fields_cache.values():
+            if not isinstance(related, models.Model):
+                continue
+            model = related._meta.concrete_model
+            if model in _joined_models:
+                scopes.add(row_scope(model, related.pk))
+            stack.append(related)
+    return sorted(scopes)
+
+
+def plan_query(queryset) -> Optional[Tuple[str, set]]:
+    """
+    (ключ результата, таблицы с тегами строк результата) или None, если
+    запрос нельзя кэшировать
+    """
+    if queryset.query.select_for_update:
+        return None
+    # Компиляция копии: select_related добавляет соединения в запрос
+    query = queryset.query.chain()
+    try:
+        sql, params = query.get_compiler(using=queryset.db).as_sql()
+    except EmptyResultSet:
+        return None
+
+    tables = query_tables(query, queryset.db, sql)
+    untracked = tables - set(_tracked_tables)
+    if untracked:
+        raise ImproperlyConfigured(
+            f'Cannot cache a query over untracked tables: '
+            f'{", ".join(sorted(untracked))}'
+        )
+
+    model = queryset.model
+    rows = queryset._query_cache_rows
+    joined = joined_tables(queryset, tables)
+    scopes = []
+    for table in sorted(tables - joined):
+        tracked = _tracked_tables[table]
+        if rows is not None and tracked is model:
+            scopes.append(bulk_scope(model))
+            scopes.extend(row_scope(model, pk) for pk in rows)
+        else:
+            scopes.append(model_scope(tracked))
+
+    fingerprint = (
+        queryset.db, sql, params, queryset._iterable_class.__qualname__,
+        queryset._fields, [(scope, get_version(scope)) for scope in scopes],
+    )
+    digest = hashlib.md5(
+        repr(fingerprint).encode(), usedforsecurity=False
+    ).hexdigest()
+    return f'{QUERY_KEY_PREFIX}:{model._meta.label_lower}:{digest}', joined
+
+
+def get_cache_key(queryset) -> Optional[str]:
+    """Ключ результата запроса или None, если его нельзя кэшировать"""
+    plan = plan_query(queryset)
+    return None if plan is None else plan[0]
+
+
+def dump_result(result: list, row_versions: Optional[dict] = None):
+    """(сжат ли, pickle результата, версии тегов строк результата)"""
+    data = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+    if len(data) >= settings.ADS_QUERY_CACHE_COMPRESS_MIN_SIZE:
+        return True, zlib.compress(data), row_versions
+    return False, data, row_versions
+
+
+def load_result(stored) -> list:
+    compressed, data, _ = stored
+    if compressed:
+        data = zlib.decompress(data)
+    return pickle.loads(data)
+
+
+class CachedQuerySet(models.QuerySet):
+    """QuerySet с кэшированием результатов по cached()"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._query_cache_timeout = None
+        self._query_cache_enabled = False
+        self._query_cache_rows = None
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._query_cache_enabled = self._query_cache_enabled
+        clone._query_cache_timeout = self._query_cache_timeout
+        clone._query_cache_rows = self._query_cache_rows
+        return clone
+
+    def cached(self, timeout: Optional[int] = None,
+               rows: Optional[Iterable] = None):
+        """
+        Кэширует результаты запросов на timeout секунд (по умолчанию
+        ADS_QUERY_CACHE_TIMEOUT). rows - первичные ключи строк выборки,
+        если она ограничена ими.
+        """
+        clone = self._chain()
+        clone._query_cache_enabled = True
+        clone._query_cache_timeout = timeout
+        clone._query_cache_rows = (
+            None if rows is None else tuple(sorted(set(rows)))
+        )
+        return clone
+
+    def uncached(self):
+        """Отключает кэширование, включенное cached()"""
+        clone = self._chain()
+        clone._query_cache_enabled = False
+        return clone
+
+    def _fetch_all(self):
+        if self._result_cache is None and self._query_cache_enabled:
+            self._result_cache = self._fetch_cached()
+        super()._fetch_all()
+
+    def _fetch_cached(self) -> Optional[list]:
+        plan = plan_query(self)
+        if plan is None:
+            return None
+        key, joined = plan
+
+        stored = cache.get(key)
+        if stored is not None and stored[2]:
+            # Присоединенная строка изменилась после записи результата
+            if get_versions(stored[2]) != stored[2]:
+                stored = None
+        query_cache_lookup.send(
+            sender=self.model, hit=stored is not None, key=key
+        )
+        if stored is not None:
+            return load_result(stored)
+
+        # Версии таблиц до запроса: строка, измененная во время него,
+        # могла быть прочитана до фиксации уже под новой версией
+        table_scopes = [
+            model_scope(_tracked_tables[table]) for table in sorted(joined)
+        ]
+        table_versions = get_versions(table_scopes)
+        result = list(self._iterable_class(self))
+        row_versions = None
+        if joined:
+            row_versions = get_versions(result_row_scopes(result))
+            if get_versions(table_scopes) != table_versions:
+                return result
+        timeout = self._query_cache_timeout
+        if timeout is None:
+            timeout = settings.ADS_QUERY_CACHE_TIMEOUT
+        try:
+            cache.set(key, dump_result(result, row_versions), timeout)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            # Например, namedtuple из values_list(named=True)
+            logger.debug(f'Query result for {key} is not cacheable: {e}')
+        return result
+
+    def update(self, **kwargs):
+        rows = super().update(**kwargs)
+        if rows:
+            # Массовое обновление не отправляет post_save
+            scope = model_scope(self.model)
+            bump_versions(
+                scope, bulk_scope(self.model), using=self.db,
+                changed=[scope]
+            )
+        return rows
@@ -0,0 +1,314 @@
+"""
+Полнотекстовый поиск по объявлениям.
+
+В PostgreSQL используется колонка ``Ad.search_vector`` (tsvector с GIN
+индексом), которую поддерживает триггер из миграции ``0003``. Заголовок
+имеет вес A, описание - вес B. В SQLite (тестовое окружение) используется
+виртуальная таблица FTS5, синхронизируемая триггерами.
+
+Нечеткий поиск (с опечатками) построен на триграммах: pg_trgm с GIN
+индексами в PostgreSQL и эквивалентный расчет на Python для SQLite.
+"""
+import logging
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, FloatField, Q, QuerySet, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast, Greatest
+from django.utils import translation
+
+logger = logging.getLogger(__name__)
+
+# Маркеры подсветки совпадений. Символы из Private Use Area не встречаются
+# в обычном тексте, поэтому их можно безопасно заменить на <mark> после
+# экранирования (см. фильтр ``highlight`` в search_tags).
+HIGHLIGHT_START = '\ue000'
+HIGHLIGHT_STOP = '\ue001'
+
+SQLITE_FTS_TABLE = 'ads_ad_fts'
+
+# Вес заголовка относительно описания для bm25 в SQLite
+SQLITE_TITLE_WEIGHT = 10.0
+SQLITE_DESCRIPTION_WEIGHT = 1.0
+
+# Порог сходства, как pg_trgm.similarity_threshold по умолчанию
+TRIGRAM_THRESHOLD = 0.3
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+_TRIGRAM_WORD_RE = re.compile(r'[^\W_]+', re.UNICODE)
+
+
+def parse_terms(query: str) -> list:
+    """Разбивает поисковую строку на слова, отбрасывая спецсимволы"""
+    return _TERM_RE.findall(query or '')
+
+
+def get_search_config(language: str = None) -> str:
+    """Возвращает конфигурацию tsvector для языка"""
+    language = (language or translation.get_language()
+                or settings.LANGUAGE_CODE)
+    configs = settings.ADS_SEARCH_CONFIGS
+    return configs.get(language.split('-')[0],
+                       configs.get(settings.LANGUAGE_CODE, 'simple'))
+
+
+class IcontainsSearchBackend:
+    """Запасной вариант поиска для СУБД без полнотекстового индекса"""
+
+    def search(self, queryset: QuerySet, query: str,
+               language: str = None) -> QuerySet:
+        terms = parse_terms(query)
+        if not terms:
+            return queryset
+        for term in terms:
+            queryset = queryset.filter(
+                Q(title__icontains=term) | Q(description__icontains=term)
+            )
+        return queryset.annotate(
+            search_rank=Value(0.0, output_field=FloatField()),
+            search_headline=Value('')
+        )
+
+
+class PostgresSearchBackend:
+    """Поиск по tsvector колонке с ранжированием ts_rank"""
+
+    def search(self, queryset: QuerySet, query: str,
+               language: str = None) -> QuerySet:
+        from django.contrib.postgres.search import (SearchHeadline,
+                                                    SearchQuery, SearchRank)
+
+        terms = parse_terms(query)
+        if not terms:
+            return queryset
+
+        config = get_search_config(language)
+        # Префиксный поиск по каждому слову: поиск работает "по мере ввода"
+        raw_query = ' & '.join(f'{term}:*' for term in terms)
+        search_query = SearchQuery(raw_query, search_type='raw', config=config)
+
+        return queryset.filter(search_vector=search_query).annotate(
+            # float8, чтобы значение ранга без потерь проходило через курсор
+            search_rank=Cast(
+                SearchRank('search_vector', search_query), FloatField()
+            ),
+            search_headline=SearchHeadline(
+                'description', search_query, config=config,
+                start_sel=HIGHLIGHT_START, stop_sel=HIGHLIGHT_STOP,
+                max_words=25, min_words=10,
+            ),
+        ).order_by('-search_rank', '-created_at')
+
+
+class SQLiteSearchBackend:
+    """Поиск через виртуальную таблицу FTS5 с ранжированием bm25"""
+
+    def search(self, queryset: QuerySet, query: str,
+               language: str = None) -> QuerySet:
+        terms = parse_terms(query)
+        if not terms:
+            return queryset
+
+        match = ' '.join('"{}"*'.format(term) for term in terms)
+        table = SQLITE_FTS_TABLE
+        correlated = (
+            f'FROM {table} WHERE {table} MATCH %s '
+            f'AND {table}.rowid = "ads_ad"."id"'
+        )
+
+        return queryset.filter(
+            id__in=RawSQL(
+                f'SELECT rowid FROM {table} WHERE {table} MATCH %s', [match]
+            )
+        ).annotate(
+            # bm25 возвращает отрицательные значения: меньше - лучше
+            search_rank=RawSQL(
+                f'SELECT -bm25({table}, {SQLITE_TITLE_WEIGHT}, '
+                f'{SQLITE_DESCRIPTION_WEIGHT}) {correlated}',
+                [match], output_field=FloatField()
+            ),
+            search_headline=RawSQL(
+                f"SELECT snippet({table}, 1, %s, %s, '…', 25) {correlated}",
+                [HIGHLIGHT_START, HIGHLIGHT_STOP, match]
+            ),
+        ).order_by('-search_rank', '-created_at')
+
+
+def sqlite_fts_available() -> bool:
+    """Проверяет, что таблица FTS5 создана"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+            [SQLITE_FTS_TABLE]
+        )
+        return cursor.fetchone() is not None
+
+
+def get_search_backend():
+    """Выбирает реализацию поиска по текущей СУБД"""
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    if connection.vendor == 'sqlite' and sqlite_fts_available():
+        return SQLiteSearchBackend()
+    return IcontainsSearchBackend()
+
+
+def search_queryset(queryset: QuerySet, query: str,
+                    language: str = None) -> QuerySet:
+    """
+    Фильтрует объявления по поисковому запросу.
+    Результат аннотирован полями search_rank и search_headline
+    и отсортирован по релевантности.
+    """
+    return get_search_backend().search(queryset, query, language)
+
+
+def install_sqlite_fts(using_connection) -> None:
+    """
+    Создает таблицу FTS5 и триггеры синхронизации с ads_ad.
+    Вызывается по сигналу post_migrate, поэтому работает и в тестах
+    с отключенными миграциями.
+    """
+    if using_connection.vendor != 'sqlite':
+        return
+
+    table = SQLITE_FTS_TABLE
+    with using_connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+            [table]
+        )
+        if cursor.fetchone() is not None:
+            return
+
+        try:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE {table} USING fts5("
+                f"title, description, content='ads_ad', content_rowid='id', "
+                f"tokenize='unicode61 remove_diacritics 2')"
+            )
+        except Exception as e:
+            logger.warning(f"SQLite FTS5 is unavailable: {e}")
+            return
+
+        cursor.execute(
+            f"CREATE TRIGGER {table}_ai AFTER INSERT ON ads_ad BEGIN "
+            f"INSERT INTO {table}(rowid, title, description) "
+            f"VALUES (new.id, new.title, new.description); END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER {table}_ad AFTER DELETE ON ads_ad BEGIN "
+            f"INSERT INTO {table}({table}, rowid, title, description) "
+            f"VALUES ('delete', old.id, old.title, old.description); END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER {table}_au AFTER UPDATE OF title, description "
+            f"ON ads_ad BEGIN "
+            f"INSERT INTO {table}({table}, rowid, title, description) "
+            f"VALUES ('delete', old.id, old.title, old.description); "
+            f"INSERT INTO {table}(rowid, title, description) "
+            f"VALUES (new.id, new.title, new.description); END"
+        )
+        cursor.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+
+    logger.info("SQLite FTS5 index for ads created")
+
+
+def trigrams(text: str) -> set:
+    """
+    Множество триграмм строки по правилам pg_trgm: слова в нижнем регистре
+    дополняются двумя пробелами слева и одним справа.
+    """
+    result = set()
+    for word in _TRIGRAM_WORD_RE.findall((text or '').lower()):
+        padded = f'  {word} '
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+def trigram_similarity(first: str, second: str) -> float:
+    """Аналог функции similarity() из pg_trgm"""
+    first_set, second_set = trigrams(first), trigrams(second)
+    if not first_set or not second_set:
+        return 0.0
+    return len(first_set & second_set) / len(first_set | second_set)
+
+
+def fuzzy_search(queryset: QuerySet, fields, query: str,
+                 threshold: float = TRIGRAM_THRESHOLD) -> QuerySet:
+    """
+    Поиск с учетом опечаток по полям fields: строки, содержащие запрос
+    (на PostgreSQL - похожее на него слово) или похожие на него по
+    триграммам. Результат аннотирован полем similarity и отсортирован по
+    убыванию сходства.
+    """
+    query = (query or '').strip()
+    if not query:
+        return queryset
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import (TrigramSimilarity,
+                                                    TrigramWordSimilarity)
+
+        # Операторы % и <% обслуживаются GIN индексом с gin_trgm_ops, в
+        # отличие от icontains (UPPER(...) LIKE): вхождение запроса в
+        # текст находит сходство со словами (trigram_word_similar)
+        similar = Q()
+        scores = []
+        for field in fields:
+            similar |= Q(**{f'{field}__trigram_similar': query})
+            similar |= Q(**{f'{field}__trigram_word_similar': query})
+            scores.append(TrigramSimilarity(field, query))
+            scores.append(TrigramWordSimilarity(query, field))
+        return queryset.filter(similar).annotate(
+            similarity=Greatest(*scores)
+        ).order_by('-similarity')
+
+    # Запасной вариант для SQLite: сходство считается на Python
+    lowered = query.lower()
+    scores = {}
+    for pk, *values in queryset.values_list('pk', *fields):
+        values = [value or '' for value in values]
+        score = max(trigram_similarity(value, query) for value in values)
+        if any(lowered in value.lower() for value in values):
+            score = max(score, threshold)
+        if score >= threshold:
+            scores[pk] = score
+
+    if not scores:
+        return queryset.none()
+    return queryset.filter(pk__in=scores).annotate(
+        similarity=Case(
+            *[When(pk=pk, then=Value(score)) for pk, score in scores.items()],
+            output_field=FloatField()
+        )
+    ).order_by('-similarity')
+
+
+def suggest(queryset: QuerySet, field: str, query: str,
+            threshold: float = TRIGRAM_THRESHOLD):
+    """
+    Подсказка "возможно, вы имели в виду": наиболее похожее на запрос
+    значение поля или None.
+    """
+    query = (query or '').strip()
+    if not query:
+        return None
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        return queryset.filter(
+            **{f'{field}__trigram_similar': query}
+        ).annotate(
+            similarity=TrigramSimilarity(field, query)
+        ).order_by('-similarity').values_list(field, flat=True).first()
+
+    best, best_score = None, threshold
+    for value in queryset.values_list(field, flat=True).distinct():
+        score = trigram_similarity(value, query)
+        if score >= best_score and value.lower() != query.lower():
+            best, best_score = value, score
+    return best
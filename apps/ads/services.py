@@ -1,12 +1,24 @@
 import logging
-from typing import Optional, Tuple
+import random
+from collections import Counter
+from typing import Iterable, Optional, Tuple
 
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.db import IntegrityError, transaction
-from django.db.models import Q, QuerySet
+from django.db.models import Count, F, Q, QuerySet, Sum
+from django.utils import timezone
 
-from .models import Ad, ExchangeProposal
+from apps.users.services import UserStatsService
+
+from .loaders import get_loader, prime
+from .models import (Ad, AdListSnapshot, AdProposalCounter,
+                     ExchangeProposal)
+from .pagecache import invalidate_category_pages
+from .pagination import KeysetPage, KeysetPaginator
+from .search import search_queryset
+from .surrogate import ad_key, purge, purge_ad
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +33,14 @@ class AdService:
         logger.info(f"Creating ad for user {user.username}: {title}")
 
         with transaction.atomic():
+            # Блокировка строки статистики сериализует проверку квоты
+            stats = UserStatsService.lock(user)
+            quota = settings.ADS_MAX_ACTIVE_PER_USER
+            if quota and stats.ads_count >= quota:
+                raise ValidationError(
+                    f"Active ads limit reached (max {quota})"
+                )
+
             ad = Ad(
                 user=user,
                 title=title.strip(),
@@ -30,49 +50,129 @@ class AdService:
                 image_url=image_url
             )
             ad.full_clean()  # Run model validation
-            ad.save()
+            AdService._insert(ad)
 
         logger.info(f"Ad created successfully with ID: {ad.id}")
         return ad
 
+    @staticmethod
+    def _insert(ad: Ad) -> None:
+        """Сохраняет новое объявление, статистику, снимки и кэши"""
+        ad.save()
+        UserStatsService.adjust(ad.user_id, ads_count=1)
+        AdSnapshotService.ad_changed(added=(ad.category, ad.condition))
+        purge_ad(ad.id, ad.category, listed=True)
+        invalidate_category_pages(ad.category)
+
+    @staticmethod
+    def _update(ad: Ad, **kwargs) -> None:
+        """Сохраняет изменения объявления, снимки и кэши"""
+        # Прежние значения берем из БД: ModelForm уже записал новые в
+        # экземпляр
+        previous = Ad.objects.select_for_update().values_list(
+            'category', 'condition'
+        ).get(pk=ad.pk)
+        for field, value in kwargs.items():
+            if hasattr(ad, field):
+                setattr(ad, field, value)
+
+        ad.full_clean()
+        ad.save()
+        if (ad.category, ad.condition) != previous:
+            AdSnapshotService.ad_changed(
+                added=(ad.category, ad.condition), removed=previous
+            )
+        purge_ad(ad.id, previous[0], ad.category)
+        invalidate_category_pages(previous[0], ad.category)
+
     @staticmethod
     def update_ad(ad: Ad, user: User, **kwargs) -> Ad:
         """ Обновление существующего объявления """
 
-        if ad.user != user:
+        if ad.user_id != user.id:
             raise PermissionError("You can only edit your own ads")
 
         logger.info(f"Updating ad {ad.id} by user {user.username}")
 
         with transaction.atomic():
-            for field, value in kwargs.items():
-                if hasattr(ad, field):
-                    setattr(ad, field, value)
-
-            ad.full_clean()
-            ad.save()
+            AdService._update(ad, **kwargs)
 
         logger.info(f"Ad {ad.id} updated successfully")
         return ad
 
+    @staticmethod
+    def save_ad(ad: Ad) -> Ad:
+        """
+        Создание или изменение объявления без проверок владельца и
+        квоты (администрирование)
+        """
+        logger.info(f"Saving ad {ad.pk} without owner checks")
+
+        with transaction.atomic():
+            if ad.pk is None:
+                AdService._insert(ad)
+            else:
+                AdService._update(ad)
+        return ad
+
+    @staticmethod
+    def change_owner(ad: Ad, new_owner: User) -> Ad:
+        """ Передача объявления другому пользователю (администрирование) """
+
+        logger.info(f"Changing owner of ad {ad.id} to {new_owner.username}")
+
+        with transaction.atomic():
+            old_user_id = ad.user_id
+            ad.user = new_owner
+            ad.save(update_fields=['user', 'updated_at'])
+            # Участники предложений и статистика обоих пользователей
+            ExchangeProposalService.sync_participants(ad)
+            UserStatsService.recompute([old_user_id, new_owner.id])
+            purge_ad(ad.id)
+            invalidate_category_pages(ad.category)
+
+        return ad
+
     @staticmethod
     def delete_ad(ad: Ad, user: User) -> None:
         """ Удаление объявления """
 
-        if ad.user != user:
+        if ad.user_id != user.id:
             raise PermissionError("You can only delete your own ads")
 
         logger.info(f"Deleting ad {ad.id} by user {user.username}")
 
         with transaction.atomic():
             # Delete related exchange proposals first
-            ExchangeProposal.objects.filter(
+            proposals = ExchangeProposal.objects.filter(
                 Q(ad_sender=ad) | Q(ad_receiver=ad)
-            ).delete()
+            )
+            # Счетчики удаляемого объявления удалятся каскадно,
+            # уменьшаем только счетчики второй стороны
+            ProposalCounterService.proposals_removed(
+                proposals.values_list(
+                    'ad_sender_id', 'ad_receiver_id', 'status'
+                ),
+                exclude_ad_id=ad.id
+            )
+            ad_id = ad.id
+            proposals.delete()
             ad.delete()
+            UserStatsService.adjust(ad.user_id, ads_count=-1)
+            AdSnapshotService.ad_changed(removed=(ad.category, ad.condition))
+            purge_ad(ad_id, ad.category, listed=True)
+            invalidate_category_pages(ad.category)
 
         logger.info(f"Ad {ad.id} deleted successfully")
 
+    @staticmethod
+    def delete_user_ads(user: User) -> None:
+        """ Удаление всех объявлений пользователя """
+
+        with transaction.atomic():
+            for ad in Ad.objects.filter(user=user):
+                AdService.delete_ad(ad, user)
+
     @staticmethod
     def search_ads(query: Optional[str] = None,
                    category: Optional[str] = None,
@@ -81,14 +181,15 @@ class AdService:
         """ Поиск объявлений с фильтрами """
 
         queryset = Ad.objects.select_related('user').order_by('-created_at')
+        if not query:
+            # Списки без поиска одинаковы для многих запросов
+            queryset = queryset.cached()
 
         if exclude_user:
             queryset = queryset.exclude(user=exclude_user)
 
         if query:
-            queryset = queryset.filter(
-                Q(title__icontains=query) | Q(description__icontains=query)
-            )
+            queryset = search_queryset(queryset, query)
 
         if category:
             queryset = queryset.filter(category=category)
@@ -99,6 +200,169 @@ class AdService:
         return queryset
 
 
+class AdSnapshotService:
+    """
+    Класс сервиса для снимков первых страниц списка объявлений
+    (AdListSnapshot). ad_changed вызывается внутри транзакции AdService,
+    а снимки обновляются после ее фиксации: блокировка общего снимка
+    ':' не держится до конца каждой записи объявления. Изменения,
+    потерянные при сбое между фиксацией и обновлением, исправляет
+    команда rebuild_ad_snapshots.
+    """
+
+    @staticmethod
+    def key(category: Optional[str] = None,
+            condition: Optional[str] = None) -> str:
+        return f'{category or ""}:{condition or ""}'
+
+    @staticmethod
+    def _queryset(category: str, condition: str) -> QuerySet[Ad]:
+        queryset = Ad.objects.all()
+        if category:
+            queryset = queryset.filter(category=category)
+        if condition:
+            queryset = queryset.filter(condition=condition)
+        return queryset
+
+    @staticmethod
+    def _first_ids(queryset: QuerySet[Ad]) -> list:
+        """id первой страницы в порядке списка (индекс по created_at)"""
+        return list(
+            queryset.order_by('-created_at', '-id')
+            .values_list('id', flat=True)[:settings.ADS_LIST_SNAPSHOT_SIZE]
+        )
+
+    @staticmethod
+    def _build(key: str) -> AdListSnapshot:
+        category, condition = key.split(':')
+        queryset = AdSnapshotService._queryset(category, condition)
+        return AdListSnapshot(
+            key=key, category=category, condition=condition,
+            ad_ids=AdSnapshotService._first_ids(queryset),
+            total=queryset.count()
+        )
+
+    @staticmethod
+    def ad_changed(added: Optional[Tuple[str, str]] = None,
+                   removed: Optional[Tuple[str, str]] = None) -> None:
+        """
+        Обновляет снимки после изменения объявления: added - (категория,
+        состояние) списков, в которых объявление появилось, removed -
+        исчезло. После фиксации транзакции количество меняется на
+        разницу, первая страница перечитывается по индексу только в
+        затронутых снимках.
+        """
+        deltas = Counter()
+        for pair, delta in ((added, 1), (removed, -1)):
+            if pair is None:
+                continue
+            category, condition = pair
+            for key_category in ('', category):
+                for key_condition in ('', condition):
+                    deltas[AdSnapshotService.key(
+                        key_category, key_condition
+                    )] += delta
+        # Снимки, где объявление было и осталось, не меняются
+        changes = sorted(
+            (key, delta) for key, delta in deltas.items() if delta
+        )
+        if not changes:
+            return
+
+        def refresh():
+            # Постоянный порядок блокировок исключает взаимные блокировки
+            for key, delta in changes:
+                AdSnapshotService._refresh(key, delta)
+        transaction.on_commit(refresh)
+
+    @staticmethod
+    def _refresh(key: str, delta: int) -> None:
+        """
+        Применяет разницу к снимку key и перечитывает его первую
+        страницу в отдельной короткой транзакции
+        """
+        recount = False
+        with transaction.atomic():
+            snapshot = AdListSnapshot.objects.select_for_update().filter(
+                key=key
+            ).first()
+            if snapshot is None:
+                try:
+                    with transaction.atomic():
+                        AdSnapshotService._build(key).save(force_insert=True)
+                    return
+                except IntegrityError:
+                    # Снимок создан параллельно и мог уже учесть
+                    # изменение: количество пересчитывается
+                    snapshot = AdListSnapshot.objects.select_for_update().get(
+                        key=key
+                    )
+                    recount = True
+            queryset = AdSnapshotService._queryset(
+                snapshot.category, snapshot.condition
+            )
+            if recount:
+                snapshot.total = queryset.count()
+            else:
+                snapshot.total += delta
+            snapshot.ad_ids = AdSnapshotService._first_ids(queryset)
+            snapshot.save(update_fields=['total', 'ad_ids', 'updated_at'])
+
+    @staticmethod
+    def first_page(category: Optional[str], condition: Optional[str],
+                   per_page: int) -> Optional[Tuple[list, bool, int]]:
+        """
+        (объявления, есть ли следующая страница, количество) первой
+        страницы из снимка или None, если снимка нет или он не подходит
+        """
+        if per_page >= settings.ADS_LIST_SNAPSHOT_SIZE:
+            return None
+        snapshot = AdListSnapshot.objects.filter(
+            key=AdSnapshotService.key(category, condition)
+        ).first()
+        if snapshot is None:
+            return None
+
+        ids = snapshot.ad_ids[:per_page]
+        ads = Ad.objects.select_related('user').in_bulk(ids)
+        if len(ads) < len(ids):
+            # Объявление удалено в обход AdService: снимок пересчитывается
+            logger.warning(f"Ad list snapshot {snapshot.key} is stale")
+            snapshot = AdSnapshotService._build(snapshot.key)
+            snapshot.save()
+            ids = snapshot.ad_ids[:per_page]
+            ads = Ad.objects.select_related('user').in_bulk(ids)
+            if len(ads) < len(ids):
+                # Удалено параллельно с пересчетом
+                return None
+        return (
+            [ads[ad_id] for ad_id in ids],
+            len(snapshot.ad_ids) > per_page,
+            snapshot.total,
+        )
+
+    @staticmethod
+    def rebuild() -> int:
+        """Пересчитывает все снимки, возвращает количество исправленных"""
+        categories = [''] + [value for value, _ in Ad.CATEGORY_CHOICES]
+        conditions = [''] + [value for value, _ in Ad.CONDITION_CHOICES]
+        fixed = 0
+        with transaction.atomic():
+            existing = AdListSnapshot.objects.select_for_update().in_bulk()
+            for category in categories:
+                for condition in conditions:
+                    key = AdSnapshotService.key(category, condition)
+                    actual = AdSnapshotService._build(key)
+                    stored = existing.get(key)
+                    if (stored is not None and
+                            stored.ad_ids == actual.ad_ids and
+                            stored.total == actual.total):
+                        continue
+                    actual.save()
+                    fixed += 1
+        return fixed
+
+
 class ExchangeProposalService:
     """Класс сервиса для бизнес-логики предложений обмена"""
 
@@ -108,10 +372,11 @@ class ExchangeProposalService:
         """ Создание нового предложения обмена """
 
         # Business logic validations
-        if ad_sender.user != sender_user:
+        # Сравнение по id: владельцы объявлений не загружаются
+        if ad_sender.user_id != sender_user.id:
             raise ValidationError("You can only exchange your own ads")
 
-        if ad_receiver.user == sender_user:
+        if ad_receiver.user_id == sender_user.id:
             raise ValidationError(
                 "You cannot exchange with your own ads"
             )
@@ -119,6 +384,8 @@ class ExchangeProposalService:
         logger.info(
             f"Creating exchange proposal: {ad_sender.id} -> {ad_receiver.id}"
         )
+        # Счетчики и ответ берут объявления и владельцев из карты запроса
+        prime(sender_user, ad_sender, ad_receiver)
 
         try:
             with transaction.atomic():
@@ -129,6 +396,8 @@ class ExchangeProposalService:
                 )
                 proposal.full_clean()
                 proposal.save()
+                ProposalCounterService.proposal_created(proposal)
+            prime(proposal)
 
             logger.info(f"Exchange proposal created with ID: {proposal.id}")
             return proposal
@@ -151,7 +420,7 @@ class ExchangeProposalService:
                                status: str) -> ExchangeProposal:
         """ Обновление статуса предложения обмена """
 
-        if proposal.ad_receiver.user != user:
+        if proposal.receiver_user_id != user.id:
             raise PermissionError(
                 "Only the receiver can update proposal status"
             )
@@ -165,19 +434,164 @@ class ExchangeProposalService:
         )
 
         with transaction.atomic():
+            old_status = proposal.status
             proposal.status = status
             proposal.save()
+            ProposalCounterService.status_changed(proposal, old_status, status)
 
             # If accepted, reject all other proposals for the same receiver ad
             if status == 'accepted':
-                ExchangeProposal.objects.filter(
+                others = ExchangeProposal.objects.filter(
                     ad_receiver=proposal.ad_receiver,
                     status='pending'
-                ).exclude(id=proposal.id).update(status='rejected')
+                ).exclude(id=proposal.id)
+                rows = list(others.select_for_update().values_list(
+                    'ad_sender_id', 'ad_receiver_id', 'status'
+                ))
+                # update() не заполняет auto_now, а от updated_at
+                # зависят ETag и Last-Modified списков
+                others.update(status='rejected', updated_at=timezone.now())
+                ProposalCounterService.bulk_status_changed(rows, 'rejected')
 
         logger.info(f"Proposal {proposal.id} status updated to {status}")
         return proposal
 
+    @staticmethod
+    def save_proposal(proposal: ExchangeProposal) -> ExchangeProposal:
+        """
+        Создание или изменение предложения без проверок участников и
+        статуса (администрирование): прежнее состояние снимается со
+        счетчиков и статистики, новое добавляется
+        """
+        logger.info(f"Saving proposal {proposal.pk} without checks")
+
+        with transaction.atomic():
+            if proposal.pk is not None:
+                previous = ExchangeProposal.objects.select_for_update(
+                ).values_list(
+                    'ad_sender_id', 'ad_receiver_id', 'status'
+                ).get(pk=proposal.pk)
+                ProposalCounterService.proposals_removed([previous])
+            proposal.save()
+            ProposalCounterService.proposal_created(proposal)
+        return proposal
+
+    @staticmethod
+    def delete_proposal(proposal: ExchangeProposal) -> None:
+        """ Удаление предложения обмена """
+
+        logger.info(f"Deleting proposal {proposal.id}")
+
+        with transaction.atomic():
+            ProposalCounterService.proposals_removed([
+                (proposal.ad_sender_id, proposal.ad_receiver_id,
+                 proposal.status)
+            ])
+            proposal.delete()
+
+    @staticmethod
+    def participant_proposals(user: User,
+                              queryset: Optional[QuerySet] = None) -> QuerySet:
+        """
+        Предложения, где пользователь - отправитель или получатель.
+        UNION двух выборок по индексам вместо OR по двум JOIN.
+        """
+        if queryset is None:
+            queryset = ExchangeProposal.objects.all()
+        ids = ExchangeProposal.objects.filter(sender_user=user).order_by()
+        ids = ids.values('id').union(
+            ExchangeProposal.objects.filter(receiver_user=user)
+            .order_by().values('id')
+        )
+        return queryset.filter(id__in=ids)
+
+    @staticmethod
+    def sync_participants(ad: Ad) -> None:
+        """Обновляет владельца объявления в его предложениях обмена"""
+        ExchangeProposal.objects.filter(ad_sender=ad).exclude(
+            sender_user_id=ad.user_id
+        ).update(sender_user_id=ad.user_id)
+        ExchangeProposal.objects.filter(ad_receiver=ad).exclude(
+            receiver_user_id=ad.user_id
+        ).update(receiver_user_id=ad.user_id)
+
+    INBOX_BOXES = ('all', 'sent', 'received')
+
+    @staticmethod
+    def ad_proposals(ad: Ad, direction: str,
+                     status: Optional[str] = None) -> QuerySet:
+        """Полученные ('received') или отправленные ('sent') предложения"""
+        field = 'ad_receiver' if direction == 'received' else 'ad_sender'
+        queryset = ExchangeProposal.objects.filter(
+            **{field: ad}
+        ).select_related(
+            'ad_sender__user', 'ad_receiver__user',
+            'sender_user', 'receiver_user'
+        )
+        if status:
+            queryset = queryset.filter(status=status)
+        return queryset.order_by('-created_at', '-id')
+
+    @staticmethod
+    def inbox_queryset(user: User, box: str = 'all',
+                       status: Optional[str] = None) -> QuerySet:
+        """
+        Предложения пользователя для вкладки box ('all', 'sent',
+        'received'), новые первыми. 'all' - общий поток отправленных
+        и полученных.
+        """
+        queryset = ExchangeProposal.objects.select_related(
+            'ad_sender', 'ad_receiver', 'sender_user', 'receiver_user'
+        )
+        if box == 'sent':
+            queryset = queryset.filter(sender_user=user)
+        elif box == 'received':
+            queryset = queryset.filter(receiver_user=user)
+        else:
+            queryset = ExchangeProposalService.participant_proposals(
+                user, queryset
+            )
+        if status:
+            queryset = queryset.filter(status=status)
+        return queryset.order_by('-created_at', '-id')
+
+    @staticmethod
+    def inbox_counts(user: User, status: Optional[str] = None) -> dict:
+        """Количество предложений по вкладкам одним агрегирующим запросом"""
+        queryset = ExchangeProposalService.participant_proposals(user)
+        if status:
+            queryset = queryset.filter(status=status)
+        counts = queryset.aggregate(
+            sent=Count('id', filter=Q(sender_user=user)),
+            received=Count('id', filter=Q(receiver_user=user)),
+        )
+        counts['all'] = counts['sent'] + counts['received']
+        return counts
+
+    @staticmethod
+    def mark_directions(user: User, proposals) -> None:
+        """Проставляет proposal.direction: 'sent' или 'received'"""
+        for proposal in proposals:
+            proposal.direction = (
+                'sent' if proposal.sender_user_id == user.id else 'received'
+            )
+
+    @staticmethod
+    def get_inbox(user: User, box: str = 'all', status: Optional[str] = None,
+                  cursor: Optional[str] = None,
+                  per_page: int = 20) -> Tuple[KeysetPage, dict]:
+        """
+        Страница входящих/исходящих предложений (keyset пагинация)
+        и количество по вкладкам. Неверный курсор дает первую страницу.
+        """
+        paginator = KeysetPaginator(
+            ExchangeProposalService.inbox_queryset(user, box, status),
+            per_page
+        )
+        page = paginator.get_page(cursor)
+        ExchangeProposalService.mark_directions(user, page)
+        return page, ExchangeProposalService.inbox_counts(user, status)
+
     @staticmethod
     def get_user_proposals(
         user: User,
@@ -186,16 +600,18 @@ class ExchangeProposalService:
     ) -> Tuple[QuerySet, QuerySet]:
         """ Получение предложений обмена пользователя """
 
+        # Индексы (sender_user, status, created_at) и
+        # (receiver_user, status, created_at) обслуживают оба запроса
         sent_base = ExchangeProposal.objects.filter(
-            ad_sender__user=user
+            sender_user=user
         ).select_related(
-            'ad_sender', 'ad_receiver', 'ad_receiver__user'
+            'ad_sender', 'ad_receiver', 'receiver_user'
         )
 
         received_base = ExchangeProposal.objects.filter(
-            ad_receiver__user=user
+            receiver_user=user
         ).select_related(
-            'ad_sender', 'ad_receiver', 'ad_sender__user'
+            'ad_sender', 'ad_receiver', 'sender_user'
         )
 
         # Apply status filter
@@ -215,6 +631,200 @@ class ExchangeProposalService:
                     received_base.order_by('-created_at'))
 
 
+class ProposalCounterService:
+    """
+    Класс сервиса для счетчиков предложений обмена (AdProposalCounter).
+    Методы вызываются внутри транзакции, изменяющей предложения.
+    """
+
+    DIRECTIONS = ('received', 'sent')
+
+    @staticmethod
+    def _apply(changes: Counter) -> None:
+        """
+        Применяет изменения {(ad_id, direction, status): delta}.
+        Каждое изменение попадает в случайный шард; отдельный шард может
+        уйти в минус, значение имеет только сумма по шардам.
+        """
+        # Постоянный порядок блокировок исключает взаимные блокировки
+        for (ad_id, direction, status), delta in sorted(changes.items()):
+            if not delta:
+                continue
+            lookup = {
+                'ad_id': ad_id,
+                'direction': direction,
+                'status': status,
+                'shard': random.randrange(
+                    settings.ADS_PROPOSAL_COUNTER_SHARDS
+                ),
+            }
+            counters = AdProposalCounter.objects.filter(**lookup)
+            if counters.update(count=F('count') + delta):
+                continue
+            try:
+                with transaction.atomic():
+                    AdProposalCounter.objects.create(count=delta, **lookup)
+            except IntegrityError:
+                # Шард создан параллельной транзакцией
+                counters.update(count=F('count') + delta)
+
+    @staticmethod
+    def _record(changes: Counter, exclude_ad_id: Optional[int] = None):
+        """
+        Применяет изменения к счетчикам объявлений и статистике их
+        владельцев. Счетчики exclude_ad_id не трогаются: объявление
+        удаляется вместе с ними.
+        """
+        ad_ids = {ad_id for ad_id, _, _ in changes}
+        # Владельцы объявлений, загруженных в этом запросе, известны
+        ad_users = {
+            ad_id: ad.user_id
+            for ad_id, ad in get_loader(Ad).cached(ad_ids).items()
+        }
+        if len(ad_users) < len(ad_ids):
+            ad_users.update(Ad.objects.filter(
+                id__in=ad_ids - ad_users.keys()
+            ).values_list('id', 'user_id'))
+        UserStatsService.apply_proposal_changes(changes, ad_users)
+
+        ProposalCounterService._apply(Counter({
+            key: delta for key, delta in changes.items()
+            if key[0] != exclude_ad_id
+        }))
+        # Детальный ответ объявления содержит счетчики
+        purge(*(ad_key(ad_id) for ad_id in ad_ids if ad_id != exclude_ad_id))
+
+    @staticmethod
+    def _sides(sender_id, receiver_id):
+        return ((receiver_id, 'received'), (sender_id, 'sent'))
+
+    @staticmethod
+    def proposal_created(proposal: ExchangeProposal) -> None:
+        changes = Counter()
+        for ad_id, direction in ProposalCounterService._sides(
+                proposal.ad_sender_id, proposal.ad_receiver_id):
+            changes[(ad_id, direction, proposal.status)] += 1
+        ProposalCounterService._record(changes)
+
+    @staticmethod
+    def status_changed(proposal: ExchangeProposal, old_status: str,
+                       new_status: str) -> None:
+        ProposalCounterService.bulk_status_changed(
+            [(proposal.ad_sender_id, proposal.ad_receiver_id, old_status)],
+            new_status
+        )
+
+    @staticmethod
+    def bulk_status_changed(rows: Iterable[tuple], new_status: str) -> None:
+        """rows - (ad_sender_id, ad_receiver_id, старый статус)"""
+        changes = Counter()
+        for sender_id, receiver_id, old_status in rows:
+            if old_status == new_status:
+                continue
+            for ad_id, direction in ProposalCounterService._sides(
+                    sender_id, receiver_id):
+                changes[(ad_id, direction, old_status)] -= 1
+                changes[(ad_id, direction, new_status)] += 1
+        ProposalCounterService._record(changes)
+
+    @staticmethod
+    def proposals_removed(rows: Iterable[tuple],
+                          exclude_ad_id: Optional[int] = None) -> None:
+        """rows - (ad_sender_id, ad_receiver_id, статус)"""
+        changes = Counter()
+        for sender_id, receiver_id, status in rows:
+            for ad_id, direction in ProposalCounterService._sides(
+                    sender_id, receiver_id):
+                changes[(ad_id, direction, status)] -= 1
+        ProposalCounterService._record(changes, exclude_ad_id)
+
+    @staticmethod
+    def get_counts(ad: Ad) -> dict:
+        """
+        Количество предложений объявления по направлениям:
+        {'received': n, 'sent': n}. Использует prefetch_related
+        ('proposal_counters'), если он был выполнен.
+        """
+        if not hasattr(ad, '_proposal_counts'):
+            counts = dict.fromkeys(ProposalCounterService.DIRECTIONS, 0)
+            for counter in ad.proposal_counters.all():
+                counts[counter.direction] += counter.count
+            ad._proposal_counts = counts
+        return ad._proposal_counts
+
+    @staticmethod
+    def get_status_counts(ad: Ad) -> dict:
+        """
+        Количество предложений объявления по направлениям и статусам:
+        {'received': {'pending': n, ..., 'total': n}, 'sent': {...}}
+        """
+        statuses = [value for value, _ in ExchangeProposal.STATUS_CHOICES]
+        counts = {
+            direction: dict.fromkeys(statuses + ['total'], 0)
+            for direction in ProposalCounterService.DIRECTIONS
+        }
+        for counter in ad.proposal_counters.all():
+            counts[counter.direction][counter.status] += counter.count
+            counts[counter.direction]['total'] += counter.count
+        return counts
+
+    @staticmethod
+    def reconcile(ad_ids: Iterable[int], fix: bool = True) -> list:
+        """
+        Пересчитывает счетчики объявлений ad_ids по таблице предложений.
+        Возвращает расхождения (ad_id, direction, status, stored, actual)
+        и, если fix=True, заменяет шарды расходящихся счетчиков одной
+        строкой с верным значением.
+        """
+        ad_ids = list(ad_ids)
+        with transaction.atomic():
+            if fix:
+                # Шарды блокируются до подсчета в порядке _apply: иначе
+                # инкремент, зафиксированный между подсчетом и
+                # перезаписью, потерялся бы
+                list(AdProposalCounter.objects.select_for_update().filter(
+                    ad_id__in=ad_ids
+                ).order_by(
+                    'ad_id', 'direction', 'status', 'shard'
+                ).values_list('id', flat=True))
+
+            actual = Counter()
+            for direction, field in (('received', 'ad_receiver_id'),
+                                     ('sent', 'ad_sender_id')):
+                rows = ExchangeProposal.objects.filter(
+                    **{f'{field}__in': ad_ids}
+                ).values_list(field, 'status').annotate(total=Count('id'))
+                for ad_id, status, total in rows.order_by():
+                    actual[(ad_id, direction, status)] = total
+
+            stored = Counter()
+            rows = AdProposalCounter.objects.filter(
+                ad_id__in=ad_ids
+            ).values_list('ad_id', 'direction', 'status').annotate(
+                total=Sum('count')
+            )
+            for ad_id, direction, status, total in rows.order_by():
+                stored[(ad_id, direction, status)] = total
+
+            drift = [
+                (*key, stored[key], actual[key])
+                for key in sorted(set(actual) | set(stored))
+                if stored[key] != actual[key]
+            ]
+            if not fix:
+                return drift
+            for ad_id, direction, status, _, total in drift:
+                AdProposalCounter.objects.filter(
+                    ad_id=ad_id, direction=direction, status=status
+                ).delete()
+                if total:
+                    AdProposalCounter.objects.create(
+                        ad_id=ad_id, direction=direction,
+                        status=status, shard=0, count=total
+                    )
+        return drift
+
+
 class ValidationService:
     """Класс сервиса для валидации"""
 
@@ -0,0 +1,226 @@
+"""
+Теги кэша обратного прокси (Surrogate-Key) и их очистка.
+
+Ответы со списками и объявлениями для анонимных пользователей
+помечаются заголовком Surrogate-Key, а срок хранения на прокси задается
+Surrogate-Control (браузер видит обычный Cache-Control). Теги:
+
+- ``ads`` - любой ответ с объявлениями (данные владельцев);
+- ``ad-<id>`` - ответ, в котором выводится объявление;
+- ``category-<category>`` - список с фильтром по категории, ``ads-list`` -
+  остальные списки, ``ads-search`` - результаты поиска.
+
+Изменения объявлений в AdService вызывают purge() с тегами затронутых
+ответов. Теги отправляются после фиксации транзакции; в рамках запроса
+(SurrogatePurgeMiddleware) они собираются и уходят одним пакетом через
+бэкенд SURROGATE_PURGE_BACKEND. При SURROGATE_PURGE_ASYNC пакеты
+отправляет фоновый поток процесса, и запрос не ждет ответа прокси;
+пакеты, не отправленные до остановки процесса, теряются (ответы истекут
+по Surrogate-Control).
+"""
+import contextvars
+import json
+import logging
+import queue
+import threading
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.module_loading import import_string
+
+from .cache import owner_fields_changed
+
+logger = logging.getLogger(__name__)
+
+ADS_KEY = 'ads'
+LIST_KEY = 'ads-list'
+SEARCH_KEY = 'ads-search'
+
+_current_batch = contextvars.ContextVar('surrogate_purge_batch', default=None)
+
+# Очередь пакетов фонового потока отправки
+_purge_queue = queue.Queue()
+_purge_thread = None
+_purge_thread_lock = threading.Lock()
+
+
+def ad_key(ad_id) -> str:
+    return f'ad-{ad_id}'
+
+
+def category_key(category) -> str:
+    return f'category-{category}'
+
+
+def ad_list_keys(ad_ids: Iterable, category: Optional[str] = None,
+                 search: Optional[str] = None) -> set:
+    """Теги страницы списка объявлений"""
+    keys = {ADS_KEY, category_key(category) if category else LIST_KEY}
+    if search:
+        keys.add(SEARCH_KEY)
+    keys.update(ad_key(ad_id) for ad_id in ad_ids)
+    return keys
+
+
+def ad_detail_keys(ad_id) -> set:
+    return {ADS_KEY, ad_key(ad_id)}
+
+
+def set_surrogate_keys(response, request, keys: Iterable[str]):
+    """
+    Заголовки кэширования ответа. Ответы авторизованным пользователям
+    прокси не кэширует.
+    """
+    patch_vary_headers(response, ('Authorization',))
+    if request.user.is_authenticated:
+        patch_cache_control(response, private=True)
+        return response
+    patch_cache_control(response, public=True)
+    response['Surrogate-Key'] = ' '.join(sorted(keys))
+    response['Surrogate-Control'] = (
+        f'max-age={settings.SURROGATE_CACHE_MAX_AGE}'
+    )
+    return response
+
+
+def get_purge_backend():
+    return import_string(settings.SURROGATE_PURGE_BACKEND)()
+
+
+def send_purge(keys: Iterable[str]) -> None:
+    """Отправляет теги бэкенду пакетами по SURROGATE_PURGE_BATCH_SIZE"""
+    keys = sorted(set(keys))
+    size = settings.SURROGATE_PURGE_BATCH_SIZE
+    backend = get_purge_backend()
+    for start in range(0, len(keys), size):
+        backend.send(keys[start:start + size])
+
+
+def _send_queued() -> None:
+    while True:
+        keys = _purge_queue.get()
+        try:
+            send_purge(keys)
+        except Exception:
+            logger.exception(f'Surrogate purge of {len(keys)} keys failed')
+        finally:
+            _purge_queue.task_done()
+
+
+def send_purge_later(keys: Iterable[str]) -> None:
+    """
+    Передает теги фоновому потоку отправки (SURROGATE_PURGE_ASYNC) или
+    отправляет их сразу
+    """
+    if not settings.SURROGATE_PURGE_ASYNC:
+        send_purge(keys)
+        return
+    global _purge_thread
+    with _purge_thread_lock:
+        if _purge_thread is None or not _purge_thread.is_alive():
+            _purge_thread = threading.Thread(
+                target=_send_queued, name='surrogate-purge', daemon=True
+            )
+            _purge_thread.start()
+    _purge_queue.put(sorted(set(keys)))
+
+
+def _enqueue(keys):
+    batch = _current_batch.get()
+    if batch is None:
+        send_purge_later(keys)
+    else:
+        batch.update(keys)
+
+
+def purge(*keys: str) -> None:
+    """
+    Очищает ответы с тегами keys после фиксации текущей транзакции
+    (при откате ничего не отправляется)
+    """
+    keys = {key for key in keys if key}
+    if keys:
+        transaction.on_commit(lambda: _enqueue(keys))
+
+
+@contextmanager
+def purge_batch():
+    """Собирает теги и отправляет их одним пакетом при выходе"""
+    if _current_batch.get() is not None:
+        yield
+        return
+    batch = set()
+    token = _current_batch.set(batch)
+    try:
+        yield
+    finally:
+        _current_batch.reset(token)
+        if batch:
+            send_purge_later(batch)
+
+
+def purge_ad(ad_id, *categories: str, listed: bool = False) -> None:
+    """
+    Очистка после изменения объявления. categories - категории, в
+    списках которых объявление появилось или исчезло; listed - меняется
+    состав списков (создание, удаление).
+    """
+    keys = {ad_key(ad_id), SEARCH_KEY}
+    keys.update(category_key(category) for category in categories)
+    if listed:
+        keys.add(LIST_KEY)
+    purge(*keys)
+
+
+def purge_owner(sender, instance, created=False, **kwargs):
+    """
+    Обработчик post_save пользователя: данные владельца выводятся во
+    всех ответах с объявлениями
+    """
+    if owner_fields_changed(instance, created):
+        purge(ADS_KEY)
+
+
+class HttpPurgeBackend:
+    """
+    POST на SURROGATE_PURGE_URL: теги в заголовке Surrogate-Key и в теле
+    {"keys": [...]}. Без URL очистка отключена. Ошибки прокси только
+    логируются: кэш истечет по Surrogate-Control.
+    """
+
+    def send(self, keys: list) -> None:
+        url = settings.SURROGATE_PURGE_URL
+        if not url:
+            return
+        request = urllib.request.Request(
+            url,
+            data=json.dumps({'keys': keys}).encode(),
+            method='POST',
+            headers={
+                'Content-Type': 'application/json',
+                'Surrogate-Key': ' '.join(keys),
+                **settings.SURROGATE_PURGE_HEADERS,
+            }
+        )
+        try:
+            with urllib.request.urlopen(
+                    request, timeout=settings.SURROGATE_PURGE_TIMEOUT):
+                pass
+        except (urllib.error.URLError, OSError) as e:
+            logger.warning(f'Surrogate purge of {len(keys)} keys failed: {e}')
+
+
+# Пакеты, отправленные LocmemPurgeBackend (для тестов)
+outbox = []
+
+
+class LocmemPurgeBackend:
+    """Сохраняет пакеты тегов в outbox вместо отправки"""
+
+    def send(self, keys: list) -> None:
+        outbox.append(list(keys))
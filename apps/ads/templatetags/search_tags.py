@@ -0,0 +1,21 @@
+from django import template
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
+
+from ..search import HIGHLIGHT_START, HIGHLIGHT_STOP
+
+register = template.Library()
+
+
+@register.filter
+def highlight(value):
+    """
+    Экранирует фрагмент поиска и подсвечивает совпадения тегом <mark>
+    """
+    if not value:
+        return ''
+    escaped = conditional_escape(value)
+    return mark_safe(
+        escaped.replace(HIGHLIGHT_START, '<mark>')
+        .replace(HIGHLIGHT_STOP, '</mark>')
+    )
@@ -0,0 +1,227 @@
+import threading
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from api.batch import dispatch as dispatch_module
+
+from ..models import Ad
+from ..services import ExchangeProposalService
+
+
+class BatchRetrieveTest(APITestCase):
+    """Тесты пакетного получения объектов по ?ids="""
+
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(
+                username=f'user{i}', password='testpass123'
+            )
+            for i in range(3)
+        ]
+        self.ads = [
+            Ad.objects.create(
+                user=user, title=f'Товар {i}', description='Описание товара',
+                category='other', condition='new'
+            )
+            for i, user in enumerate(self.users)
+        ]
+        # user0 участвует в первом предложении, но не во втором
+        self.own = ExchangeProposalService.create_proposal(
+            self.users[0], self.ads[0], self.ads[1]
+        )
+        self.foreign = ExchangeProposalService.create_proposal(
+            self.users[2], self.ads[2], self.ads[1]
+        )
+        token = Token.objects.create(user=self.users[0])
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def ids(self, *values):
+        return {'ids': ','.join(str(value) for value in values)}
+
+    def test_ads_in_requested_order(self):
+        """Объявления в порядке ids, отсутствующие - в missing"""
+        order = [self.ads[2].id, 999, self.ads[0].id]
+        # токен, объявления одним IN и счетчики предложений
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                reverse('api:ads:ad-list'), self.ids(*order)
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['id'] for item in response.data['results']],
+            [self.ads[2].id, self.ads[0].id]
+        )
+        self.assertEqual(response.data['missing'], [999])
+        # Как в детальном ответе
+        self.assertIn('description', response.data['results'][0])
+        self.assertEqual(
+            response.data['results'][1]['sent_proposals_count'], 1
+        )
+
+    def test_proposals_visibility(self):
+        """Чужие предложения не выдаются и попадают в missing"""
+        response = self.client.get(
+            reverse('api:proposals:proposal-list'),
+            self.ids(self.foreign.id, self.own.id)
+        )
+        self.assertEqual(
+            [item['id'] for item in response.data['results']],
+            [self.own.id]
+        )
+        self.assertEqual(response.data['missing'], [self.foreign.id])
+
+    def test_users(self):
+        """Пакетное получение пользователей"""
+        response = self.client.get(
+            reverse('api:users:user-list'),
+            self.ids(self.users[1].id, self.users[0].id)
+        )
+        self.assertEqual(
+            [item['username'] for item in response.data['results']],
+            ['user1', 'user0']
+        )
+        self.assertEqual(response.data['missing'], [])
+
+    def test_invalid_ids(self):
+        """Неверный список ids - ошибка 400"""
+        url = reverse('api:ads:ad-list')
+        too_many = ','.join(str(i) for i in range(1, 102))
+        for value in ('1,a', '', too_many):
+            response = self.client.get(url, {'ids': value})
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST, value
+            )
+
+
+class BatchEndpointTest(APITestCase):
+    """Тесты пакетного эндпоинта /api/batch/"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='owner', password='testpass123'
+        )
+        self.other = User.objects.create_user(
+            username='other', password='testpass123'
+        )
+        self.ad = Ad.objects.create(
+            user=self.user, title='Велосипед', description='Горный',
+            category='vehicles', condition='used'
+        )
+        self.other_ad = Ad.objects.create(
+            user=self.other, title='Самокат', description='Детский',
+            category='vehicles', condition='new'
+        )
+        ExchangeProposalService.create_proposal(
+            self.other, self.other_ad, self.ad
+        )
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.url = reverse('api:batch')
+
+    def post(self, *requests):
+        return self.client.post(
+            self.url, {'requests': list(requests)}, format='json'
+        )
+
+    def test_app_start_requests(self):
+        """Запросы при открытии приложения одним пакетом"""
+        response = self.post(
+            {'method': 'GET', 'path': '/api/users/me/'},
+            {'method': 'GET', 'path': '/api/ads/?fields=id,title'},
+            {'method': 'GET', 'path': '/api/proposals/'},
+            {'method': 'GET',
+             'path': f'/api/ads/{self.ad.id}/proposals/?counts_only=1'},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        me, ads, proposals, counts = response.data['responses']
+        self.assertEqual([me['status'], ads['status'], proposals['status'],
+                          counts['status']], [200] * 4)
+        self.assertEqual(me['body']['username'], 'owner')
+        self.assertEqual(len(proposals['body']['results']), 1)
+        self.assertEqual(
+            counts['body']['counts']['received']['pending'], 1
+        )
+
+    def test_statuses_per_sub_request(self):
+        """Ошибка подзапроса не влияет на остальные"""
+        response = self.post(
+            {'method': 'PATCH', 'path': f'/api/ads/{self.other_ad.id}/',
+             'body': {'title': 'Чужое'}},
+            {'method': 'GET', 'path': '/api/ads/999999/'},
+            {'method': 'GET', 'path': '/api/unknown/'},
+            {'method': 'POST', 'path': '/api/ads/',
+             'body': {'title': 'Книга', 'description': 'Сборник стихов',
+                      'category': 'books', 'condition': 'new'}},
+            {'method': 'GET', 'path': '/api/ads/?fields=title&user_id='
+             f'{self.user.id}'},
+        )
+        statuses = [item['status'] for item in response.data['responses']]
+        self.assertEqual(statuses, [403, 404, 404, 201, 200])
+        # Чтение после записи видит ее результат
+        titles = [
+            item['title']
+            for item in response.data['responses'][4]['body']['results']
+        ]
+        self.assertIn('Книга', titles)
+
+    def test_conditional_headers_not_forwarded(self):
+        """Условные заголовки пакета не превращают подзапросы в 304"""
+        path = f'/api/ads/?user_id={self.user.id}'
+        etag = self.client.get(path)['ETag']
+        response = self.client.post(
+            self.url, {'requests': [{'method': 'GET', 'path': path}]},
+            format='json', HTTP_IF_NONE_MATCH=etag
+        )
+        ads = response.data['responses'][0]
+        self.assertEqual(ads['status'], 200)
+        self.assertEqual(len(ads['body']['results']), 1)
+
+    def test_invalid_batch(self):
+        """Пути вне API и вложенные пакеты не принимаются"""
+        response = self.post({'method': 'GET', 'path': '/admin/'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.post({'method': 'POST', 'path': '/api/batch/'})
+        self.assertEqual(response.data['responses'][0]['status'], 404)
+        response = self.post(*[{'method': 'GET', 'path': '/api/ads/'}] * 21)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BatchConcurrencyTest(SimpleTestCase):
+    """Тесты параллельного выполнения чтений пакета"""
+
+    def setUp(self):
+        dispatch_module._executor = None
+        self.addCleanup(setattr, dispatch_module, '_executor', None)
+
+    @override_settings(API_BATCH_MAX_WORKERS=3)
+    def test_reads_run_concurrently(self):
+        """Чтения до записи выполняются одновременно, запись - после"""
+        barrier = threading.Barrier(2, timeout=5)
+        events = []
+
+        def fake_dispatch(parent, item):
+            if item['method'] == 'GET' and item['path'] != '/api/last/':
+                # Оба чтения должны дойти сюда одновременно
+                barrier.wait()
+            events.append(item['path'])
+            return {'status': 200, 'body': item['path']}
+
+        items = [
+            {'method': 'GET', 'path': '/api/a/'},
+            {'method': 'GET', 'path': '/api/b/'},
+            {'method': 'POST', 'path': '/api/write/'},
+            {'method': 'GET', 'path': '/api/last/'},
+        ]
+        with mock.patch.object(dispatch_module, 'dispatch', fake_dispatch), \
+                mock.patch.object(dispatch_module.connections, 'close_all'):
+            results = dispatch_module.run_batch(mock.Mock(), items)
+
+        self.assertEqual([result['body'] for result in results],
+                         [item['path'] for item in items])
+        self.assertEqual(events[2:], ['/api/write/', '/api/last/'])
@@ -0,0 +1,140 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITestCase
+
+from ..models import Ad
+from ..services import AdService, ExchangeProposalService
+
+
+class ConditionalGetTest(APITestCase):
+    """Тесты ETag, Last-Modified и ответа 304 для списков"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='owner', password='testpass123'
+        )
+        self.other = User.objects.create_user(
+            username='other', password='testpass123'
+        )
+        self.ad = Ad.objects.create(
+            user=self.user, title='Велосипед', description='Горный велосипед',
+            category='vehicles', condition='used'
+        )
+        self.other_ad = Ad.objects.create(
+            user=self.other, title='Самокат', description='Детский самокат',
+            category='vehicles', condition='new'
+        )
+        self.proposal = ExchangeProposalService.create_proposal(
+            self.other, self.other_ad, self.ad
+        )
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def assertRevalidates(self, url, params=None):
+        """Повторный запрос с ETag дает 304, возвращает ETag"""
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        self.assertIn('no-cache', response['Cache-Control'])
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+        return etag
+
+    def test_api_lists(self):
+        """Списки API отвечают 304 без выборки страницы"""
+        url = reverse('api:ads:ad-list')
+        etag = self.assertRevalidates(url)
+        # только токен: валидаторы строятся из версий кэша
+        with self.assertNumQueries(1):
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertRevalidates(reverse('api:proposals:proposal-list'))
+
+    def test_changes_update_etag(self):
+        """Изменение, создание и удаление меняют ETag"""
+        url = reverse('api:ads:ad-list')
+        etag = self.client.get(url)['ETag']
+        AdService.update_ad(self.other_ad, self.other, title='Самокат новый')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        etag = response['ETag']
+        AdService.delete_ad(self.other_ad, self.other)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_filters_and_related_ads(self):
+        """ETag зависит от фильтров и объявлений в предложениях"""
+        url = reverse('api:ads:ad-list')
+        self.assertNotEqual(
+            self.client.get(url)['ETag'],
+            self.client.get(url, {'category': 'books'})['ETag']
+        )
+
+        url = reverse('api:proposals:proposal-list')
+        etag = self.client.get(url)['ETag']
+        AdService.update_ad(self.ad, self.user, title='Велосипед горный')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_cascade_reject_updates_etag(self):
+        """Каскадное отклонение при принятии меняет ETag отправителей"""
+        third = User.objects.create_user(
+            username='third', password='testpass123'
+        )
+        third_ad = Ad.objects.create(
+            user=third, title='Ролики', description='Роликовые коньки',
+            category='vehicles', condition='used'
+        )
+        ExchangeProposalService.create_proposal(third, third_ad, self.ad)
+        token = Token.objects.create(user=third)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        url = reverse('api:proposals:proposal-list')
+        etag = client.get(url)['ETag']
+
+        ExchangeProposalService.update_proposal_status(
+            self.proposal, self.user, 'accepted'
+        )
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['status'], 'rejected')
+
+    def test_evicted_versions_change_etag(self):
+        """Потерянные версии кэша не совпадают с прежним ETag"""
+        url = reverse('api:ads:ad-list')
+        etag = self.client.get(url)['ETag']
+        cache.clear()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_if_modified_since(self):
+        """Last-Modified и If-Modified-Since"""
+        url = reverse('api:ads:ad-list')
+        last_modified = self.client.get(url)['Last-Modified']
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_web_pages(self):
+        """Страницы сайта: 304 для списков, кроме страниц с сообщениями"""
+        self.client.force_login(self.user)
+        # Первый ответ устанавливает cookie CSRF, она входит в ETag
+        self.client.get(reverse('ads_list'))
+        self.assertRevalidates(reverse('ads_list'), {'category': 'vehicles'})
+        etag = self.assertRevalidates(reverse('exchange_proposals_list'))
+
+        # Ожидающее сообщение должно быть показано
+        self.client.post(
+            reverse('update_proposal_status', args=[self.proposal.id]),
+            {'action': 'unknown'}
+        )
+        response = self.client.get(
+            reverse('exchange_proposals_list'), HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
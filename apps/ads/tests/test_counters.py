@@ -0,0 +1,215 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import Sum
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from ..models import Ad, AdProposalCounter
+from ..services import (AdService, ExchangeProposalService,
+                        ProposalCounterService)
+
+
+class ProposalCounterTest(APITestCase):
+    """Тесты денормализованных счетчиков предложений обмена"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(
+            username='owner', password='testpass123'
+        )
+        self.target = Ad.objects.create(
+            user=self.owner, title='Велосипед', description='Горный',
+            category='vehicles', condition='used'
+        )
+        self.senders = []
+        for i in range(3):
+            user = User.objects.create_user(
+                username=f'sender{i}', password='testpass123'
+            )
+            ad = Ad.objects.create(
+                user=user, title=f'Самокат {i}', description='Детский',
+                category='vehicles', condition='new'
+            )
+            self.senders.append((user, ad))
+        self.proposals = [
+            ExchangeProposalService.create_proposal(user, ad, self.target)
+            for user, ad in self.senders
+        ]
+
+    def stored(self, ad, direction, status_value):
+        return AdProposalCounter.objects.filter(
+            ad=ad, direction=direction, status=status_value
+        ).aggregate(total=Sum('count'))['total'] or 0
+
+    def test_create_increments_both_sides(self):
+        """Создание предложения увеличивает счетчики обеих сторон"""
+        self.assertEqual(self.stored(self.target, 'received', 'pending'), 3)
+        for _, ad in self.senders:
+            self.assertEqual(self.stored(ad, 'sent', 'pending'), 1)
+
+    def test_accept_moves_counters(self):
+        """Принятие предложения отклоняет остальные и переносит счетчики"""
+        ExchangeProposalService.update_proposal_status(
+            self.proposals[0], self.owner, 'accepted'
+        )
+        self.assertEqual(self.stored(self.target, 'received', 'pending'), 0)
+        self.assertEqual(self.stored(self.target, 'received', 'accepted'), 1)
+        self.assertEqual(self.stored(self.target, 'received', 'rejected'), 2)
+        self.assertEqual(
+            self.stored(self.senders[1][1], 'sent', 'rejected'), 1
+        )
+        self.assertEqual(ProposalCounterService.reconcile([
+            self.target.id, *(ad.id for _, ad in self.senders)
+        ]), [])
+
+    def test_delete_ad_updates_other_side(self):
+        """Удаление объявления уменьшает счетчики второй стороны"""
+        AdService.delete_ad(self.target, self.owner)
+        for _, ad in self.senders:
+            self.assertEqual(self.stored(ad, 'sent', 'pending'), 0)
+
+    def test_serializer_reads_counters(self):
+        """AdSerializer читает счетчики без COUNT по предложениям"""
+        url = reverse('api:ads:ad-detail', args=[self.target.id])
+        # объявление и шарды счетчиков
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.data['received_proposals_count'], 3)
+        self.assertEqual(response.data['sent_proposals_count'], 0)
+
+    def test_api_writes_maintain_counters(self):
+        """Создание предложения и удаление объявления через API"""
+        user, ad = self.senders[0]
+        other = Ad.objects.create(
+            user=self.owner, title='Книга', description='Роман',
+            category='books', condition='used'
+        )
+        token = Token.objects.create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        response = self.client.post(reverse('api:proposals:proposal-list'), {
+            'ad_sender_id': ad.id, 'ad_receiver_id': other.id,
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.stored(other, 'received', 'pending'), 1)
+        self.assertEqual(self.stored(ad, 'sent', 'pending'), 2)
+
+        response = self.client.delete(
+            reverse('api:ads:ad-detail', args=[ad.id])
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.stored(other, 'received', 'pending'), 0)
+        self.assertEqual(self.stored(self.target, 'received', 'pending'), 2)
+
+    def test_api_update_keeps_ads(self):
+        """Обновление предложения через API не меняет объявления"""
+        user, ad = self.senders[0]
+        other = Ad.objects.create(
+            user=self.owner, title='Книга', description='Роман',
+            category='books', condition='used'
+        )
+        token = Token.objects.create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        url = reverse('api:proposals:proposal-detail',
+                      args=[self.proposals[0].id])
+        response = self.client.put(url, {
+            'ad_sender_id': ad.id, 'ad_receiver_id': other.id,
+            'comment': 'Готов доплатить',
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.proposals[0].refresh_from_db()
+        self.assertEqual(self.proposals[0].ad_receiver_id, self.target.id)
+        self.assertEqual(self.proposals[0].comment, 'Готов доплатить')
+        self.assertEqual(self.stored(other, 'received', 'pending'), 0)
+        self.assertEqual(
+            ProposalCounterService.reconcile([ad.id, self.target.id]), []
+        )
+
+        # Статус меняет только получатель
+        response = self.client.patch(url, {'status': 'accepted'})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_api_update_status_cascades(self):
+        """Принятие через PATCH отклоняет остальные предложения"""
+        token = Token.objects.create(user=self.owner)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        response = self.client.patch(
+            reverse('api:proposals:proposal-detail',
+                    args=[self.proposals[0].id]),
+            {'status': 'accepted'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'accepted')
+        self.assertEqual(self.stored(self.target, 'received', 'accepted'), 1)
+        self.assertEqual(self.stored(self.target, 'received', 'rejected'), 2)
+        self.assertEqual(ProposalCounterService.reconcile([
+            self.target.id, *(ad.id for _, ad in self.senders)
+        ]), [])
+
+    def test_proposals_action_counts_only(self):
+        """counts_only возвращает количество из счетчиков без предложений"""
+        url = reverse('api:ads:ad-proposals', args=[self.target.id])
+        # объявление и шарды счетчиков
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'counts_only': 'true'})
+        self.assertEqual(list(response.data), ['counts'])
+        self.assertEqual(response.data['counts']['received']['pending'], 3)
+        self.assertEqual(response.data['counts']['received']['total'], 3)
+        self.assertEqual(response.data['counts']['sent']['total'], 0)
+
+    def test_proposals_action_is_bounded(self):
+        """Без direction возвращаются первые страницы и ссылки на следующие"""
+        url = reverse('api:ads:ad-proposals', args=[self.target.id])
+        response = self.client.get(url, {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['received_proposals']), 2)
+        self.assertEqual(response.data['sent_proposals'], [])
+        self.assertIsNone(response.data['sent_next'])
+
+        next_url = response.data['received_next']
+        self.assertIn('direction=received', next_url)
+        response = self.client.get(next_url)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNone(response.data['next'])
+        self.assertEqual(response.data['counts']['total'], 3)
+
+    def test_proposals_action_status_filter(self):
+        """Фильтр по статусу и проверка параметров"""
+        ExchangeProposalService.update_proposal_status(
+            self.proposals[0], self.owner, 'accepted'
+        )
+        url = reverse('api:ads:ad-proposals', args=[self.target.id])
+        response = self.client.get(
+            url, {'direction': 'received', 'status': 'accepted'}
+        )
+        self.assertEqual(
+            [item['id'] for item in response.data['results']],
+            [self.proposals[0].id]
+        )
+        self.assertEqual(response.data['counts']['rejected'], 2)
+
+        response = self.client.get(url, {'direction': 'up'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(url, {'status': 'unknown'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_reconcile_command(self):
+        """Команда сверки находит и исправляет расхождения"""
+        AdProposalCounter.objects.filter(
+            ad=self.target, direction='received'
+        ).update(count=0)
+
+        out = StringIO()
+        call_command('reconcile_proposal_counters', '--dry-run', stdout=out)
+        self.assertIn('found 1 drifted', out.getvalue())
+        self.assertEqual(self.stored(self.target, 'received', 'pending'), 0)
+
+        out = StringIO()
+        call_command(
+            'reconcile_proposal_counters', '--batch-size', '2', stdout=out
+        )
+        self.assertIn('fixed 1 drifted', out.getvalue())
+        self.assertEqual(self.stored(self.target, 'received', 'pending'), 3)
@@ -0,0 +1,75 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..counting import (CachedCounter, CountingPaginator, EstimatedCounter,
+                        count_queryset, get_counter)
+from ..models import Ad
+from ..services import AdService
+
+
+class CountStrategyTest(TestCase):
+    """Тесты стратегий подсчета количества объявлений"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123'
+        )
+        for category in ('books', 'books', 'toys'):
+            AdService.create_ad(
+                self.user, title='Объявление', description='Описание товара',
+                category=category, condition='new'
+            )
+
+    def test_exact_count(self):
+        """Точный подсчет"""
+        result = count_queryset(Ad.objects.filter(category='books'), 'exact')
+        self.assertEqual(result.value, 2)
+        self.assertTrue(result.exact)
+
+    def test_cached_count_per_filter(self):
+        """Кэш хранит количество для каждой комбинации фильтров"""
+        counter = CachedCounter()
+        books = Ad.objects.filter(category='books')
+        self.assertEqual(counter.count(books).value, 2)
+        self.assertEqual(counter.count(Ad.objects.all()).value, 3)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(counter.count(books).value, 2)
+
+    def test_cached_count_invalidated_on_write(self):
+        """Изменение и удаление объявлений сбрасывают кэш"""
+        counter = CachedCounter()
+        toys = Ad.objects.filter(category='toys')
+        self.assertEqual(counter.count(toys).value, 1)
+
+        ad = Ad.objects.filter(category='books').first()
+        AdService.update_ad(ad, self.user, category='toys')
+        self.assertEqual(counter.count(toys).value, 2)
+
+        AdService.delete_ad(ad, self.user)
+        self.assertEqual(counter.count(toys).value, 1)
+
+    def test_estimated_falls_back_to_exact(self):
+        """Без оценки планировщика выполняется точный подсчет"""
+        result = EstimatedCounter(threshold=0).count(Ad.objects.all())
+        self.assertEqual(result.value, 3)
+        self.assertTrue(result.exact)
+
+    def test_unknown_strategy(self):
+        """Неизвестная стратегия - ошибка конфигурации"""
+        with self.assertRaises(ValueError):
+            get_counter('unknown')
+
+    def test_counting_paginator(self):
+        """Paginator использует стратегию подсчета"""
+        paginator = CountingPaginator(Ad.objects.all(), 2)
+        self.assertEqual(paginator.count, 3)
+        self.assertEqual(paginator.num_pages, 2)
+
+    def test_ads_list_shows_total(self):
+        """Список объявлений показывает общее количество"""
+        response = self.client.get(reverse('ads_list'), {'category': 'books'})
+        self.assertEqual(response.context['total'].value, 2)
@@ -0,0 +1,95 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from api.ads.views import AdViewSet
+
+from ..cache import OWNERS_SCOPE, get_version, owner_scope
+from ..models import Ad
+from ..services import AdService
+
+
+class AdFragmentCacheTest(APITestCase):
+    """Тесты кэша представлений объявлений в списке API"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='owner', password='testpass123'
+        )
+        self.ads = [
+            Ad.objects.create(
+                user=self.user, title=f'Товар {i}',
+                description='Описание товара', category='other',
+                condition='new'
+            )
+            for i in range(3)
+        ]
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.url = reverse('api:ads:ad-list')
+
+    def titles(self, response):
+        return [item['title'] for item in response.data['results']]
+
+    def test_cached_list(self):
+        """Повторный список строится из кэша без сериализации строк"""
+        first = self.client.get(self.url)
+        # токен и страница ключей; количество в кэше
+        with self.assertNumQueries(2):
+            second = self.client.get(self.url)
+        self.assertEqual(first.content, second.content)
+
+        with mock.patch.object(AdViewSet, 'fragment_cache', None):
+            uncached = self.client.get(self.url)
+        self.assertEqual(uncached.content, second.content)
+
+    def test_update_changes_key(self):
+        """Изменение объявления меняет updated_at и ключ представления"""
+        self.client.get(self.url)
+        AdService.update_ad(self.ads[1], self.user, title='Новое название')
+        response = self.client.get(self.url)
+        self.assertIn('Новое название', self.titles(response))
+        self.assertNotIn('Товар 1', self.titles(response))
+
+    def test_owner_change_invalidates(self):
+        """Изменение данных владельца сбрасывает представления"""
+        self.client.get(self.url)
+        self.user.first_name = 'Иван'
+        self.user.save()
+        response = self.client.get(self.url)
+        self.assertEqual(
+            {item['user']['first_name'] for item in response.data['results']},
+            {'Иван'}
+        )
+
+    def test_owner_versions_follow_rendered_fields(self):
+        """Версию владельца меняет только переименование, и только его"""
+        other = User.objects.create_user(username='other', password='x')
+        scopes = (owner_scope(self.user.id), owner_scope(other.id),
+                  OWNERS_SCOPE)
+        versions = [get_version(scope) for scope in scopes]
+
+        self.user.set_password('newpass123')
+        self.user.email = 'owner@example.com'
+        self.user.save()
+        self.assertEqual([get_version(scope) for scope in scopes], versions)
+
+        other.last_name = 'Петров'
+        other.save(update_fields=['last_name'])
+        self.assertEqual(
+            [get_version(scope) for scope in scopes],
+            [versions[0], versions[1] + 1, versions[2] + 1]
+        )
+
+    def test_sparse_fields_have_own_fragments(self):
+        """Наборы полей ?fields= кэшируются отдельно"""
+        self.client.get(self.url)
+        response = self.client.get(self.url, {'fields': 'id,title'})
+        self.assertEqual(
+            list(response.data['results'][0]), ['id', 'title']
+        )
@@ -0,0 +1,80 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+
+from ..models import Ad, ExchangeProposal
+from ..services import AdService
+
+
+class QueryPlanIndexTest(TestCase):
+    """Проверка через EXPLAIN, что горячие запросы используют индексы"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123'
+        )
+        self.other_user = User.objects.create_user(
+            username='otheruser', password='testpass123'
+        )
+        self.ad = Ad.objects.create(
+            user=self.user, title='Велосипед', description='Горный',
+            category='vehicles', condition='used'
+        )
+        self.other_ad = Ad.objects.create(
+            user=self.other_user, title='Самокат', description='Детский',
+            category='vehicles', condition='new'
+        )
+        if connection.vendor == 'postgresql':
+            # На маленьких таблицах планировщик предпочитает seq scan
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('ANALYZE ads_ad')
+                cursor.execute('ANALYZE ads_exchangeproposal')
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, msg=plan)
+
+    def test_ads_list_by_category(self):
+        """Список по категории использует составной индекс"""
+        queryset = AdService.search_ads(
+            category='vehicles', exclude_user=self.user
+        )[:11]
+        self.assertUsesIndex(queryset, 'ads_ad_category_created_idx')
+
+    def test_ads_list_by_condition(self):
+        """Список по состоянию использует составной индекс"""
+        queryset = AdService.search_ads(condition='new')[:11]
+        self.assertUsesIndex(queryset, 'ads_ad_condition_created_idx')
+
+    def test_ads_list_without_filters(self):
+        """Список без фильтров читает покрывающий индекс по дате"""
+        queryset = AdService.search_ads(exclude_user=self.user)[:11]
+        self.assertUsesIndex(queryset, 'ads_ad_created_covering_idx')
+
+    def test_my_ads(self):
+        """Объявления пользователя выбираются по индексу (user, created_at)"""
+        queryset = Ad.objects.filter(user=self.user).order_by(
+            '-created_at', '-id'
+        )[:11]
+        self.assertUsesIndex(queryset, 'ads_ad_user_created_idx')
+
+    def test_pending_proposals_of_receiver(self):
+        """Каскадное отклонение использует частичный индекс"""
+        queryset = ExchangeProposal.objects.filter(
+            ad_receiver=self.ad, status='pending'
+        )
+        self.assertUsesIndex(queryset, 'ads_proposal_pending_recv_idx')
+
+    def test_user_inbox(self):
+        """Предложения пользователя выбираются по индексам без JOIN"""
+        queryset = ExchangeProposal.objects.filter(
+            receiver_user=self.user, status='pending'
+        ).order_by('-created_at')[:11]
+        self.assertUsesIndex(queryset, 'ads_proposal_receiver_idx')
+        self.assertNotIn('ads_ad', str(queryset.query))
+
+        queryset = ExchangeProposal.objects.filter(
+            sender_user=self.user
+        ).order_by('-created_at')[:11]
+        self.assertUsesIndex(queryset, 'ads_proposal_sender_idx')
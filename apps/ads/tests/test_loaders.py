@@ -0,0 +1,138 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from ..loaders import current_identity_map, get_loader, identity_scope, prime
+from ..middleware import IdentityMapMiddleware
+from ..models import Ad
+
+
+def ad_selects(queries):
+    return [
+        query['sql'] for query in queries
+        if query['sql'].startswith('SELECT "ads_ad"')
+    ]
+
+
+class IdentityMapTest(TestCase):
+    """Тесты карты идентичности и загрузчиков"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='owner', password='testpass123'
+        )
+        self.ads = [
+            Ad.objects.create(
+                user=self.user, title=f'Товар {i}', description='Описание',
+                category='other', condition='new'
+            )
+            for i in range(3)
+        ]
+
+    def test_wanted_keys_loaded_in_one_query(self):
+        """Отложенные ключи загружаются одним запросом IN"""
+        with identity_scope():
+            loader = get_loader(Ad)
+            loader.want(self.ads[0].id, self.ads[1].id)
+            # объявления вместе с владельцами
+            with self.assertNumQueries(1):
+                first = loader.load(self.ads[0].id)
+                second = loader.load(str(self.ads[1].id))
+                self.assertEqual(first.user.username, 'owner')
+            self.assertIs(first.user, second.user)
+            self.assertIs(get_loader(Ad).load(self.ads[0].id), first)
+
+    def test_missing_and_invalid_keys(self):
+        """Отсутствующие и неверные ключи не находятся"""
+        with identity_scope():
+            loader = get_loader(Ad)
+            self.assertEqual(loader.load_many([999, 'abc']), {})
+            with self.assertRaises(Ad.DoesNotExist):
+                loader.load(999)
+
+    def test_primed_instances_are_shared(self):
+        """Связи загруженных объектов берутся из карты"""
+        with identity_scope():
+            prime(self.user)
+            ad = get_loader(Ad).load(self.ads[2].id)
+            self.assertIs(ad.user, self.user)
+
+    def test_delete_discards_instance(self):
+        """Удаленный объект убирается из карты"""
+        with identity_scope():
+            loader = get_loader(Ad)
+            ad = loader.load(self.ads[0].id)
+            ad.delete()
+            self.assertEqual(loader.cached([self.ads[0].id]), {})
+
+    def test_middleware_scope(self):
+        """Карта существует только на время запроса"""
+        seen = []
+
+        def view(request):
+            seen.append(current_identity_map())
+            return None
+
+        request = RequestFactory().get('/')
+        IdentityMapMiddleware(view)(request)
+        IdentityMapMiddleware(view)(request)
+        self.assertIsNotNone(seen[0])
+        self.assertIsNot(seen[0], seen[1])
+        self.assertIsNone(current_identity_map())
+
+
+class ProposalCreateLoadingTest(APITestCase):
+    """Объявления при создании предложения загружаются один раз"""
+
+    def setUp(self):
+        self.sender = User.objects.create_user(
+            username='sender', password='testpass123'
+        )
+        receiver = User.objects.create_user(
+            username='receiver', password='testpass123'
+        )
+        self.ad_sender = Ad.objects.create(
+            user=self.sender, title='Велосипед', description='Горный',
+            category='vehicles', condition='used'
+        )
+        self.ad_receiver = Ad.objects.create(
+            user=receiver, title='Самокат', description='Детский',
+            category='vehicles', condition='new'
+        )
+        token = Token.objects.create(user=self.sender)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def test_api_create(self):
+        """API: одна выборка объявлений на запрос"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse('api:proposals:proposal-list'),
+                {'ad_sender_id': self.ad_sender.id,
+                 'ad_receiver_id': self.ad_receiver.id,
+                 'comment': 'Меняю'},
+                format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(ad_selects(queries)), 1)
+        self.assertEqual(response.data['sender_user']['username'], 'sender')
+        self.assertEqual(
+            response.data['receiver_user']['username'], 'receiver'
+        )
+
+    def test_web_create(self):
+        """Веб: объявление получателя загружается вместе с владельцем"""
+        self.client.force_login(self.sender)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse('create_exchange_proposal'),
+                {'ad_receiver': self.ad_receiver.id,
+                 'ad_sender': self.ad_sender.id, 'comment': 'Меняю'},
+                format='multipart'
+            )
+        self.assertEqual(response.status_code, 302)
+        self.assertLessEqual(len(ad_selects(queries)), 2)
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
 
 from ..models import Ad, ExchangeProposal
 
@@ -92,3 +93,190 @@ class ExchangeProposalModelTest(TestCase):
         )
         expected_str = f'Обменять {self.ad1} на {self.ad2} [pending]'
         self.assertEqual(str(proposal), expected_str)
+
+    def test_exchange_proposal_participants(self):
+        """Тест заполнения отправителя и получателя по объявлениям"""
+        proposal = ExchangeProposal.objects.create(
+            ad_sender=self.ad1,
+            ad_receiver=self.ad2
+        )
+        self.assertEqual(proposal.sender_user_id, self.ad1.user_id)
+        self.assertEqual(proposal.receiver_user_id, self.ad2.user_id)
+        self.assertTrue(proposal.can_be_updated_by(self.ad2.user))
+        self.assertFalse(proposal.can_be_updated_by(self.ad1.user))
+
+    def test_participants_follow_ad_owner(self):
+        """Тест обновления получателя при смене владельца объявления"""
+        from ..services import AdService
+
+        proposal = ExchangeProposal.objects.create(
+            ad_sender=self.ad1,
+            ad_receiver=self.ad2
+        )
+        new_owner = User.objects.create_user(
+            username='newowner', password='testpass123'
+        )
+        AdService.change_owner(self.ad2, new_owner)
+        proposal.refresh_from_db()
+        self.assertEqual(proposal.receiver_user, new_owner)
+
+    def test_participants_follow_retargeted_ad(self):
+        """Тест обновления получателя при замене объявления"""
+        proposal = ExchangeProposal.objects.create(
+            ad_sender=self.ad1,
+            ad_receiver=self.ad2
+        )
+        user3 = User.objects.create_user(
+            username='user3', password='pass123'
+        )
+        ad3 = Ad.objects.create(
+            user=user3,
+            title='Ad 3',
+            description='Description 3',
+            category='books',
+            condition='new'
+        )
+
+        proposal = ExchangeProposal.objects.get(pk=proposal.pk)
+        proposal.ad_receiver = ad3
+        proposal.save()
+        proposal.refresh_from_db()
+        self.assertEqual(proposal.receiver_user, user3)
+        self.assertEqual(proposal.sender_user_id, self.ad1.user_id)
+
+
+class AdAdminTest(TestCase):
+    """Тесты администрирования объявлений"""
+
+    def setUp(self):
+        from ..services import AdService, ExchangeProposalService
+
+        self.admin = User.objects.create_superuser(
+            username='admin', password='pass123'
+        )
+        self.user1 = User.objects.create_user(
+            username='user1', password='pass123'
+        )
+        self.user2 = User.objects.create_user(
+            username='user2', password='pass123'
+        )
+        self.ad1 = AdService.create_ad(
+            user=self.user1, title='Ad 1', description='Description 1',
+            category='electronics', condition='new'
+        )
+        self.ad2 = AdService.create_ad(
+            user=self.user2, title='Ad 2', description='Description 2',
+            category='books', condition='used'
+        )
+        self.proposal = ExchangeProposalService.create_proposal(
+            self.user1, self.ad1, self.ad2
+        )
+
+    def test_change_owner_in_admin(self):
+        """Тест смены владельца через админку"""
+        from apps.users.models import UserStats
+
+        new_owner = User.objects.create_user(
+            username='newowner', password='pass123'
+        )
+        self.client.force_login(self.admin)
+        response = self.client.post(
+            reverse('admin:ads_ad_change', args=[self.ad2.id]), {
+                'user': new_owner.id,
+                'title': 'Ad 2',
+                'description': 'Description 2',
+                'category': 'books',
+                'condition': 'used',
+            }
+        )
+        self.assertEqual(response.status_code, 302)
+
+        self.proposal.refresh_from_db()
+        self.assertEqual(self.proposal.receiver_user, new_owner)
+        self.assertEqual(UserStats.objects.get(user=new_owner).ads_count, 1)
+        self.assertEqual(UserStats.objects.get(user=self.user2).ads_count, 0)
+
+    def snapshot_total(self):
+        from ..models import AdListSnapshot
+
+        return AdListSnapshot.objects.get(key=':').total
+
+    def test_add_and_delete_in_admin(self):
+        """Добавление и удаление в админке обновляют снимки и статистику"""
+        from apps.users.models import UserStats
+
+        self.client.force_login(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('admin:ads_ad_add'), {
+                'user': self.user1.id, 'title': 'Ad 3',
+                'description': 'Description 3', 'category': 'books',
+                'condition': 'new', 'image_url': '',
+            })
+        self.assertEqual(self.snapshot_total(), 3)
+        self.assertEqual(UserStats.objects.get(user=self.user1).ads_count, 2)
+
+        ad3 = Ad.objects.get(title='Ad 3')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('admin:ads_ad_delete', args=[ad3.id]),
+                {'post': 'yes'}
+            )
+            self.client.post(reverse('admin:ads_ad_changelist'), {
+                'action': 'delete_selected', 'post': 'yes',
+                '_selected_action': [self.ad1.id],
+            })
+        self.assertFalse(Ad.objects.filter(id__in=[ad3.id, self.ad1.id]))
+        self.assertEqual(self.snapshot_total(), 1)
+        self.assertEqual(UserStats.objects.get(user=self.user1).ads_count, 0)
+        stats = UserStats.objects.get(user=self.user2)
+        self.assertEqual(stats.pending_received, 0)
+
+    def test_delete_user_in_admin(self):
+        """Удаление пользователя удаляет его объявления через AdService"""
+        from apps.users.models import UserStats
+
+        self.client.force_login(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('admin:auth_user_delete', args=[self.user1.id]),
+                {'post': 'yes'}
+            )
+        self.assertFalse(User.objects.filter(id=self.user1.id).exists())
+        self.assertEqual(self.snapshot_total(), 1)
+        stats = UserStats.objects.get(user=self.user2)
+        self.assertEqual(stats.pending_received, 0)
+
+    def test_proposal_status_in_admin(self):
+        """Изменение и удаление предложения в админке обновляют статистику"""
+        from apps.users.models import UserStats
+
+        from ..models import AdProposalCounter
+
+        def stats(user):
+            return UserStats.objects.get(user=user)
+
+        self.client.force_login(self.admin)
+        response = self.client.post(
+            reverse('admin:ads_exchangeproposal_change',
+                    args=[self.proposal.id]), {
+                'ad_sender': self.ad1.id, 'ad_receiver': self.ad2.id,
+                'comment': '', 'status': 'accepted',
+            }
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(stats(self.user2).pending_received, 0)
+        self.assertEqual(stats(self.user1).pending_sent, 0)
+        self.assertEqual(stats(self.user1).accepted_trades, 1)
+        self.assertEqual(stats(self.user2).accepted_trades, 1)
+
+        self.client.post(
+            reverse('admin:ads_exchangeproposal_delete',
+                    args=[self.proposal.id]),
+            {'post': 'yes'}
+        )
+        self.assertFalse(ExchangeProposal.objects.exists())
+        self.assertEqual(stats(self.user1).accepted_trades, 0)
+        self.assertEqual(stats(self.user2).accepted_trades, 0)
+        self.assertEqual(
+            sum(AdProposalCounter.objects.values_list('count', flat=True)), 0
+        )
@@ -0,0 +1,170 @@
+import re
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import translation
+
+from .. import pagecache
+from ..pagecache import page_key
+from ..services import AdService
+
+CSRF_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+@override_settings(ADS_PAGE_CACHE_TIMEOUT=60, ADS_PAGE_CACHE_STALE_TIMEOUT=300)
+class AnonymousPageCacheTest(TestCase):
+    """Тесты кэша страниц списка объявлений для анонимов"""
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(
+            username='owner', password='testpass123'
+        )
+        self.ad = AdService.create_ad(
+            user=self.owner, title='Велосипед', description='Горный велосипед',
+            category='vehicles', condition='used'
+        )
+        self.url = reverse('ads_list')
+
+    def get(self, params=None, client=None, **extra):
+        return (client or self.client).get(self.url, params or {}, **extra)
+
+    def test_hit_for_anonymous_only(self):
+        """Анонимам страница отдается из кэша, пользователям - нет"""
+        self.assertEqual(self.get()['X-Page-Cache'], 'miss')
+        response = self.get()
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertContains(response, 'Велосипед')
+        self.assertIn('Surrogate-Key', response)
+
+        self.client.force_login(self.owner)
+        self.assertNotIn('X-Page-Cache', self.get())
+
+    def test_normalized_params(self):
+        """Порядок и пустые параметры не меняют ключ, чужие - отключают"""
+        self.get({'category': 'vehicles', 'condition': 'used', 'q': ''})
+        response = self.get({'condition': 'used', 'category': 'vehicles'})
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+
+        self.assertNotIn('X-Page-Cache', self.get({'utm_source': 'mail'}))
+
+    def test_csrf_token_per_client(self):
+        """Закэшированная страница получает CSRF-токен клиента"""
+        first = self.get()
+        other = Client(enforce_csrf_checks=True)
+        second = self.get(client=other)
+        self.assertEqual(second['X-Page-Cache'], 'hit')
+        token = CSRF_RE.search(second.content.decode()).group(1)
+        self.assertNotEqual(
+            token, CSRF_RE.search(first.content.decode()).group(1)
+        )
+
+        # Токен из кэшированной страницы принимается с cookie клиента
+        response = other.post(
+            reverse('set_language'),
+            {'language': 'en', 'next': '/', 'csrfmiddlewaretoken': token}
+        )
+        self.assertEqual(response.status_code, 302)
+
+    def test_category_write_bypasses_entry(self):
+        """Изменение объявления категории сбрасывает ее страницы"""
+        self.get({'category': 'vehicles'})
+        self.get({'category': 'books'})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            AdService.update_ad(self.ad, self.owner, title='Самокат')
+
+        response = self.get({'category': 'vehicles'})
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Самокат')
+        response = self.get({'category': 'books'})
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+
+    def test_web_edit_bypasses_previous_category(self):
+        """Перенос объявления формой сбрасывает страницы обеих категорий"""
+        self.get({'category': 'vehicles'})
+        self.get({'category': 'books'})
+
+        client = Client()
+        client.force_login(self.owner)
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post(reverse('edit_ad', args=[self.ad.id]), {
+                'title': 'Велосипед', 'description': 'Горный велосипед',
+                'category': 'books', 'condition': 'used'
+            })
+
+        response = self.get({'category': 'vehicles'})
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertNotContains(response, 'Велосипед')
+        response = self.get({'category': 'books'})
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Велосипед')
+
+    @override_settings(ADS_PAGE_CACHE_TIMEOUT=0)
+    def test_stale_while_revalidate(self):
+        """Устаревшую страницу пересчитывает только владелец блокировки"""
+        self.get()
+        with translation.override(settings.LANGUAGE_CODE):
+            lock = f'{page_key(())}:lock'
+
+        cache.add(lock, 1)
+        response = self.get()
+        self.assertEqual(response['X-Page-Cache'], 'stale')
+        self.assertContains(response, 'Велосипед')
+
+        cache.delete(lock)
+        self.assertEqual(self.get()['X-Page-Cache'], 'revalidated')
+        self.assertIsNone(cache.get(lock))
+
+    def entry_key(self):
+        with translation.override(settings.LANGUAGE_CODE):
+            return page_key(())
+
+    @override_settings(ADS_PAGE_CACHE_LOCK_WAIT=0)
+    def test_cold_miss_without_lock_not_stored(self):
+        """Без блокировки пустой кэш не заполняется параллельно"""
+        key = self.entry_key()
+        cache.add(f'{key}:lock', 1)
+        response = self.get()
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Велосипед')
+        self.assertIsNone(cache.get(key))
+
+    def test_cold_miss_waits_for_owner(self):
+        """Запрос без блокировки получает запись владельца блокировки"""
+        self.get()
+        key = self.entry_key()
+        entry = cache.get(key)
+        cache.delete(key)
+        cache.add(f'{key}:lock', 1)
+
+        with mock.patch.object(pagecache.time, 'sleep',
+                               side_effect=lambda _: cache.set(key, entry)):
+            response = self.get()
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertContains(response, 'Велосипед')
+
+    def test_invalidated_entry_takes_lock(self):
+        """Запись с устаревшей версией пересчитывается под блокировкой"""
+        self.get({'category': 'vehicles'})
+        with self.captureOnCommitCallbacks(execute=True):
+            AdService.update_ad(self.ad, self.owner, title='Самокат')
+
+        with mock.patch.object(pagecache.cache, 'add',
+                               wraps=cache.add) as add:
+            response = self.get({'category': 'vehicles'})
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertTrue(any(
+            call.args[0].endswith(':lock') for call in add.call_args_list
+        ))
+
+    def test_not_modified(self):
+        """Страница из кэша поддерживает If-Modified-Since"""
+        last_modified = self.get()['Last-Modified']
+        response = self.get(HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
@@ -0,0 +1,249 @@
+from datetime import datetime
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..models import Ad, ExchangeProposal
+from ..pagination import InvalidCursor, KeysetPaginator
+from ..services import ExchangeProposalService
+
+
+def create_ads(user, count, **extra):
+    return [
+        Ad.objects.create(
+            user=user, title=f'Объявление {i:02d}', description='Описание',
+            category='electronics', condition='new', **extra
+        )
+        for i in range(count)
+    ]
+
+
+class KeysetPaginatorTest(TestCase):
+    """Тесты keyset пагинатора"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123'
+        )
+        self.ads = create_ads(self.user, 7)
+        # Одинаковое время создания: порядок определяет id
+        Ad.objects.update(created_at=datetime(2025, 1, 1, 12, 0))
+        self.expected = list(Ad.objects.order_by('-created_at', '-id'))
+
+    def test_forward_and_backward_traversal(self):
+        """Проход вперед и назад возвращает все строки без повторов"""
+        paginator = KeysetPaginator(Ad.objects.all(), 3)
+        pages = [paginator.page()]
+        while pages[-1].has_next():
+            pages.append(paginator.page(pages[-1].next_cursor))
+
+        self.assertEqual(len(pages), 3)
+        self.assertFalse(pages[0].has_previous())
+        self.assertEqual(
+            [ad for page in pages for ad in page], self.expected
+        )
+
+        previous = paginator.page(pages[-1].previous_cursor)
+        self.assertEqual(list(previous), list(pages[1]))
+        self.assertTrue(previous.has_next())
+
+    def test_invalid_cursor(self):
+        """Поврежденный курсор: page() выбрасывает ошибку, get_page() - нет"""
+        paginator = KeysetPaginator(Ad.objects.all(), 3)
+        with self.assertRaises(InvalidCursor):
+            paginator.page('not-a-cursor')
+        self.assertEqual(
+            list(paginator.get_page('not-a-cursor')), self.expected[:3]
+        )
+
+    def test_cursor_bound_to_ordering(self):
+        """Курсор другой сортировки не принимается"""
+        cursor = KeysetPaginator(Ad.objects.all(), 3).page().next_cursor
+        with self.assertRaises(InvalidCursor):
+            KeysetPaginator(Ad.objects.order_by('title'), 3).page(cursor)
+
+
+class AdListPaginationViewTest(TestCase):
+    """Тесты пагинации списка объявлений"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123'
+        )
+        create_ads(self.user, 25)
+
+    def test_cursor_links(self):
+        """По умолчанию список использует курсоры"""
+        response = self.client.get(reverse('ads_list'))
+        page = response.context['ads']
+        self.assertIsNone(response.context['page_range'])
+        self.assertContains(response, f'?cursor={page.next_cursor}')
+
+        response = self.client.get(
+            reverse('ads_list'), {'cursor': page.next_cursor}
+        )
+        self.assertEqual(len(response.context['ads']), 10)
+        self.assertTrue(response.context['ads'].has_previous())
+
+    def test_legacy_page_param(self):
+        """Старые ссылки ?page= работают и показывают сокращенный список"""
+        response = self.client.get(reverse('ads_list'), {'page': 2})
+        self.assertEqual(response.context['ads'].number, 2)
+        self.assertEqual(list(response.context['page_range']), [1, 2, 3])
+        self.assertContains(response, '?page=3')
+
+
+class KeysetPaginationAPITest(APITestCase):
+    """Тесты курсорной пагинации API"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123'
+        )
+        self.other_user = User.objects.create_user(
+            username='otheruser', password='testpass123'
+        )
+        self.ads = create_ads(self.user, 25)
+        other_ad = create_ads(self.other_user, 1)[0]
+        for ad in self.ads:
+            ExchangeProposal.objects.create(
+                ad_sender=other_ad, ad_receiver=ad, comment='Обмен'
+            )
+        self.client.force_authenticate(user=self.user)
+
+    def _collect(self, url, params=None):
+        results, pages = [], 0
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            results.extend(response.data['results'])
+            pages += 1
+            if not response.data['next']:
+                return results, pages
+            response = self.client.get(response.data['next'])
+
+    def test_ads_traversal(self):
+        """Все объявления доступны по ссылкам next"""
+        results, pages = self._collect(reverse('api:ads:ad-list'))
+        self.assertEqual(len(results), 26)
+        self.assertEqual(len({ad['id'] for ad in results}), 26)
+        self.assertEqual(pages, 2)
+
+    def test_ordering_and_page_size(self):
+        """Курсор учитывает ordering и page_size"""
+        results, pages = self._collect(
+            reverse('api:ads:ad-list'), {'ordering': 'title', 'page_size': 5}
+        )
+        titles = [ad['title'] for ad in results]
+        self.assertEqual(titles, sorted(titles))
+        self.assertEqual(pages, 6)
+
+    def test_proposals_traversal(self):
+        """Пагинация предложений обмена"""
+        results, _ = self._collect(
+            reverse('api:proposals:proposal-list')
+        )
+        self.assertEqual(len(results), 25)
+
+    def test_count_is_opt_in(self):
+        """Количество возвращается только для представлений с count_strategy"""
+        response = self.client.get(reverse('api:ads:ad-list'))
+        self.assertEqual(response.data['count'], 26)
+        self.assertTrue(response.data['count_exact'])
+
+        response = self.client.get(reverse('api:proposals:proposal-list'))
+        self.assertNotIn('count', response.data)
+
+    def test_invalid_cursor(self):
+        """Неверный курсор возвращает 404"""
+        response = self.client.get(
+            reverse('api:ads:ad-list'), {'cursor': 'broken'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_page_number_rejected(self):
+        """Старый параметр page не игнорируется молча"""
+        response = self.client.get(reverse('api:ads:ad-list'), {'page': 2})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('cursor', str(response.data['page'][0]))
+
+
+class ProposalInboxTest(APITestCase):
+    """Тесты общего потока предложений обмена"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='trader', password='testpass123'
+        )
+        self.other = User.objects.create_user(
+            username='other', password='testpass123'
+        )
+        own_ads = create_ads(self.user, 15)
+        other_ads = create_ads(self.other, 15)
+        for i, (own, foreign) in enumerate(zip(own_ads, other_ads)):
+            if i % 3:
+                ExchangeProposal.objects.create(
+                    ad_sender=own, ad_receiver=foreign, comment=f'Отправил {i}'
+                )
+            else:
+                ExchangeProposal.objects.create(
+                    ad_sender=foreign, ad_receiver=own,
+                    comment=f'Получил {i}', status='accepted'
+                )
+
+    def test_inbox_service(self):
+        """Сервис возвращает страницу общего потока и количество"""
+        page, counts = ExchangeProposalService.get_inbox(
+            self.user, per_page=4
+        )
+        self.assertEqual(counts, {'all': 15, 'sent': 10, 'received': 5})
+        self.assertEqual(len(page), 4)
+        self.assertTrue(page.has_next())
+        directions = {proposal.direction for proposal in page}
+        self.assertEqual(directions, {'sent', 'received'})
+
+        page, counts = ExchangeProposalService.get_inbox(
+            self.user, box='received', status='accepted'
+        )
+        self.assertEqual(len(page), 5)
+        self.assertEqual(counts['sent'], 0)
+
+    def test_web_view_is_paginated(self):
+        """Страница предложений показывает ограниченную страницу"""
+        self.client.force_login(self.user)
+        url = reverse('exchange_proposals_list')
+        with self.assertNumQueries(5):
+            # сессия, пользователь, страница, количество, статистика
+            response = self.client.get(url)
+        page = response.context['proposals']
+        self.assertEqual(len(page), 15)
+
+        response = self.client.get(url, {'filter_type': 'sent'})
+        self.assertEqual(len(response.context['proposals']), 10)
+        self.assertContains(response, 'Отправил 1')
+        self.assertNotContains(response, 'Получил 0')
+
+    def test_api_inbox(self):
+        """API входящих: курсор, количество и направление"""
+        self.client.force_authenticate(user=self.user)
+        url = reverse('api:proposals:proposal-inbox')
+        response = self.client.get(url, {'page_size': 10})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['counts']['all'], 15)
+        self.assertEqual(len(response.data['results']), 10)
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['next'])
+
+        response = self.client.get(url, {'box': 'received'})
+        self.assertEqual(
+            {item['direction'] for item in response.data['results']},
+            {'received'}
+        )
+
+        response = self.client.get(url, {'box': 'unknown'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
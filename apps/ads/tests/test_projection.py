@@ -0,0 +1,111 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from api.ads.serializers import AdListSerializer, AdSerializer
+from api.ads.views import AdViewSet
+from api.projection import ValuesSerializer
+from api.proposals.serializers import ExchangeProposalSerializer
+from api.proposals.views import ExchangeProposalViewSet
+
+from ..models import Ad, ExchangeProposal
+from ..services import ExchangeProposalService
+
+
+class ValuesSerializerTest(APITestCase):
+    """Тесты быстрого пути чтения списков через values()"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='owner', password='testpass123', first_name='Иван'
+        )
+        self.other = User.objects.create_user(
+            username='other', password='testpass123'
+        )
+        self.ads = [
+            Ad.objects.create(
+                user=self.user, title=f'Книга {i}', description='Роман',
+                category='books', condition='used',
+                image_url='https://example.com/1.png' if i % 2 else None
+            )
+            for i in range(3)
+        ]
+        self.other_ad = Ad.objects.create(
+            user=self.other, title='Лампа', description='Настольная',
+            category='furniture', condition='new'
+        )
+        for ad in self.ads[:2]:
+            ExchangeProposalService.create_proposal(
+                self.other, self.other_ad, ad, comment='Обмен'
+            )
+
+    def render(self, data):
+        return JSONRenderer().render(data)
+
+    def test_output_matches_model_serializer(self):
+        """JSON совпадает с ModelSerializer байт в байт"""
+        cases = [
+            (AdListSerializer, Ad.objects.order_by('-created_at', '-id')),
+            (ExchangeProposalSerializer,
+             ExchangeProposal.objects.order_by('-created_at', '-id')),
+        ]
+        for serializer_class, queryset in cases:
+            projection = ValuesSerializer(serializer_class)
+            self.assertEqual(
+                self.render(projection.to_representation(
+                    projection.values(queryset)
+                )),
+                self.render(serializer_class(queryset, many=True).data)
+            )
+
+    def test_values_skip_unused_columns(self):
+        """Тяжелые колонки вроде description не выбираются"""
+        projection = ValuesSerializer(AdListSerializer)
+        self.assertNotIn('description', projection.columns)
+        self.assertIn('user__username', projection.columns)
+        # Одним запросом с JOIN пользователя
+        with self.assertNumQueries(1):
+            projection.to_representation(projection.values(Ad.objects.all()))
+
+    def test_method_fields_are_rejected(self):
+        """Поля SerializerMethodField не проецируются"""
+        with self.assertRaises(ImproperlyConfigured):
+            ValuesSerializer(AdSerializer).columns
+
+    def test_api_lists_are_identical(self):
+        """Ответы списков API совпадают с путем через ModelSerializer"""
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        cases = [
+            (AdViewSet, reverse('api:ads:ad-list'),
+             {'page_size': 2, 'ordering': 'title'}),
+            (ExchangeProposalViewSet,
+             reverse('api:proposals:proposal-list'), {}),
+        ]
+        for viewset, url, params in cases:
+            fast = self.client.get(url, params)
+            with mock.patch.object(viewset, 'list_projection', None):
+                slow = self.client.get(url, params)
+            self.assertEqual(fast.status_code, 200)
+            self.assertEqual(fast.content, slow.content)
+
+        # Переход по курсору работает со строками values()
+        next_url = self.client.get(
+            reverse('api:ads:ad-list'), {'page_size': 2}
+        ).data['next']
+        self.assertEqual(len(self.client.get(next_url).data['results']), 2)
+
+    def test_benchmark_command(self):
+        """Команда сравнения проверяет совпадение вывода"""
+        out = StringIO()
+        call_command(
+            'benchmark_list_serializers', '--iterations', '2', stdout=out
+        )
+        self.assertIn('Outputs are identical', out.getvalue())
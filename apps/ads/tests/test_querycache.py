@@ -0,0 +1,167 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+
+from ..models import Ad, ExchangeProposal
+from ..querycache import get_cache_key, query_cache_lookup
+from ..services import AdService, ExchangeProposalService
+
+
+@override_settings(ADS_QUERY_CACHE_TIMEOUT=300)
+class QueryCacheTest(TestCase):
+    """Тесты кэша результатов запросов ORM"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='owner', password='testpass123'
+        )
+        self.other = User.objects.create_user(
+            username='other', password='testpass123'
+        )
+        self.ad = self.create_ad(self.user, 'Велосипед')
+        self.other_ad = self.create_ad(self.other, 'Самокат', 'toys')
+
+        self.lookups = []
+        query_cache_lookup.connect(self.on_lookup)
+        self.addCleanup(query_cache_lookup.disconnect, self.on_lookup)
+
+    def on_lookup(self, sender, hit, key, **kwargs):
+        self.lookups.append((sender, hit))
+
+    def create_ad(self, user, title, category='vehicles'):
+        return AdService.create_ad(
+            user=user, title=title, description='Описание товара',
+            category=category, condition='used'
+        )
+
+    def titles(self, queryset):
+        return sorted(ad.title for ad in queryset)
+
+    def test_hit_and_metrics(self):
+        """Повторный запрос берется из кэша, обращения видны в сигнале"""
+        vehicles = Ad.objects.filter(category='vehicles').cached()
+        self.assertEqual(self.titles(vehicles), ['Велосипед'])
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.titles(Ad.objects.filter(category='vehicles').cached()),
+                ['Велосипед']
+            )
+            self.assertEqual(
+                self.titles(Ad.objects.filter(category='vehicles').cached()),
+                ['Велосипед']
+            )
+        self.assertEqual(self.lookups, [(Ad, False), (Ad, True), (Ad, True)])
+
+    def test_invalidated_by_save_and_delete(self):
+        """post_save и post_delete сбрасывают тег таблицы"""
+        queryset = Ad.objects.cached()
+        self.assertEqual(len(list(queryset.all())), 2)
+
+        AdService.update_ad(self.ad, self.user, title='Горный велосипед')
+        self.assertIn('Горный велосипед', self.titles(queryset.all()))
+
+        AdService.delete_ad(self.other_ad, self.other)
+        self.assertEqual(self.titles(queryset.all()), ['Горный велосипед'])
+
+    def test_invalidated_by_bulk_update(self):
+        """Массовый update() при принятии предложения сбрасывает кэш"""
+        second_ad = self.create_ad(self.user, 'Ролики', 'toys')
+        accepted = ExchangeProposalService.create_proposal(
+            self.user, self.ad, self.other_ad
+        )
+        other = ExchangeProposalService.create_proposal(
+            self.user, second_ad, self.other_ad
+        )
+        statuses = ExchangeProposal.objects.values_list(
+            'id', 'status'
+        ).cached()
+        self.assertEqual(dict(statuses.all())[other.id], 'pending')
+
+        ExchangeProposalService.update_proposal_status(
+            accepted, self.other, 'accepted'
+        )
+        self.assertEqual(dict(statuses.all())[other.id], 'rejected')
+
+    def test_bumped_again_after_commit(self):
+        """Значения, закэшированные до фиксации записи, отбрасываются"""
+        queryset = Ad.objects.filter(category='vehicles').cached()
+        with self.captureOnCommitCallbacks(execute=True):
+            AdService.update_ad(self.ad, self.user, title='Горный велосипед')
+            key = get_cache_key(queryset)
+        self.assertNotEqual(get_cache_key(queryset), key)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Ad.objects.filter(pk=self.ad.pk).update(title='Велосипед')
+            key = get_cache_key(queryset.cached(rows=[self.ad.pk]))
+        self.assertNotEqual(
+            get_cache_key(queryset.cached(rows=[self.ad.pk])), key
+        )
+
+    def test_related_table(self):
+        """Изменение владельца из select_related сбрасывает кэш"""
+        queryset = Ad.objects.select_related('user').cached()
+        self.assertIn('owner', [ad.user.username for ad in queryset.all()])
+
+        self.user.username = 'renamed'
+        self.user.save()
+        self.assertIn('renamed', [ad.user.username for ad in queryset.all()])
+
+    def test_related_rows_tagged_by_result(self):
+        """Сохранение другого пользователя не сбрасывает кэш владельцев"""
+        queryset = Ad.objects.filter(pk=self.ad.pk).select_related('user')
+        queryset = queryset.cached()
+        self.assertEqual(queryset.get().user.username, 'owner')
+
+        User.objects.create_user(username='newcomer', password='x')
+        self.other.set_password('newpass123')
+        self.other.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(queryset.get().user.username, 'owner')
+
+        self.user.first_name = 'Иван'
+        self.user.save()
+        self.assertEqual(queryset.get().user.first_name, 'Иван')
+
+        # Фильтр по присоединенной таблице зависит от всей таблицы
+        filtered = Ad.objects.filter(user__first_name='Иван').cached()
+        self.assertEqual(self.titles(filtered.all()), ['Велосипед'])
+        self.other.first_name = 'Иван'
+        self.other.save()
+        self.assertEqual(
+            self.titles(filtered.all()), ['Велосипед', 'Самокат']
+        )
+
+    def test_row_tags(self):
+        """Запись с тегами строк не зависит от других строк таблицы"""
+        queryset = Ad.objects.filter(pk=self.ad.pk).cached(rows=[self.ad.pk])
+        self.assertEqual(self.titles(queryset.all()), ['Велосипед'])
+
+        AdService.update_ad(self.other_ad, self.other, title='Электросамокат')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.titles(queryset.all()), ['Велосипед'])
+
+        AdService.update_ad(self.ad, self.user, title='Горный велосипед')
+        self.assertEqual(self.titles(queryset.all()), ['Горный велосипед'])
+
+        Ad.objects.filter(pk=self.ad.pk).update(title='Шоссейный велосипед')
+        self.assertEqual(self.titles(queryset.all()), ['Шоссейный велосипед'])
+
+    @override_settings(ADS_QUERY_CACHE_COMPRESS_MIN_SIZE=0)
+    def test_compressed_values(self):
+        """Сжатые результаты values_list() восстанавливаются"""
+        queryset = Ad.objects.values_list('title', flat=True).cached()
+        self.assertEqual(sorted(queryset.all()), ['Велосипед', 'Самокат'])
+        compressed = cache.get(get_cache_key(queryset.all()))[0]
+        self.assertTrue(compressed)
+        self.assertEqual(sorted(queryset.all()), ['Велосипед', 'Самокат'])
+
+    def test_not_cacheable(self):
+        """Пустой IN и неотслеживаемые таблицы"""
+        self.assertEqual(list(Ad.objects.filter(pk__in=[]).cached()), [])
+        self.assertEqual(self.lookups, [])
+
+        queryset = Ad.objects.filter(user__stats__ads_count__gt=0).cached()
+        with self.assertRaises(ImproperlyConfigured):
+            list(queryset)
@@ -0,0 +1,88 @@
+import json
+
+import msgpack
+from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from api.renderers import ORJSONRenderer
+
+from ..models import Ad
+
+
+class RendererTest(APITestCase):
+    """Тесты рендереров и парсеров orjson и MessagePack"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123'
+        )
+        Ad.objects.create(
+            user=self.user, title='Чайник электрический',
+            description='Почти новый', category='electronics',
+            condition='used'
+        )
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.url = reverse('api:ads:ad-list')
+
+    def test_orjson_matches_json_renderer(self):
+        """orjson выводит тот же JSON, что и JSONRenderer"""
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(
+            response.content, JSONRenderer().render(response.data)
+        )
+        self.assertEqual(
+            ORJSONRenderer().render({'a': 1}, 'application/json; indent=2'),
+            b'{\n  "a": 1\n}'
+        )
+        # BrowsableAPIRenderer передает отступ в renderer_context
+        self.assertEqual(
+            ORJSONRenderer().render({'a': 1}, 'application/json',
+                                    {'indent': 4}),
+            b'{\n  "a": 1\n}'
+        )
+        self.assertEqual(
+            ORJSONRenderer().render({'a': 1}, 'application/json; indent=0',
+                                    {'indent': 4}),
+            b'{"a":1}'
+        )
+
+    def test_msgpack_content_negotiation(self):
+        """Клиент получает MessagePack по заголовку Accept"""
+        response = self.client.get(
+            self.url, HTTP_ACCEPT='application/msgpack'
+        )
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(
+            msgpack.unpackb(response.content),
+            json.loads(self.client.get(self.url).content)
+        )
+
+    def test_msgpack_request_body(self):
+        """Тело запроса в MessagePack"""
+        response = self.client.post(
+            self.url,
+            msgpack.packb({
+                'title': 'Книга', 'description': 'Сборник рассказов',
+                'category': 'books', 'condition': 'new',
+            }),
+            content_type='application/msgpack'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Ad.objects.filter(title='Книга').exists())
+
+    def test_invalid_bodies(self):
+        """Поврежденное тело запроса возвращает 400"""
+        for content_type, body in (('application/json', b'{"title":'),
+                                   ('application/msgpack', b'\xc1')):
+            response = self.client.post(
+                self.url, body, content_type=content_type
+            )
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST
+            )
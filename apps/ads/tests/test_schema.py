@@ -0,0 +1,77 @@
+import gzip
+import json
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+
+class StaticSchemaTest(SimpleTestCase):
+    """Тесты заранее сгенерированной схемы OpenAPI"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = tempfile.TemporaryDirectory()
+        cls.settings = override_settings(API_SCHEMA_ROOT=cls.root.name)
+        cls.settings.enable()
+        call_command('generate_api_schema', stdout=StringIO())
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        cls.root.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.url = reverse('api:schema')
+
+    def test_artifacts_for_languages(self):
+        """Схема сохраняется для каждого языка в YAML, JSON и gzip"""
+        for lang in ('ru', 'en'):
+            response = self.client.get(
+                self.url, {'lang': lang, 'format': 'json'}
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                response['Content-Type'], 'application/vnd.oai.openapi+json'
+            )
+            schema = json.loads(response.content)
+            self.assertIn('/api/ads/', schema['paths'])
+
+        response = self.client.get(self.url)
+        self.assertTrue(response.content.startswith(b'openapi:'))
+
+    def test_etag_and_gzip(self):
+        """Сильный ETag, 304 и сжатая версия файла"""
+        response = self.client.get(self.url, HTTP_ACCEPT='application/json')
+        etag = response['ETag']
+        self.assertFalse(etag.startswith('W/'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+        response = self.client.get(
+            self.url, HTTP_ACCEPT='application/json', HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(
+            self.url, HTTP_ACCEPT='application/json',
+            HTTP_ACCEPT_ENCODING='gzip, deflate'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('paths', json.loads(gzip.decompress(response.content)))
+
+    def test_missing_artifact(self):
+        """Без файлов схема генерируется на лету только при DEBUG"""
+        with tempfile.TemporaryDirectory() as empty, \
+                override_settings(API_SCHEMA_ROOT=empty):
+            with self.assertLogs('api.schema', 'ERROR'):
+                response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 404)
+
+            with override_settings(DEBUG=True):
+                response = self.client.get(self.url, {'format': 'json'})
+            self.assertEqual(response.status_code, 200)
@@ -0,0 +1,204 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.users.views import UserViewSet
+
+from ..filters import AdFilter
+from ..models import Ad
+from ..search import (HIGHLIGHT_START, fuzzy_search, search_queryset,
+                      trigram_similarity)
+from ..services import AdService
+
+
+class AdSearchTest(TestCase):
+    """Тесты полнотекстового поиска объявлений"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123'
+        )
+        self.title_match = Ad.objects.create(
+            user=self.user,
+            title='Велосипед горный',
+            description='Отличное состояние, почти не использовался',
+            category='vehicles',
+            condition='used'
+        )
+        self.description_match = Ad.objects.create(
+            user=self.user,
+            title='Шлем',
+            description='Подходит для езды на велосипеде по городу',
+            category='other',
+            condition='new'
+        )
+        self.other = Ad.objects.create(
+            user=self.user,
+            title='Книга рецептов',
+            description='Сборник рецептов домашней кухни',
+            category='books',
+            condition='used'
+        )
+
+    def test_title_ranked_above_description(self):
+        """Совпадение в заголовке ранжируется выше совпадения в описании"""
+        results = list(search_queryset(Ad.objects.all(), 'велосипед'))
+        self.assertEqual(results, [self.title_match, self.description_match])
+
+    def test_prefix_and_case_insensitive(self):
+        """Поиск по началу слова без учета регистра"""
+        results = search_queryset(Ad.objects.all(), 'ВЕЛОС')
+        self.assertIn(self.title_match, results)
+
+    def test_index_follows_updates_and_deletes(self):
+        """Индекс обновляется при изменении и удалении объявления"""
+        AdService.update_ad(self.other, self.user, title='Самокат детский')
+        self.assertEqual(
+            list(search_queryset(Ad.objects.all(), 'самокат')), [self.other]
+        )
+        self.assertFalse(search_queryset(Ad.objects.all(), 'книга'))
+
+        self.other.delete()
+        self.assertFalse(search_queryset(Ad.objects.all(), 'самокат'))
+
+    def test_special_characters_are_ignored(self):
+        """Спецсимволы в запросе не ломают поиск"""
+        results = search_queryset(Ad.objects.all(), '"велосипед* (-')
+        self.assertEqual(results.count(), 2)
+
+    def test_headline_highlights_match(self):
+        """Фрагмент описания содержит подсветку совпадения"""
+        ad = search_queryset(Ad.objects.all(), 'городу').get()
+        self.assertIn(HIGHLIGHT_START, ad.search_headline)
+
+    def test_service_and_filter_use_search(self):
+        """AdService.search_ads и AdFilter используют поисковый индекс"""
+        self.assertEqual(
+            list(AdService.search_ads(query='велосипед', category='other')),
+            [self.description_match]
+        )
+        filterset = AdFilter(
+            {'search': 'рецептов'}, queryset=Ad.objects.all()
+        )
+        self.assertEqual(list(filterset.qs), [self.other])
+
+    def test_ads_list_highlights_snippet(self):
+        """Список объявлений показывает подсвеченный фрагмент"""
+        response = self.client.get(reverse('ads_list'), {'q': 'городу'})
+        self.assertContains(response, '<mark>городу</mark>', html=False)
+        self.assertNotContains(response, 'Книга рецептов')
+
+
+class AdSearchAPITest(APITestCase):
+    """Тесты поиска через API"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123'
+        )
+        self.ads = [
+            Ad.objects.create(
+                user=self.user, title=title, description=description,
+                category='electronics', condition='new'
+            )
+            for title, description in [
+                ('Чехол', 'Чехол для телефона, силиконовый'),
+                ('Телефон', 'Смартфон в хорошем состоянии'),
+                ('Наушники', 'Беспроводные наушники'),
+            ]
+        ]
+
+    def test_search_param_orders_by_relevance(self):
+        """Параметр search сортирует результаты по релевантности"""
+        response = self.client.get(
+            reverse('api:ads:ad-list'), {'search': 'телефон'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        titles = [ad['title'] for ad in response.data['results']]
+        self.assertEqual(titles, ['Телефон', 'Чехол'])
+
+    def test_explicit_ordering_overrides_relevance(self):
+        """Явный параметр ordering имеет приоритет над релевантностью"""
+        response = self.client.get(
+            reverse('api:ads:ad-list'),
+            {'search': 'телефон', 'ordering': '-title'}
+        )
+        titles = [ad['title'] for ad in response.data['results']]
+        self.assertEqual(titles, ['Чехол', 'Телефон'])
+
+
+class FuzzySearchTest(APITestCase):
+    """Тесты поиска с опечатками и подсказок"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='aleksandr', password='testpass123',
+            first_name='Александр', last_name='Петров'
+        )
+        User.objects.create_user(username='maria', password='testpass123')
+        self.bicycle = Ad.objects.create(
+            user=self.user, title='Велосипед горный',
+            description='Отличное состояние', category='vehicles',
+            condition='used'
+        )
+        Ad.objects.create(
+            user=self.user, title='Книга рецептов',
+            description='Сборник рецептов', category='books',
+            condition='used'
+        )
+
+    def test_trigram_similarity_matches_pg_trgm(self):
+        """Расчет сходства совпадает с pg_trgm"""
+        self.assertEqual(trigram_similarity('word', 'word'), 1.0)
+        self.assertAlmostEqual(
+            trigram_similarity('word', 'two words'), 4 / 11
+        )
+        self.assertEqual(trigram_similarity('', 'word'), 0.0)
+
+    def test_fuzzy_search_tolerates_typos(self):
+        """Нечеткий поиск находит заголовок с опечаткой в запросе"""
+        results = list(fuzzy_search(Ad.objects.all(), ['title'], 'велосипд'))
+        self.assertEqual(results, [self.bicycle])
+        self.assertGreater(results[0].similarity, 0.3)
+
+    def test_ads_list_suggestion(self):
+        """Список объявлений предлагает исправление для запроса с опечаткой"""
+        response = self.client.get(reverse('ads_list'), {'q': 'велосипд'})
+        self.assertEqual(response.context['suggestion'], 'Велосипед горный')
+        self.assertContains(response, 'Велосипед горный')
+
+    def test_api_fuzzy_param_and_suggestion(self):
+        """API: параметр fuzzy и подсказка для пустого результата"""
+        url = reverse('api:ads:ad-list')
+        response = self.client.get(url, {'fuzzy': 'велосипд'})
+        self.assertEqual(
+            [ad['title'] for ad in response.data['results']],
+            ['Велосипед горный']
+        )
+
+        response = self.client.get(url, {'search': 'велосипд'})
+        self.assertEqual(response.data['results'], [])
+        self.assertEqual(response.data['suggestion'], 'Велосипед горный')
+
+    def test_api_user_suggestion(self):
+        """API пользователей: подсказка логина для пустого результата"""
+        response = self.client.get(
+            reverse('api:users:user-list'), {'search': 'zzz'}
+        )
+        self.assertEqual(response.data['results'], [])
+        self.assertIn('suggestion', response.data)
+
+        view = UserViewSet(action='list', format_kwarg=None)
+        self.assertEqual(view.get_suggestion('aleksandar'), 'aleksandr')
+
+    def test_user_search_by_similarity(self):
+        """Поиск пользователей учитывает опечатки в имени и логине"""
+        url = reverse('api:users:user-list')
+        for query in ('Алексанр', 'aleksanderr', 'петр'):
+            response = self.client.get(url, {'search': query})
+            self.assertEqual(
+                [user['username'] for user in response.data['results']],
+                ['aleksandr']
+            )
@@ -0,0 +1,169 @@
+from datetime import datetime, timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Ad, AdListSnapshot
+from ..services import AdService, AdSnapshotService
+
+
+class AdSnapshotTest(TestCase):
+    """Тесты снимков первых страниц списка объявлений"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='owner', password='testpass123'
+        )
+        self.viewer = User.objects.create_user(
+            username='viewer', password='testpass123'
+        )
+
+    def create_ad(self, title='Велосипед', category='vehicles',
+                  condition='used'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return AdService.create_ad(
+                user=self.user, title=title, description='Описание товара',
+                category=category, condition=condition
+            )
+
+    def snapshot(self, key):
+        return AdListSnapshot.objects.get(key=key)
+
+    def create_ads(self, count):
+        """Объявления с возрастающим временем создания"""
+        ads = [self.create_ad(f'Объявление {i:02d}') for i in range(count)]
+        start = datetime(2025, 1, 1, 12, 0)
+        for i, ad in enumerate(ads):
+            Ad.objects.filter(pk=ad.pk).update(
+                created_at=start + timedelta(minutes=i)
+            )
+        AdSnapshotService.rebuild()
+        return ads[::-1]
+
+    def list_page(self, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('ads_list'), params or {})
+        ordered = [
+            query['sql'] for query in queries.captured_queries
+            if 'FROM "ads_ad"' in query['sql'] and 'ORDER BY' in query['sql']
+        ]
+        return response, ordered
+
+    def test_create_update_delete(self):
+        """Изменения через AdService обновляют затронутые снимки"""
+        ad = self.create_ad()
+        for key in ('vehicles:used', 'vehicles:', ':used', ':'):
+            snapshot = self.snapshot(key)
+            self.assertEqual(snapshot.total, 1)
+            self.assertEqual(snapshot.ad_ids, [ad.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            AdService.update_ad(ad, self.user, condition='new')
+        self.assertEqual(self.snapshot('vehicles:used').total, 0)
+        self.assertEqual(self.snapshot(':used').ad_ids, [])
+        self.assertEqual(self.snapshot('vehicles:new').ad_ids, [ad.id])
+        self.assertEqual(self.snapshot('vehicles:').total, 1)
+        self.assertEqual(self.snapshot(':').total, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            AdService.delete_ad(ad, self.user)
+        for key in ('vehicles:new', 'vehicles:', ':new', ':'):
+            snapshot = self.snapshot(key)
+            self.assertEqual(snapshot.total, 0)
+            self.assertEqual(snapshot.ad_ids, [])
+
+    def test_updated_after_commit(self):
+        """Снимки обновляются после фиксации транзакции"""
+        with self.captureOnCommitCallbacks() as callbacks:
+            AdService.create_ad(
+                user=self.user, title='Велосипед',
+                description='Описание товара', category='vehicles',
+                condition='used'
+            )
+        self.assertFalse(AdListSnapshot.objects.exists())
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.snapshot(':').total, 1)
+
+    def test_web_edit_moves_ad(self):
+        """Перенос объявления формой в другую категорию"""
+        ad = self.create_ad()
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('edit_ad', args=[ad.id]), {
+                'title': 'Велосипед', 'description': 'Описание товара',
+                'category': 'books', 'condition': 'new'
+            })
+
+        for key in ('vehicles:used', 'vehicles:', ':used'):
+            snapshot = self.snapshot(key)
+            self.assertEqual(snapshot.total, 0)
+            self.assertEqual(snapshot.ad_ids, [])
+        for key in ('books:new', 'books:', ':new', ':'):
+            snapshot = self.snapshot(key)
+            self.assertEqual(snapshot.total, 1)
+            self.assertEqual(snapshot.ad_ids, [ad.id])
+
+    def test_first_page_from_snapshot(self):
+        """Первая страница для анонима без сортировки и COUNT"""
+        ads = self.create_ads(3)
+        response, ordered = self.list_page({'category': 'vehicles'})
+
+        self.assertEqual(ordered, [])
+        self.assertEqual(list(response.context['ads']), ads)
+        self.assertEqual(response.context['total'].value, 3)
+        self.assertFalse(response.context['ads'].has_next())
+
+    def test_next_page_cursor(self):
+        """Курсор первой страницы из снимка ведет на вторую"""
+        ads = self.create_ads(12)
+        response, _ = self.list_page()
+        page = response.context['ads']
+        self.assertEqual(list(page), ads[:10])
+        self.assertTrue(page.has_next())
+
+        response, _ = self.list_page({'cursor': page.next_cursor})
+        self.assertEqual(list(response.context['ads']), ads[10:])
+
+    def test_fallback(self):
+        """Пользователь, отсутствующий или устаревший снимок"""
+        ads = self.create_ads(2)
+
+        self.client.force_login(self.viewer)
+        response, ordered = self.list_page()
+        self.assertTrue(ordered)
+        self.assertEqual(list(response.context['ads']), ads)
+        self.client.logout()
+
+        AdListSnapshot.objects.filter(key=':').delete()
+        response, ordered = self.list_page()
+        self.assertTrue(ordered)
+        self.assertEqual(list(response.context['ads']), ads)
+
+        # Удаление в обход AdService: устаревший снимок пересчитывается
+        Ad.objects.filter(pk=ads[0].pk).delete()
+        with self.assertLogs('apps.ads.services', 'WARNING'):
+            response, _ = self.list_page({'category': 'vehicles'})
+        self.assertEqual(list(response.context['ads']), ads[1:])
+        self.assertEqual(response.context['total'].value, 1)
+        self.assertEqual(self.snapshot('vehicles:').total, 1)
+
+        response, ordered = self.list_page({'category': 'vehicles'})
+        self.assertEqual(ordered, [])
+        self.assertEqual(list(response.context['ads']), ads[1:])
+
+    def test_rebuild(self):
+        """rebuild() создает недостающие и исправляет расхождения"""
+        ad = self.create_ad()
+        self.assertEqual(AdSnapshotService.rebuild(), 20)
+        self.assertEqual(AdListSnapshot.objects.count(), 24)
+        self.assertEqual(AdSnapshotService.rebuild(), 0)
+
+        AdListSnapshot.objects.filter(key=':').update(total=5, ad_ids=[])
+        self.assertEqual(AdSnapshotService.rebuild(), 1)
+        snapshot = self.snapshot(':')
+        self.assertEqual(snapshot.total, 1)
+        self.assertEqual(snapshot.ad_ids, [ad.id])
@@ -0,0 +1,121 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from api.ads.views import AdViewSet
+from api.proposals.views import ExchangeProposalViewSet
+
+from ..models import Ad
+from ..services import ExchangeProposalService
+
+
+class SparseFieldsTest(APITestCase):
+    """Тесты параметров ?fields= и ?expand="""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='owner', password='testpass123'
+        )
+        self.other = User.objects.create_user(
+            username='other', password='testpass123'
+        )
+        self.ad = Ad.objects.create(
+            user=self.user, title='Велосипед', description='Горный',
+            category='vehicles', condition='used'
+        )
+        self.other_ad = Ad.objects.create(
+            user=self.other, title='Самокат', description='Детский',
+            category='vehicles', condition='new'
+        )
+        self.proposal = ExchangeProposalService.create_proposal(
+            self.other, self.other_ad, self.ad, comment='Меняю'
+        )
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def test_ads_list_fields(self):
+        """Список объявлений только с запрошенными полями"""
+        response = self.client.get(
+            reverse('api:ads:ad-list'), {'fields': 'id,title,user'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first = response.data['results'][0]
+        self.assertEqual(list(first), ['id', 'title', 'user'])
+        # Связь без expand - идентификатор
+        self.assertIsInstance(first['user'], int)
+
+        response = self.client.get(
+            reverse('api:ads:ad-list'),
+            {'fields': 'id,user', 'expand': 'user'}
+        )
+        self.assertIn('username', response.data['results'][0]['user'])
+
+    def test_values_path_matches_serializer(self):
+        """Список через values() совпадает с ModelSerializer"""
+        cases = [
+            (AdViewSet, reverse('api:ads:ad-list'), {'fields': 'id,user'}),
+            (ExchangeProposalViewSet, reverse('api:proposals:proposal-list'),
+             {'fields': 'id,ad_sender,receiver_user',
+              'expand': 'ad_sender'}),
+        ]
+        for viewset, url, params in cases:
+            fast = self.client.get(url, params)
+            with mock.patch.object(viewset, 'list_projection', None):
+                slow = self.client.get(url, params)
+            self.assertEqual(fast.content, slow.content)
+
+    def test_retrieve_skips_counters(self):
+        """Незапрошенные счетчики не загружаются"""
+        url = reverse('api:ads:ad-detail', args=[self.ad.id])
+        # токен и объявление
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'fields': 'id,title'})
+        self.assertEqual(response.data, {'id': self.ad.id,
+                                         'title': 'Велосипед'})
+
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                url, {'fields': 'id,received_proposals_count'}
+            )
+        self.assertEqual(response.data['received_proposals_count'], 1)
+
+    def test_proposals_unrequested_relations(self):
+        """Незапрошенные связи предложений не дают JOIN и запросов"""
+        url = reverse('api:proposals:proposal-detail',
+                      args=[self.proposal.id])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'fields': 'id,status,ad_sender'})
+        self.assertEqual(response.data, {
+            'id': self.proposal.id, 'status': 'pending',
+            'ad_sender': self.other_ad.id,
+        })
+        # токен и предложение
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('JOIN', queries[1]['sql'])
+        self.assertNotIn('"comment"', queries[1]['sql'])
+
+        response = self.client.get(
+            reverse('api:proposals:proposal-list'),
+            {'expand': 'ad_receiver'}
+        )
+        item = response.data['results'][0]
+        self.assertEqual(item['ad_receiver']['title'], 'Велосипед')
+        self.assertEqual(item['ad_sender'], self.other_ad.id)
+        self.assertEqual(item['sender_user'], self.other.id)
+
+    def test_unknown_names(self):
+        """Неизвестные поля и связи - ошибка 400"""
+        url = reverse('api:ads:ad-list')
+        for params in ({'fields': 'id,password'}, {'expand': 'title'}):
+            response = self.client.get(url, params)
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST
+            )
@@ -0,0 +1,228 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from .. import surrogate
+from ..models import Ad
+from ..services import AdService, ExchangeProposalService
+
+
+class SurrogateKeyHeadersTest(APITestCase):
+    """Тесты заголовков Surrogate-Key и Cache-Control"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='owner', password='testpass123'
+        )
+        self.ad = Ad.objects.create(
+            user=self.user, title='Велосипед', description='Горный велосипед',
+            category='vehicles', condition='used'
+        )
+
+    def keys(self, response):
+        return set(response['Surrogate-Key'].split())
+
+    def test_api_anonymous(self):
+        """Анонимные ответы API помечаются тегами для прокси"""
+        response = self.client.get(reverse('api:ads:ad-list'))
+        self.assertEqual(
+            self.keys(response), {'ads', 'ads-list', f'ad-{self.ad.id}'}
+        )
+        self.assertIn('public', response['Cache-Control'])
+        self.assertEqual(response['Surrogate-Control'], 'max-age=300')
+
+        response = self.client.get(
+            reverse('api:ads:ad-list'),
+            {'category': 'books', 'search': 'книга'}
+        )
+        self.assertEqual(
+            self.keys(response), {'ads', 'category-books', 'ads-search'}
+        )
+
+        response = self.client.get(
+            reverse('api:ads:ad-detail', args=[self.ad.id])
+        )
+        self.assertEqual(self.keys(response), {'ads', f'ad-{self.ad.id}'})
+
+    def test_authenticated_is_private(self):
+        """Ответы пользователю с токеном прокси не кэширует"""
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        response = self.client.get(reverse('api:ads:ad-list'))
+        self.assertIn('private', response['Cache-Control'])
+        self.assertNotIn('Surrogate-Key', response)
+        self.assertIn('Authorization', response['Vary'])
+
+    def test_web_list(self):
+        """Страница списка объявлений"""
+        response = self.client.get(reverse('ads_list'),
+                                   {'category': 'vehicles'})
+        self.assertEqual(
+            self.keys(response),
+            {'ads', 'category-vehicles', f'ad-{self.ad.id}'}
+        )
+
+
+class SurrogatePurgeTest(TestCase):
+    """Тесты очистки кэша прокси при изменении объявлений"""
+
+    def setUp(self):
+        surrogate.outbox.clear()
+        self.user = User.objects.create_user(
+            username='owner', password='testpass123'
+        )
+        self.other = User.objects.create_user(
+            username='other', password='testpass123'
+        )
+
+    def create_ad(self, user, category='vehicles'):
+        return AdService.create_ad(
+            user=user, title='Велосипед', description='Горный велосипед',
+            category=category, condition='used'
+        )
+
+    def test_service_changes(self):
+        """Создание, изменение и удаление очищают затронутые ответы"""
+        with self.captureOnCommitCallbacks(execute=True):
+            ad = self.create_ad(self.user)
+        self.assertEqual(surrogate.outbox.pop(), sorted([
+            f'ad-{ad.id}', 'ads-list', 'ads-search', 'category-vehicles'
+        ]))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            AdService.update_ad(ad, self.user, category='books')
+        self.assertEqual(surrogate.outbox.pop(), sorted([
+            f'ad-{ad.id}', 'ads-search', 'category-books',
+            'category-vehicles'
+        ]))
+
+        ad_id = ad.id
+        with self.captureOnCommitCallbacks(execute=True):
+            AdService.delete_ad(ad, self.user)
+        self.assertEqual(surrogate.outbox.pop(), sorted([
+            f'ad-{ad_id}', 'ads-list', 'ads-search', 'category-books'
+        ]))
+
+    def test_web_edit_purges_previous_category(self):
+        """Форма редактирования очищает и прежнюю категорию"""
+        with self.captureOnCommitCallbacks(execute=True):
+            ad = self.create_ad(self.user)
+        surrogate.outbox.clear()
+
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('edit_ad', args=[ad.id]), {
+                'title': 'Велосипед', 'description': 'Горный велосипед',
+                'category': 'books', 'condition': 'used'
+            })
+        self.assertEqual(surrogate.outbox, [sorted([
+            f'ad-{ad.id}', 'ads-search', 'category-books',
+            'category-vehicles'
+        ])])
+
+    def test_batched_per_request(self):
+        """Теги запроса уходят одним пакетом после ответа"""
+        with self.captureOnCommitCallbacks(execute=True):
+            ad = self.create_ad(self.user)
+            other_ad = self.create_ad(self.other, category='books')
+        surrogate.outbox.clear()
+
+        with surrogate.purge_batch():
+            with self.captureOnCommitCallbacks(execute=True):
+                ExchangeProposalService.create_proposal(
+                    self.user, ad, other_ad
+                )
+                AdService.update_ad(ad, self.user, title='Велосипед новый')
+            self.assertEqual(surrogate.outbox, [])
+        self.assertEqual(surrogate.outbox, [sorted([
+            f'ad-{ad.id}', f'ad-{other_ad.id}', 'ads-search',
+            'category-vehicles'
+        ])])
+
+    @override_settings(SURROGATE_PURGE_ASYNC=True)
+    def test_sent_in_background(self):
+        """Запрос не ждет ответа прокси: пакет отправляет фоновый поток"""
+        release = threading.Event()
+        sent = []
+
+        class SlowBackend:
+            def send(self, keys):
+                release.wait(5)
+                sent.append(keys)
+
+        with mock.patch.object(surrogate, 'get_purge_backend',
+                               return_value=SlowBackend()):
+            with surrogate.purge_batch():
+                with self.captureOnCommitCallbacks(execute=True):
+                    surrogate.purge(surrogate.ADS_KEY)
+            self.assertEqual(sent, [])
+            release.set()
+            surrogate._purge_queue.join()
+        self.assertEqual(sent, [[surrogate.ADS_KEY]])
+
+    def test_rollback_sends_nothing(self):
+        """Откат транзакции отменяет очистку"""
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.create_ad(self.user)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(surrogate.outbox, [])
+
+
+class PurgeStubHandler(BaseHTTPRequestHandler):
+    """Локальная заглушка эндпоинта очистки прокси"""
+    received = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.received.append(
+            (self.headers['Surrogate-Key'], self.headers['Fastly-Key'],
+             json.loads(body)['keys'])
+        )
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class HttpPurgeBackendTest(SimpleTestCase):
+    """Тесты HTTP-бэкенда очистки"""
+
+    def setUp(self):
+        PurgeStubHandler.received = []
+        server = ThreadingHTTPServer(('127.0.0.1', 0), PurgeStubHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.url = f'http://127.0.0.1:{server.server_port}/purge'
+
+    def test_batches_to_endpoint(self):
+        """Теги отправляются пакетами ограниченного размера"""
+        with override_settings(
+                SURROGATE_PURGE_BACKEND='apps.ads.surrogate.HttpPurgeBackend',
+                SURROGATE_PURGE_URL=self.url,
+                SURROGATE_PURGE_HEADERS={'Fastly-Key': 'secret'},
+                SURROGATE_PURGE_BATCH_SIZE=2):
+            surrogate.send_purge(['ad-1', 'ad-2', 'ads-list'])
+        self.assertEqual(PurgeStubHandler.received, [
+            ('ad-1 ad-2', 'secret', ['ad-1', 'ad-2']),
+            ('ads-list', 'secret', ['ads-list']),
+        ])
+
+    def test_unavailable_endpoint(self):
+        """Недоступный прокси только логируется"""
+        with override_settings(SURROGATE_PURGE_URL='http://127.0.0.1:9/'), \
+                self.assertLogs('apps.ads.surrogate', 'WARNING'):
+            surrogate.HttpPurgeBackend().send(['ads'])
@@ -0,0 +1,65 @@
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from ..models import Ad
+from ..services import AdService
+from ..views import get_fragment_context
+
+
+class TemplateFragmentCacheTest(TestCase):
+    """Тесты кэша фрагментов шаблонов списков объявлений"""
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(
+            username='owner', password='testpass123'
+        )
+        self.ad = AdService.create_ad(
+            user=self.owner, title='Велосипед', description='Горный велосипед',
+            category='vehicles', condition='used'
+        )
+
+    def test_cards_follow_service_writes(self):
+        """Карточки берутся из кэша до изменения через AdService"""
+        url = reverse('ads_list')
+        self.assertContains(self.client.get(url), 'Велосипед')
+
+        # update() не меняет updated_at: страница остается в кэше
+        Ad.objects.filter(id=self.ad.id).update(title='Самокат')
+        self.assertContains(self.client.get(url), 'Велосипед')
+
+        AdService.update_ad(self.ad, self.owner, title='Самокат')
+        response = self.client.get(url)
+        self.assertContains(response, 'Самокат')
+        self.assertNotContains(response, 'Велосипед')
+
+    def test_exchange_button_per_user(self):
+        """Кнопка "Обменять" зависит от владельца, а не от кэша"""
+        factory = RequestFactory()
+        rendered = {}
+        for name, user in (('owner', self.owner), ('guest', AnonymousUser())):
+            request = factory.get('/')
+            request.user = user
+            ads = [Ad.objects.get(id=self.ad.id)]
+            rendered[name] = render_to_string('ads/list.html', {
+                'ads': ads, **get_fragment_context(request, ads),
+            }, request=request)
+        self.assertNotIn('?ad_receiver=', rendered['owner'])
+        self.assertIn('?ad_receiver=', rendered['guest'])
+
+    def test_my_ads_delete_form_not_cached(self):
+        """Форма удаления с CSRF-токеном рендерится на каждый запрос"""
+        self.client.force_login(self.owner)
+        url = reverse('my_ads')
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        self.assertContains(response, f'deleteModal{self.ad.id}')
+
+        AdService.delete_ad(self.ad, self.owner)
+        self.assertNotContains(
+            self.client.get(url), f'deleteModal{self.ad.id}'
+        )
@@ -1,23 +1,66 @@
 import logging
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied, ValidationError
-from django.core.paginator import Paginator
 from django.db import transaction
-from django.db.models import Q
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils.translation import gettext as _
 
+from .cache import get_version, get_versions, model_scope, owner_scope
+from .conditional import (PROPOSAL_VALIDATOR_MODELS, conditional_page,
+                          list_validators, page_extra)
+from .counting import CountingPaginator, CountResult, count_queryset
 from .forms import (AdFilterForm, AdForm, ExchangeProposalFilterForm,
                     ExchangeProposalForm)
+from .loaders import get_loader
 from .models import Ad, ExchangeProposal
-from .services import AdService, ExchangeProposalService
+from .pagecache import anonymous_page_cache
+from .pagination import KeysetPaginator
+from .search import search_queryset, suggest
+from .services import (AdService, AdSnapshotService,
+                       ExchangeProposalService)
+from .surrogate import ad_list_keys, set_surrogate_keys
 
 logger = logging.getLogger(__name__)
 
+ADS_PER_PAGE = 10
+PROPOSALS_PER_PAGE = 20
+
+# Параметры запроса страницы списка объявлений (AdFilterForm, пагинация)
+ADS_LIST_PARAMS = ('q', 'category', 'condition', 'page', 'cursor')
+
+
+def get_fragment_context(request, ads_page):
+    """
+    Ключи кэша фрагментов шаблонов списков: страница кэшируется по версии
+    объявлений (меняется при записи через AdService), версиям владельцев
+    страницы и параметрам запроса, карточка - по id, updated_at, флагу
+    is_owner и версии своего владельца
+    """
+    owners = get_versions({owner_scope(ad.user_id) for ad in ads_page})
+    for ad in ads_page:
+        ad.is_owner = ad.user_id == request.user.id
+        ad.owner_version = owners[owner_scope(ad.user_id)]
+    owner_versions = ','.join(
+        f'{scope}={version}' for scope, version in sorted(owners.items())
+    )
+    return {
+        'fragment_timeout': settings.ADS_TEMPLATE_FRAGMENT_TIMEOUT,
+        'list_version': (
+            f'{get_version(model_scope(Ad))}:{owner_versions}:'
+            f'{request.user.id}:{request.get_full_path()}'
+        ),
+    }
 
-def get_filtered_paginated_ads(request, ads_queryset):
+
+def get_filtered_paginated_ads(request, ads_queryset, snapshot=False):
+    """
+    Фильтрует и разбивает на страницы объявления, возвращает контекст.
+    snapshot - первая страница без поиска берется из AdListSnapshot
+    (ads_queryset - все объявления).
+    """
     form = AdFilterForm(request.GET)
 
     query = None
@@ -29,47 +72,99 @@ def get_filtered_paginated_ads(request, ads_queryset):
         category = form.cleaned_data.get('category')
         condition = form.cleaned_data.get('condition')
 
+    base_queryset = ads_queryset
     if query:
-        ads_queryset = ads_queryset.filter(
-            Q(title__icontains=query) | Q(description__icontains=query))
+        # Результаты поиска по произвольной строке не кэшируются
+        ads_queryset = search_queryset(ads_queryset, query).uncached()
     if category:
         ads_queryset = ads_queryset.filter(category=category)
     if condition:
         ads_queryset = ads_queryset.filter(condition=condition)
 
-    paginator = Paginator(ads_queryset, 10)
-    page = request.GET.get('page')
-    ads_page = paginator.get_page(page)
     get_params = request.GET.copy()
     get_params.pop('page', None)
+    get_params.pop('cursor', None)
     encoded_params = get_params.urlencode()
 
-    return ads_page, form, encoded_params
+    page_range = None
+    if 'page' in request.GET:
+        # Старые ссылки с номером страницы: OFFSET и сокращенный список
+        # номеров вместо полного page_range
+        paginator = CountingPaginator(ads_queryset, ADS_PER_PAGE)
+        ads_page = paginator.get_page(request.GET.get('page'))
+        page_range = list(paginator.get_elided_page_range(
+            ads_page.number, on_each_side=2, on_ends=1
+        ))
+        total = paginator.count_result
+    else:
+        paginator = KeysetPaginator(ads_queryset, ADS_PER_PAGE)
+        first_page = None
+        if snapshot and not query and not request.GET.get('cursor'):
+            first_page = AdSnapshotService.first_page(
+                category, condition, ADS_PER_PAGE
+            )
+        if first_page is not None:
+            rows, has_next, count = first_page
+            ads_page = paginator.first_page(rows, has_next)
+            total = CountResult(count)
+        else:
+            ads_page = paginator.get_page(request.GET.get('cursor'))
+            total = count_queryset(ads_queryset)
+
+    # Подсказка "возможно, вы имели в виду" для поиска без результатов
+    suggestion = None
+    if query and not ads_page.object_list:
+        suggestion = suggest(base_queryset, 'title', query)
+        if suggestion:
+            get_params['q'] = suggestion
+
+    return {
+        'ads': ads_page,
+        **get_fragment_context(request, ads_page),
+        'page_range': page_range,
+        'total': total,
+        'form': form,
+        'querystring': encoded_params,
+        'suggestion': suggestion,
+        'suggestion_querystring': get_params.urlencode(),
+    }
 
 
-def ads_list(request):
-    """Отображение списка всех объявлений с фильтрацией и пагинацией."""
+def _visible_ads(request):
     exclude_user = request.user if request.user.is_authenticated else None
-    ads = AdService.search_ads(exclude_user=exclude_user)
-    ads_page, form, querystring = get_filtered_paginated_ads(request, ads)
+    return AdService.search_ads(exclude_user=exclude_user)
 
-    return render(request, 'ads/list.html', {
-        'ads': ads_page,
-        'form': form,
-        'querystring': querystring,
-    })
+
+def ads_list_validators(request):
+    """
+    Валидаторы по версии всех объявлений: изменение любой
+    отфильтрованной выборки меняет и их, а запрос обходится без поиска
+    """
+    return list_validators(request, extra=page_extra(request))
+
+
+@anonymous_page_cache(ADS_LIST_PARAMS)
+@conditional_page(ads_list_validators)
+def ads_list(request):
+    """Отображение списка всех объявлений с фильтрацией и пагинацией."""
+    ads = _visible_ads(request)
+    # Анонимы видят все объявления: первая страница есть в снимке
+    context = get_filtered_paginated_ads(
+        request, ads, snapshot=not request.user.is_authenticated
+    )
+    response = render(request, 'ads/list.html', context)
+    return set_surrogate_keys(response, request, ad_list_keys(
+        [ad.id for ad in context['ads']],
+        request.GET.get('category'), request.GET.get('q')
+    ))
 
 
 @login_required
 def my_ads(request):
     """Отображение объявлений пользователя с фильтрацией и пагинацией."""
     user_ads = Ad.objects.filter(user=request.user).order_by('-created_at')
-    ads_page, form, querystring = get_filtered_paginated_ads(request, user_ads)
-    return render(request, 'ads/my_ads.html', {
-        'ads': ads_page,
-        'form': form,
-        'querystring': querystring,
-    })
+    context = get_filtered_paginated_ads(request, user_ads)
+    return render(request, 'ads/my_ads.html', context)
 
 
 @login_required
@@ -106,9 +201,9 @@ def create_ad(request):
 @login_required
 def edit_ad(request, ad_id):
     """Редактирование существующего объявления."""
-    ad = get_object_or_404(Ad, id=ad_id)
+    ad = get_loader(Ad).get_or_404(ad_id)
 
-    if ad.user != request.user:
+    if ad.user_id != request.user.id:
         raise PermissionDenied
 
     if request.method == 'POST':
@@ -142,9 +237,9 @@ def edit_ad(request, ad_id):
 @login_required
 def delete_ad(request, ad_id):
     """Удаление объявления с использованием слоя сервиса."""
-    ad = get_object_or_404(Ad, id=ad_id)
+    ad = get_loader(Ad).get_or_404(ad_id)
 
-    if ad.user != request.user:
+    if ad.user_id != request.user.id:
         raise PermissionDenied
 
     if request.method == 'POST':
@@ -168,9 +263,9 @@ def create_exchange_proposal(request):
     """Создание предложения обмена с использованием слоя сервиса."""
     ad_receiver_id = request.GET.get(
         'ad_receiver') or request.POST.get('ad_receiver')
-    ad_receiver = get_object_or_404(Ad, id=ad_receiver_id)
+    ad_receiver = get_loader(Ad).get_or_404(ad_receiver_id)
 
-    if ad_receiver.user == request.user:
+    if ad_receiver.user_id == request.user.id:
         messages.error(
             request,
             _('Вы не можете предложить обмен с собственным объявлением.')
@@ -209,7 +304,15 @@ def create_exchange_proposal(request):
                   {'form': form, 'ad_receiver': ad_receiver})
 
 
+def exchange_proposals_validators(request):
+    """Валидаторы по версиям предложений и объявлений (счетчики вкладок)"""
+    return list_validators(
+        request, PROPOSAL_VALIDATOR_MODELS, extra=page_extra(request)
+    )
+
+
 @login_required
+@conditional_page(exchange_proposals_validators)
 def exchange_proposals_list(request):
     """Отображение списка предложений обмена с использованием слоя сервиса."""
     form = ExchangeProposalFilterForm(request.GET or None)
@@ -221,18 +324,27 @@ def exchange_proposals_list(request):
         status_filter = form.cleaned_data.get('status')
         filter_type = form.cleaned_data.get('filter_type') or 'all'
 
-    sent_proposals, received_proposals = (
-        ExchangeProposalService.get_user_proposals(
-            user=request.user,
-            filter_type=filter_type,
-            status=status_filter
-        )
+    proposals, counts = ExchangeProposalService.get_inbox(
+        user=request.user,
+        box=filter_type,
+        status=status_filter,
+        cursor=request.GET.get('cursor'),
+        per_page=PROPOSALS_PER_PAGE
     )
 
+    get_params = request.GET.copy()
+    get_params.pop('cursor', None)
+    querystring = get_params.urlencode()
+    # Ссылки вкладок сохраняют фильтр по статусу
+    get_params.pop('filter_type', None)
+
     context = {
         'form': form,
-        'sent_proposals': sent_proposals,
-        'received_proposals': received_proposals,
+        'proposals': proposals,
+        'counts': counts,
+        'box': filter_type,
+        'querystring': querystring,
+        'tab_querystring': get_params.urlencode(),
     }
 
     return render(request, 'exchange_proposals/exchange_proposals_list.html',
@@ -0,0 +1,171 @@
+"""
+Шина инвалидации локальных кэшей процессов.
+
+Каждый процесс (воркер gunicorn) держит свой локальный уровень
+TwoTierCache. Изменение ключа в одном процессе публикуется в таблицу
+CacheInvalidation, а остальные процессы не чаще раза в POLL_INTERVAL
+секунд читают новые строки и удаляют перечисленные ключи у себя.
+Сообщение с ключом CLEAR_ALL очищает локальный кэш целиком.
+
+Идентификаторы сообщений выдаются при вставке, а видны после фиксации,
+поэтому меньший id может появиться позже большего. Пропущенные id ниже
+последнего прочитанного опрашиваются повторно GAP_TIMEOUT секунд.
+
+В рамках запроса (CacheInvalidationMiddleware) ключи собираются и
+записываются одним сообщением после ответа.
+"""
+import contextvars
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Iterable, List, Optional
+
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CLEAR_ALL = '*'
+KEY_SEPARATOR = '\n'
+
+# {шина: ключи} текущего запроса
+_current_batch = contextvars.ContextVar(
+    'cache_invalidation_batch', default=None
+)
+
+
+@contextmanager
+def publish_batch():
+    """Собирает ключи и публикует их одним сообщением на шину при выходе"""
+    if _current_batch.get() is not None:
+        yield
+        return
+    batch = {}
+    token = _current_batch.set(batch)
+    try:
+        yield
+    finally:
+        _current_batch.reset(token)
+        for bus, keys in batch.items():
+            bus._write(sorted(keys))
+
+
+class DatabaseInvalidationBus:
+    """
+    Шина на таблице CacheInvalidation. Сообщения записываются после
+    фиксации текущей транзакции и хранятся RETENTION секунд; собственные
+    сообщения процесс пропускает. Отслеживается не больше max_gaps
+    пропущенных id.
+    """
+
+    def __init__(self, poll_interval: float = 1.0, retention: int = 3600,
+                 prune_every: int = 100, gap_timeout: float = 30.0,
+                 max_gaps: int = 100):
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.prune_every = prune_every
+        self.gap_timeout = gap_timeout
+        self.max_gaps = max_gaps
+        self.origin = uuid.uuid4().hex
+        self._last_id = None
+        # Пропущенный id -> время (monotonic), до которого он ожидается
+        self._gaps = {}
+        self._next_poll = 0.0
+        self._lock = threading.Lock()
+
+    def publish(self, keys: Iterable[str]) -> None:
+        keys = sorted(set(keys))
+        if keys:
+            transaction.on_commit(lambda: self._enqueue(keys))
+
+    def _enqueue(self, keys: List[str]) -> None:
+        batch = _current_batch.get()
+        if batch is None:
+            self._write(keys)
+        else:
+            batch.setdefault(self, set()).update(keys)
+
+    def _write(self, keys: List[str]) -> None:
+        from .models import CacheInvalidation
+
+        try:
+            message = CacheInvalidation.objects.create(
+                origin=self.origin, keys=KEY_SEPARATOR.join(keys)
+            )
+            if message.id % self.prune_every == 0:
+                self.prune()
+        except DatabaseError as e:
+            # Локальные копии у других процессов истекут по LOCAL_TIMEOUT
+            logger.warning(
+                f'Cache invalidation of {len(keys)} keys not published: {e}'
+            )
+
+    def prune(self) -> int:
+        """Удаляет сообщения старше RETENTION секунд"""
+        from .models import CacheInvalidation
+
+        threshold = timezone.now() - timedelta(seconds=self.retention)
+        deleted, _ = CacheInvalidation.objects.filter(
+            created_at__lt=threshold
+        ).delete()
+        return deleted
+
+    def poll(self, force: bool = False) -> Optional[List[str]]:
+        """
+        Ключи из новых сообщений других процессов ([CLEAR_ALL] - сбросить
+        все) или None, если опрашивать шину еще рано
+        """
+        now = time.monotonic()
+        with self._lock:
+            if not force and now < self._next_poll:
+                return None
+            self._next_poll = now + self.poll_interval
+            last_id = self._last_id
+            gaps = {
+                gap: deadline for gap, deadline in self._gaps.items()
+                if deadline > now
+            }
+
+        from .models import CacheInvalidation
+
+        messages = CacheInvalidation.objects.order_by('id')
+        try:
+            # Ошибка запроса не должна прерывать транзакцию вызывающего
+            with transaction.atomic(savepoint=connection.in_atomic_block):
+                if last_id is None:
+                    # Первый опрос: локальный кэш пуст, история не нужна
+                    latest = messages.values_list('id', flat=True).last()
+                    rows = []
+                    last_id = latest or 0
+                else:
+                    rows = list(messages.filter(
+                        Q(id__gt=last_id) | Q(id__in=list(gaps))
+                    ).values_list('id', 'origin', 'keys'))
+        except DatabaseError as e:
+            logger.warning(f'Cache invalidation bus poll failed: {e}')
+            return [CLEAR_ALL]
+
+        keys = []
+        for message_id, origin, message_keys in rows:
+            if message_id > last_id:
+                # Меньшие id могут быть еще не зафиксированы
+                first_gap = max(last_id + 1, message_id - self.max_gaps)
+                gaps.update(dict.fromkeys(
+                    range(first_gap, message_id), now + self.gap_timeout
+                ))
+                last_id = message_id
+            else:
+                gaps.pop(message_id, None)
+            if origin != self.origin:
+                keys.extend(message_keys.split(KEY_SEPARATOR))
+        if len(gaps) > self.max_gaps:
+            gaps = dict(sorted(gaps.items())[-self.max_gaps:])
+        with self._lock:
+            if self._last_id is None or last_id >= self._last_id:
+                self._last_id = last_id
+                self._gaps = gaps
+        return keys
@@ -0,0 +1,259 @@
+"""
+Двухуровневый бэкенд кэша: ограниченный LRU в памяти процесса перед
+общим бэкендом (таблица DatabaseCache, FileBasedCache и т. п.).
+
+Чтение сначала ищет ключ в локальном LRU, затем в общем бэкенде и
+сохраняет найденное локально не дольше LOCAL_TIMEOUT секунд. Запись
+идет в общий бэкенд и обновляет локальную копию. Изменения, после
+которых у других процессов могут остаться устаревшие копии (перезапись
+существующего ключа, incr, удаление), публикуются в шину инвалидации
+(apps/core/bus.py), чтобы остальные процессы удалили свои копии;
+заполнение отсутствующего ключа (add, set нового ключа) шину не
+трогает. Перед обращением к локальному уровню процесс опрашивает шину не
+чаще раза в POLL_INTERVAL секунд; LOCAL_TIMEOUT ограничивает
+устаревание, если сообщение не дошло.
+
+Ключи собираются как обычно (KEY_PREFIX и VERSION), поэтому
+инвалидация по версиям (например, apps/ads/cache.py) работает через
+шину: изменение счетчика версии рассылается, а значения под старыми
+версиями просто перестают читаться.
+
+Пример настройки::
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'apps.core.cache.TwoTierCache',
+            'LOCATION': 'default',
+            'OPTIONS': {'SHARED': 'shared', 'LOCAL_MAX_ENTRIES': 1000},
+        },
+        'shared': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+        },
+    }
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.module_loading import import_string
+
+from .bus import CLEAR_ALL
+
+# Локальные уровни и шины процесса по LOCATION (бэкенды кэша создаются
+# на каждый поток)
+_local_stores = {}
+_local_stores_lock = threading.Lock()
+
+
+class LocalLRU:
+    """Потокобезопасный LRU с временем жизни записей"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """(найдено, значение в pickle)"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False, None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+            return True, value
+
+    def set(self, key, value, expires_at) -> None:
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, keys) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TwoTierCache(BaseCache):
+    """
+    OPTIONS: SHARED - алиас общего бэкенда в CACHES, LOCAL_MAX_ENTRIES,
+    LOCAL_TIMEOUT, BUS - класс шины, POLL_INTERVAL, BUS_RETENTION.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options['SHARED']
+        self._local_timeout = int(options.get('LOCAL_TIMEOUT', 30))
+        with _local_stores_lock:
+            if location not in _local_stores:
+                bus_class = import_string(options.get(
+                    'BUS', 'apps.core.bus.DatabaseInvalidationBus'
+                ))
+                _local_stores[location] = (
+                    LocalLRU(int(options.get('LOCAL_MAX_ENTRIES', 1000))),
+                    bus_class(
+                        poll_interval=float(options.get('POLL_INTERVAL', 1)),
+                        retention=int(options.get('BUS_RETENTION', 3600)),
+                        gap_timeout=float(
+                            options.get('BUS_GAP_TIMEOUT', 30)
+                        ),
+                    ),
+                )
+            self._local, self.bus = _local_stores[location]
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    # Локальный уровень
+
+    def _sync(self) -> None:
+        keys = self.bus.poll()
+        if not keys:
+            return
+        if CLEAR_ALL in keys:
+            self._local.clear()
+        else:
+            self._local.delete(keys)
+
+    def _local_expiry(self, timeout=DEFAULT_TIMEOUT):
+        expires_at = time.time() + self._local_timeout
+        backend_expiry = self.get_backend_timeout(timeout)
+        if backend_expiry is not None:
+            expires_at = min(expires_at, backend_expiry)
+        return expires_at
+
+    def _remember(self, key, value, timeout=DEFAULT_TIMEOUT) -> None:
+        # Копия через pickle: изменение объекта вызывающим не меняет кэш
+        self._local.set(
+            key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+            self._local_expiry(timeout)
+        )
+
+    def _changed(self, keys) -> None:
+        self.bus.publish(keys)
+
+    # API кэша
+
+    def get(self, key, default=None, version=None):
+        local_key = self.make_and_validate_key(key, version)
+        self._sync()
+        found, value = self._local.get(local_key)
+        if found:
+            return pickle.loads(value)
+        value = self.shared.get(key, self._missing_key, version=version)
+        if value is self._missing_key:
+            return default
+        self._remember(local_key, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        self._sync()
+        result = {}
+        missing = []
+        for key in keys:
+            found, value = self._local.get(
+                self.make_and_validate_key(key, version)
+            )
+            if found:
+                result[key] = pickle.loads(value)
+            else:
+                missing.append(key)
+        if missing:
+            fetched = self.shared.get_many(missing, version=version)
+            for key, value in fetched.items():
+                self._remember(self.make_key(key, version), value)
+            result.update(fetched)
+        return result
+
+    def has_key(self, key, version=None):
+        self._sync()
+        found, _ = self._local.get(self.make_and_validate_key(key, version))
+        return found or self.shared.has_key(key, version=version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version)
+        # Заполнение отсутствующего ключа: копий у других процессов нет
+        if not self.shared.add(key, value, timeout=timeout, version=version):
+            self.shared.set(key, value, timeout=timeout, version=version)
+            self._changed([local_key])
+        self._remember(local_key, value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version)
+        # Атомарность add обеспечивает общий бэкенд
+        if not self.shared.add(key, value, timeout=timeout, version=version):
+            return False
+        self._remember(local_key, value, timeout)
+        return True
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        existing = self.shared.get_many(list(data), version=version)
+        failed = self.shared.set_many(data, timeout=timeout, version=version)
+        changed = []
+        for key, value in data.items():
+            local_key = self.make_and_validate_key(key, version)
+            if key in failed:
+                self._local.delete([local_key])
+            else:
+                self._remember(local_key, value, timeout)
+            if key in existing:
+                changed.append(local_key)
+        self._changed(changed)
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        # Значение не меняется: достаточно сбросить локальную копию
+        self._local.delete([self.make_and_validate_key(key, version)])
+        return self.shared.touch(key, timeout=timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        local_key = self.make_and_validate_key(key, version)
+        try:
+            value = self.shared.incr(key, delta, version=version)
+        except ValueError:
+            self._local.delete([local_key])
+            raise
+        # Срок хранения счетчика неизвестен: локально до LOCAL_TIMEOUT
+        self._remember(local_key, value, None)
+        self._changed([local_key])
+        return value
+
+    def decr(self, key, delta=1, version=None):
+        return self.incr(key, -delta, version=version)
+
+    def delete(self, key, version=None):
+        local_key = self.make_and_validate_key(key, version)
+        deleted = self.shared.delete(key, version=version)
+        self._local.delete([local_key])
+        self._changed([local_key])
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        local_keys = [self.make_and_validate_key(key, version) for key in keys]
+        self.shared.delete_many(keys, version=version)
+        self._local.delete(local_keys)
+        self._changed(local_keys)
+
+    def clear(self):
+        self.shared.clear()
+        self._local.clear()
+        self._changed([CLEAR_ALL])
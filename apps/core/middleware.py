@@ -0,0 +1,15 @@
+from .bus import publish_batch
+
+
+class CacheInvalidationMiddleware:
+    """
+    Ключи, измененные за запрос, публикуются в шину одним сообщением
+    после ответа (см. bus.py)
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with publish_batch():
+            return self.get_response(request)
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheInvalidation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origin', models.CharField(max_length=32, verbose_name='Процесс-отправитель')),
+                ('keys', models.TextField(verbose_name='Ключи')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата создания')),
+            ],
+            options={
+                'verbose_name': 'Инвалидация кэша',
+                'verbose_name_plural': 'Инвалидации кэша',
+            },
+        ),
+    ]
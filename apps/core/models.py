@@ -0,0 +1,28 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class CacheInvalidation(models.Model):
+    """
+    Сообщение шины инвалидации двухуровневого кэша (см. apps/core/bus.py):
+    ключи, которые процессы должны удалить из локального кэша
+    """
+    origin = models.CharField(
+        max_length=32,
+        verbose_name=_('Процесс-отправитель')
+    )
+    keys = models.TextField(
+        verbose_name=_('Ключи')
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name=_('Дата создания')
+    )
+
+    class Meta:
+        verbose_name = _('Инвалидация кэша')
+        verbose_name_plural = _('Инвалидации кэша')
+
+    def __str__(self):
+        return f'Cache invalidation {self.id} from {self.origin}'
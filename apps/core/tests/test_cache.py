@@ -0,0 +1,154 @@
+from datetime import timedelta
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .. import cache as two_tier
+from ..bus import publish_batch
+from ..models import CacheInvalidation
+
+SHARED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'test-cache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'test-shared-cache',
+    },
+}
+
+
+@override_settings(CACHES=SHARED_CACHES)
+class TwoTierCacheTest(TestCase):
+    """Тесты двухуровневого кэша и шины инвалидации"""
+
+    def setUp(self):
+        caches['shared'].clear()
+        self.addCleanup(two_tier._local_stores.clear)
+
+    def worker(self, name, **options):
+        """Бэкенд отдельного процесса (свой локальный уровень и шина)"""
+        return two_tier.TwoTierCache(name, {
+            'OPTIONS': {'SHARED': 'shared', 'POLL_INTERVAL': 0, **options},
+        })
+
+    def test_local_tier(self):
+        """Повторное чтение обходится без общего бэкенда"""
+        worker = self.worker('a')
+        caches['shared'].set('title', 'Велосипед')
+        self.assertEqual(worker.get('title'), 'Велосипед')
+
+        caches['shared'].set('title', 'Самокат')
+        self.assertEqual(worker.get('title'), 'Велосипед')
+        self.assertEqual(worker.get('missing', 'default'), 'default')
+
+    def test_invalidation_between_workers(self):
+        """Запись в одном процессе удаляет локальные копии в других"""
+        first, second = self.worker('a'), self.worker('b')
+        with self.captureOnCommitCallbacks(execute=True):
+            first.set('title', 'Велосипед')
+        self.assertEqual(second.get('title'), 'Велосипед')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.set('title', 'Самокат')
+            first.set_many({'title': 'Ролики', 'a': 1, 'b': 2})
+        self.assertEqual(second.get('title'), 'Ролики')
+        self.assertEqual(CacheInvalidation.objects.count(), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete('title')
+        self.assertIsNone(second.get('title'))
+
+    def test_fills_not_published(self):
+        """Заполнение отсутствующих ключей не пишет в шину"""
+        worker = self.worker('a')
+        with self.captureOnCommitCallbacks(execute=True):
+            worker.set('title', 'Велосипед')
+            worker.add('lock', 1)
+            worker.set_many({'a': 1, 'b': 2})
+        self.assertFalse(CacheInvalidation.objects.exists())
+
+    def test_batch_per_request(self):
+        """Изменения запроса публикуются одним сообщением после ответа"""
+        first, second = self.worker('a'), self.worker('b')
+        first.set_many({'a': 1, 'b': 2, 'counter': 1})
+        with publish_batch():
+            with self.captureOnCommitCallbacks(execute=True):
+                first.set('a', 10)
+                first.delete('b')
+                first.incr('counter')
+            self.assertFalse(CacheInvalidation.objects.exists())
+        message = CacheInvalidation.objects.get()
+        self.assertEqual(len(message.keys.split('\n')), 3)
+        self.assertEqual(second.get_many(['a', 'b', 'counter']),
+                         {'a': 10, 'counter': 2})
+
+    def test_version_counter(self):
+        """Счетчики версий (инвалидация по тегам) видны всем процессам"""
+        first, second = self.worker('a'), self.worker('b')
+        first.set('ads:version:ads.ad', 1, timeout=None)
+        self.assertEqual(second.get('ads:version:ads.ad'), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(first.incr('ads:version:ads.ad'), 2)
+        self.assertEqual(second.get('ads:version:ads.ad'), 2)
+
+    def test_clear(self):
+        """Очистка кэша сбрасывает локальные уровни всех процессов"""
+        first, second = self.worker('a'), self.worker('b')
+        first.set('title', 'Велосипед')
+        second.get('title')
+        with self.captureOnCommitCallbacks(execute=True):
+            first.clear()
+        self.assertIsNone(second.get('title'))
+
+    def test_lru_bound(self):
+        """Локальный уровень вытесняет давно не читавшиеся ключи"""
+        worker = self.worker('a', LOCAL_MAX_ENTRIES=2)
+        worker.set('a', 1)
+        worker.set('b', 2)
+        worker.get('a')
+        worker.set('c', 3)
+        self.assertEqual(len(worker._local), 2)
+        self.assertEqual(worker.get_many(['a', 'b', 'c']),
+                         {'a': 1, 'b': 2, 'c': 3})
+
+    def test_late_commit_of_lower_id(self):
+        """Сообщение с меньшим id, зафиксированное позже, не теряется"""
+        bus = self.worker('b').bus
+        first = CacheInvalidation.objects.create(origin='other', keys='a')
+        self.assertEqual(bus.poll(force=True), [])
+
+        CacheInvalidation.objects.create(
+            id=first.id + 2, origin='other', keys='c'
+        )
+        self.assertEqual(bus.poll(force=True), ['c'])
+        CacheInvalidation.objects.create(
+            id=first.id + 1, origin='other', keys='b'
+        )
+        self.assertEqual(bus.poll(force=True), ['b'])
+        self.assertEqual(bus.poll(force=True), [])
+
+        # Пропуск, так и не заполненный за GAP_TIMEOUT, забывается
+        bus = self.worker('c', BUS_GAP_TIMEOUT=0).bus
+        bus.poll(force=True)
+        CacheInvalidation.objects.create(
+            id=first.id + 4, origin='other', keys='e'
+        )
+        self.assertEqual(bus.poll(force=True), ['e'])
+        CacheInvalidation.objects.create(
+            id=first.id + 3, origin='other', keys='d'
+        )
+        self.assertEqual(bus.poll(force=True), [])
+
+    def test_prune(self):
+        """Старые сообщения шины удаляются"""
+        worker = self.worker('a', BUS_RETENTION=60)
+        CacheInvalidation.objects.create(origin='other', keys='title')
+        CacheInvalidation.objects.update(
+            created_at=timezone.now() - timedelta(minutes=5)
+        )
+        CacheInvalidation.objects.create(origin='other', keys='title')
+        self.assertEqual(worker.bus.prune(), 1)
@@ -0,0 +1,18 @@
+from django.utils.functional import SimpleLazyObject
+
+from .services import UserStatsService
+
+
+def user_stats(request):
+    """
+    Статистика текущего пользователя для навигации (бейдж ожидающих
+    предложений). Запрос выполняется, только если шаблон ее использует.
+    """
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {
+        'user_stats': SimpleLazyObject(
+            lambda: UserStatsService.get_stats(user)
+        )
+    }
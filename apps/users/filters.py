@@ -0,0 +1,17 @@
+from rest_framework import filters
+
+from apps.ads.search import fuzzy_search
+
+
+class TrigramSearchFilter(filters.SearchFilter):
+    """
+    Поиск по search_fields с учетом опечаток: вместо перебора icontains
+    используются триграммные GIN индексы (сортировка по сходству).
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        query = request.query_params.get(self.search_param, '')
+        if not search_fields or not query.strip():
+            return queryset
+        return fuzzy_search(queryset, search_fields, query)
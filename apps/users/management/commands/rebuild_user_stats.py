@@ -0,0 +1,34 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from apps.users.services import UserStatsService
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает статистику пользователей пакетами'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Количество пользователей в пакете'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        checked = fixed = 0
+        last_id = 0
+        while True:
+            user_ids = list(
+                User.objects.filter(id__gt=last_id).order_by('id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not user_ids:
+                break
+            last_id = user_ids[-1]
+            checked += len(user_ids)
+            fixed += UserStatsService.recompute(user_ids)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {checked} users, fixed {fixed} stats rows'
+        ))
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2025-06-11 10:30
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# Поля из UserViewSet.search_fields
+SEARCH_FIELDS = ("username", "first_name", "last_name")
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for field in SEARCH_FIELDS:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS auth_user_{field}_trgm "
+            f"ON auth_user USING gin ({field} gin_trgm_ops);",
+            params=None,
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for field in SEARCH_FIELDS:
+        schema_editor.execute(
+            f"DROP INDEX IF EXISTS auth_user_{field}_trgm;", params=None
+        )
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
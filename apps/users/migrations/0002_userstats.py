@@ -0,0 +1,98 @@
+# Generated by Django 4.2.7 on 2025-06-14 10:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_user_stats(apps, schema_editor):
+    """Заполняет статистику по существующим объявлениям и предложениям"""
+    Ad = apps.get_model("ads", "Ad")
+    ExchangeProposal = apps.get_model("ads", "ExchangeProposal")
+    UserStats = apps.get_model("users", "UserStats")
+
+    stats = {}
+
+    def row(user_id):
+        return stats.setdefault(user_id, UserStats(user_id=user_id))
+
+    for user_id, total in (
+        Ad.objects.values_list("user_id")
+        .annotate(total=models.Count("id"))
+        .order_by()
+    ):
+        row(user_id).ads_count = total
+
+    for direction, user_field in (("received", "ad_receiver__user_id"),
+                                  ("sent", "ad_sender__user_id")):
+        for user_id, status, total in (
+            ExchangeProposal.objects.filter(status__in=["pending", "accepted"])
+            .values_list(user_field, "status")
+            .annotate(total=models.Count("id"))
+            .order_by()
+        ):
+            if status == "pending":
+                setattr(row(user_id), f"pending_{direction}", total)
+            else:
+                row(user_id).accepted_trades += total
+
+    UserStats.objects.bulk_create(stats.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("ads", "0006_adproposalcounter"),
+        ("users", "0001_user_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserStats",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+                (
+                    "ads_count",
+                    models.IntegerField(
+                        default=0, verbose_name="Активные объявления"
+                    ),
+                ),
+                (
+                    "pending_received",
+                    models.IntegerField(
+                        default=0,
+                        verbose_name="Ожидающие полученные предложения",
+                    ),
+                ),
+                (
+                    "pending_sent",
+                    models.IntegerField(
+                        default=0,
+                        verbose_name="Ожидающие отправленные предложения",
+                    ),
+                ),
+                (
+                    "accepted_trades",
+                    models.IntegerField(
+                        default=0, verbose_name="Состоявшиеся обмены"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Статистика пользователя",
+                "verbose_name_plural": "Статистика пользователей",
+            },
+        ),
+        migrations.RunPython(backfill_user_stats, migrations.RunPython.noop),
+    ]
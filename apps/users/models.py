@@ -0,0 +1,41 @@
+from django.contrib.auth.models import User
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class UserStats(models.Model):
+    """
+    Статистика пользователя, поддерживаемая слоем сервисов
+    (см. apps/users/services.py). Позволяет показывать количество
+    объявлений и предложений без агрегирующих запросов.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name=_('Пользователь')
+    )
+    ads_count = models.IntegerField(
+        default=0,
+        verbose_name=_('Активные объявления')
+    )
+    pending_received = models.IntegerField(
+        default=0,
+        verbose_name=_('Ожидающие полученные предложения')
+    )
+    pending_sent = models.IntegerField(
+        default=0,
+        verbose_name=_('Ожидающие отправленные предложения')
+    )
+    accepted_trades = models.IntegerField(
+        default=0,
+        verbose_name=_('Состоявшиеся обмены')
+    )
+
+    class Meta:
+        verbose_name = _('Статистика пользователя')
+        verbose_name_plural = _('Статистика пользователей')
+
+    def __str__(self):
+        return f'Stats for user {self.user_id}'
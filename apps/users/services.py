@@ -0,0 +1,120 @@
+import logging
+from collections import Counter
+from typing import Iterable
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import UserStats
+
+logger = logging.getLogger(__name__)
+
+STATS_FIELDS = (
+    'ads_count', 'pending_received', 'pending_sent', 'accepted_trades'
+)
+
+
+class UserStatsService:
+    """Класс сервиса для статистики пользователей (UserStats)"""
+
+    @staticmethod
+    def get_stats(user: User) -> UserStats:
+        """
+        Статистика пользователя. Если строки еще нет, возвращает
+        несохраненный объект с нулевыми значениями. Учитывает
+        select_related('stats').
+        """
+        try:
+            return user.stats
+        except UserStats.DoesNotExist:
+            return UserStats(user=user)
+
+    @staticmethod
+    def lock(user: User) -> UserStats:
+        """Блокирует строку статистики до конца транзакции"""
+        UserStats.objects.get_or_create(user=user)
+        return UserStats.objects.select_for_update().get(user=user)
+
+    @staticmethod
+    def adjust(user_id: int, **deltas) -> None:
+        """Изменяет поля статистики на deltas, например ads_count=1"""
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        stats = UserStats.objects.filter(user_id=user_id)
+        updates = {field: F(field) + delta for field, delta in deltas.items()}
+        if stats.update(**updates):
+            return
+        try:
+            with transaction.atomic():
+                UserStats.objects.create(user_id=user_id, **deltas)
+        except IntegrityError:
+            # Строка создана параллельной транзакцией
+            stats.update(**updates)
+
+    @staticmethod
+    def apply_proposal_changes(changes: Counter, ad_users: dict) -> None:
+        """
+        Переносит изменения счетчиков предложений
+        {(ad_id, direction, status): delta} на статистику владельцев
+        объявлений. ad_users - {ad_id: user_id}.
+        """
+        deltas = {}
+        for (ad_id, direction, status), delta in changes.items():
+            if status == 'pending':
+                field = f'pending_{direction}'
+            elif status == 'accepted':
+                field = 'accepted_trades'
+            else:
+                continue
+            user_deltas = deltas.setdefault(ad_users[ad_id], Counter())
+            user_deltas[field] += delta
+
+        for user_id, user_deltas in sorted(deltas.items()):
+            UserStatsService.adjust(user_id, **user_deltas)
+
+    @staticmethod
+    def recompute(user_ids: Iterable[int]) -> int:
+        """
+        Пересчитывает статистику пользователей по объявлениям
+        и предложениям. Возвращает количество исправленных строк.
+        """
+        from apps.ads.models import Ad, ExchangeProposal
+
+        user_ids = list(user_ids)
+        actual = {user_id: Counter() for user_id in user_ids}
+
+        rows = Ad.objects.filter(user_id__in=user_ids).values_list(
+            'user_id'
+        ).annotate(total=Count('id')).order_by()
+        for user_id, total in rows:
+            actual[user_id]['ads_count'] = total
+
+        for direction, user_field in (('received', 'receiver_user_id'),
+                                      ('sent', 'sender_user_id')):
+            rows = ExchangeProposal.objects.filter(
+                **{f'{user_field}__in': user_ids},
+                status__in=['pending', 'accepted']
+            ).values_list(user_field, 'status').annotate(
+                total=Count('id')
+            ).order_by()
+            for user_id, status, total in rows:
+                if status == 'pending':
+                    actual[user_id][f'pending_{direction}'] = total
+                else:
+                    actual[user_id]['accepted_trades'] += total
+
+        existing = UserStats.objects.in_bulk(user_ids)
+        fixed = 0
+        for user_id, values in actual.items():
+            # Отсутствующая строка равна строке с нулями
+            stats = existing.get(user_id) or UserStats(user_id=user_id)
+            if all(getattr(stats, field) == values[field]
+                   for field in STATS_FIELDS):
+                continue
+            for field in STATS_FIELDS:
+                setattr(stats, field, values[field])
+            stats.save()
+            fixed += 1
+        return fixed
@@ -0,0 +1,100 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from apps.ads.services import AdService, ExchangeProposalService
+
+from ..models import UserStats
+from ..services import UserStatsService
+
+
+def create_ad(user, title='Велосипед'):
+    return AdService.create_ad(
+        user, title=title, description='Описание товара',
+        category='vehicles', condition='used'
+    )
+
+
+class UserStatsTest(TestCase):
+    """Тесты статистики пользователя"""
+
+    def setUp(self):
+        self.alice = User.objects.create_user(
+            username='alice', password='testpass123'
+        )
+        self.bob = User.objects.create_user(
+            username='bob', password='testpass123'
+        )
+        self.alice_ad = create_ad(self.alice)
+        self.bob_ad = create_ad(self.bob, 'Самокат')
+        self.proposal = ExchangeProposalService.create_proposal(
+            self.bob, self.bob_ad, self.alice_ad
+        )
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_service_maintains_stats(self):
+        """Сервисы поддерживают статистику в актуальном состоянии"""
+        self.assertEqual(self.stats(self.alice).ads_count, 1)
+        self.assertEqual(self.stats(self.alice).pending_received, 1)
+        self.assertEqual(self.stats(self.bob).pending_sent, 1)
+
+        ExchangeProposalService.update_proposal_status(
+            self.proposal, self.alice, 'accepted'
+        )
+        for user in (self.alice, self.bob):
+            stats = self.stats(user)
+            self.assertEqual(stats.pending_received, 0)
+            self.assertEqual(stats.pending_sent, 0)
+            self.assertEqual(stats.accepted_trades, 1)
+
+    def test_delete_ad_updates_both_users(self):
+        """Удаление объявления обновляет статистику обоих участников"""
+        AdService.delete_ad(self.alice_ad, self.alice)
+        self.assertEqual(self.stats(self.alice).ads_count, 0)
+        self.assertEqual(self.stats(self.alice).pending_received, 0)
+        self.assertEqual(self.stats(self.bob).pending_sent, 0)
+
+    @override_settings(ADS_MAX_ACTIVE_PER_USER=2)
+    def test_active_ads_quota(self):
+        """Квота активных объявлений проверяется по статистике"""
+        create_ad(self.alice, 'Книга')
+        with self.assertRaises(ValidationError):
+            create_ad(self.alice, 'Лампа')
+        self.assertEqual(self.stats(self.alice).ads_count, 2)
+
+    def test_api_reads_stats(self):
+        """Список пользователей API не выполняет COUNT по объявлениям"""
+        url = reverse('api:users:user-list')
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        ads_counts = {
+            user['username']: user['ads_count']
+            for user in response.data['results']
+        }
+        self.assertEqual(ads_counts, {'alice': 1, 'bob': 1})
+
+    def test_navbar_badge(self):
+        """Бейдж ожидающих предложений в навигации"""
+        self.client.force_login(self.alice)
+        response = self.client.get(reverse('ads_list'))
+        self.assertContains(
+            response, 'bg-warning text-dark" title="Awaiting response">1<'
+        )
+
+    def test_rebuild_command(self):
+        """Команда пересчета исправляет расхождения"""
+        UserStats.objects.filter(user=self.alice).update(ads_count=10)
+        UserStats.objects.filter(user=self.bob).delete()
+
+        out = StringIO()
+        call_command('rebuild_user_stats', stdout=out)
+        self.assertIn('fixed 2', out.getvalue())
+        self.assertEqual(self.stats(self.alice).ads_count, 1)
+        self.assertEqual(self.stats(self.bob).pending_sent, 1)
+        self.assertEqual(UserStatsService.recompute([self.alice.id]), 0)
@@ -32,6 +32,7 @@ DJANGO_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'django_extensions',
 ]
 
@@ -43,6 +44,7 @@ THIRD_PARTY_APPS = [
 ]
 
 LOCAL_APPS = [
+    'apps.core.apps.CoreConfig',
     'apps.users.apps.UsersConfig',
     'apps.ads.apps.AdsConfig',
 ]
@@ -58,13 +60,20 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # JSON на orjson и MessagePack для мобильных клиентов (api/renderers.py),
+    # формат выбирается по заголовку Accept
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'api.renderers.ORJSONRenderer',
+        'api.renderers.MessagePackRenderer',
         'rest_framework.renderers.BrowsableAPIRenderer',
     ],
-    'DEFAULT_PAGINATION_CLASS': (
-        'rest_framework.pagination.PageNumberPagination'
-    ),
+    'DEFAULT_PARSER_CLASSES': [
+        'api.renderers.ORJSONParser',
+        'api.renderers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -75,6 +84,9 @@ REST_FRAMEWORK = {
 }
 
 # Настройки для drf-spectacular
+# Заранее сгенерированная схема OpenAPI (manage.py generate_api_schema)
+API_SCHEMA_ROOT = os.getenv('API_SCHEMA_ROOT', str(BASE_DIR / 'schema'))
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Barter Platform API',
     'DESCRIPTION': 'API для платформы обмена товарами',
@@ -97,6 +109,10 @@ SPECTACULAR_SETTINGS = {
         {
             'name': 'Пользователи',
             'description': 'Управление профилями пользователей'
+        },
+        {
+            'name': 'Пакетные запросы',
+            'description': 'Несколько запросов к API за один HTTP запрос'
         }
     ],
     'COMPONENT_SPLIT_REQUEST': True,
@@ -119,6 +135,7 @@ SPECTACULAR_SETTINGS = {
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'apps.core.middleware.CacheInvalidationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -126,6 +143,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'apps.ads.middleware.SurrogatePurgeMiddleware',
+    'apps.ads.middleware.IdentityMapMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -142,6 +161,7 @@ TEMPLATES = [
                 'django.template.context_processors.i18n',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'apps.users.context_processors.user_stats',
             ],
         },
     },
@@ -191,6 +211,67 @@ LANGUAGES = [
     ('en', 'English'),
 ]
 
+# Конфигурации полнотекстового поиска PostgreSQL для языков из LANGUAGES
+ADS_SEARCH_CONFIGS = {
+    'ru': 'russian',
+    'en': 'english',
+}
+
+# Подсчет количества объявлений в списках (см. apps/ads/counting.py):
+# exact - COUNT(*), cached - COUNT(*) с кэшированием до изменения данных,
+# estimated - оценка планировщика PostgreSQL для больших выборок
+ADS_COUNT_STRATEGY = os.getenv('ADS_COUNT_STRATEGY', 'cached')
+ADS_COUNT_CACHE_TIMEOUT = 60 * 10
+ADS_COUNT_ESTIMATE_THRESHOLD = 10000
+
+# Время хранения закэшированных представлений объектов в списках API
+# (api/fragments.py); изменение объекта меняет ключ раньше
+API_FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Обратный прокси перед сайтом (apps/ads/surrogate.py): срок хранения
+# ответов анонимам на прокси и очистка по тегам Surrogate-Key
+SURROGATE_CACHE_MAX_AGE = int(os.getenv('SURROGATE_CACHE_MAX_AGE', '300'))
+SURROGATE_PURGE_BACKEND = 'apps.ads.surrogate.HttpPurgeBackend'
+SURROGATE_PURGE_URL = os.getenv('SURROGATE_PURGE_URL', '')
+SURROGATE_PURGE_HEADERS = {}
+SURROGATE_PURGE_TIMEOUT = 5
+SURROGATE_PURGE_BATCH_SIZE = 256
+# Отправка очистки фоновым потоком, не задерживая ответ
+SURROGATE_PURGE_ASYNC = True
+
+# Кэш результатов запросов Ad.objects.cached() (apps/ads/querycache.py):
+# время хранения и размер результата в pickle, с которого он сжимается
+ADS_QUERY_CACHE_TIMEOUT = 60 * 5
+ADS_QUERY_CACHE_COMPRESS_MIN_SIZE = 1024
+
+# Размер снимков первых страниц списка объявлений (AdListSnapshot):
+# больше ADS_PER_PAGE из apps/ads/views.py, чтобы знать о следующей
+# странице
+ADS_LIST_SNAPSHOT_SIZE = 11
+
+# Время хранения фрагментов шаблонов списков объявлений ({% cache %})
+ADS_TEMPLATE_FRAGMENT_TIMEOUT = 60 * 60
+
+# Кэш страниц списка объявлений для анонимов (apps/ads/pagecache.py):
+# время, когда страница свежая, затем сколько она еще отдается устаревшей
+# во время пересчета, время жизни блокировки пересчета и сколько запрос
+# без записи ждет страницу, которую строит владелец блокировки
+ADS_PAGE_CACHE_TIMEOUT = 60
+ADS_PAGE_CACHE_STALE_TIMEOUT = 60 * 5
+ADS_PAGE_CACHE_LOCK_TIMEOUT = 30
+ADS_PAGE_CACHE_LOCK_WAIT = 0.5
+
+# Количество шардов счетчиков предложений на объявление (AdProposalCounter)
+ADS_PROPOSAL_COUNTER_SHARDS = 8
+
+# Максимум активных объявлений на пользователя (0 - без ограничения)
+ADS_MAX_ACTIVE_PER_USER = int(os.getenv('ADS_MAX_ACTIVE_PER_USER', '50'))
+
+# Пакетный API /api/batch/: подзапросов в пакете и потоков для
+# параллельного чтения (общий пул на процесс, 1 - без потоков)
+API_BATCH_MAX_REQUESTS = 20
+API_BATCH_MAX_WORKERS = int(os.getenv('API_BATCH_MAX_WORKERS', '4'))
+
 TIME_ZONE = 'Europe/Moscow'
 
 USE_I18N = True
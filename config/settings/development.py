@@ -93,7 +93,8 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
 # Для тестирования API в разработке - более подробные ошибки
 REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = [
-    'rest_framework.renderers.JSONRenderer',
+    'api.renderers.ORJSONRenderer',
+    'api.renderers.MessagePackRenderer',
     'rest_framework.renderers.BrowsableAPIRenderer',
 ]
 
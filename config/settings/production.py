@@ -0,0 +1,76 @@
+"""
+Настройки для продакшен окружения.
+"""
+
+import os
+
+from .base import *
+
+DEBUG = False
+
+ALLOWED_HOSTS = [
+    host.strip()
+    for host in os.getenv('ALLOWED_HOSTS', '').split(',')
+    if host.strip()
+]
+
+# Переиспользуем соединения с базой данных между запросами
+DATABASES['default']['CONN_MAX_AGE'] = int(os.getenv('DB_CONN_MAX_AGE', '60'))
+
+# Двухуровневый кэш (apps/core/cache.py): LRU в памяти воркера перед
+# общей таблицей кэша в базе данных (python manage.py createcachetable);
+# изменения ключей рассылаются воркерам через шину инвалидации
+CACHES = {
+    'default': {
+        'BACKEND': 'apps.core.cache.TwoTierCache',
+        'LOCATION': 'default',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_MAX_ENTRIES': int(
+                os.getenv('CACHE_LOCAL_MAX_ENTRIES', '5000')
+            ),
+            'LOCAL_TIMEOUT': 30,
+            'POLL_INTERVAL': 1,
+        },
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    },
+}
+
+# Без Browsable API: только JSON (orjson) и MessagePack
+REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = [
+    'api.renderers.ORJSONRenderer',
+    'api.renderers.MessagePackRenderer',
+]
+
+# Безопасность
+SESSION_COOKIE_SECURE = True
+CSRF_COOKIE_SECURE = True
+SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
+
+# Логирование в консоль (собирается окружением запуска)
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'WARNING')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': LOGGING_FORMATTERS,
+    'handlers': {
+        'console': {
+            'level': LOG_LEVEL,
+            'class': 'logging.StreamHandler',
+            'formatter': 'verbose',
+        },
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': LOG_LEVEL,
+    },
+}
@@ -42,6 +42,29 @@ class DisableMigrations:
 
 MIGRATION_MODULES = DisableMigrations()
 
+# INCLUDE покрывающих индексов поддерживает только PostgreSQL,
+# в SQLite такие индексы создаются без неключевых колонок
+SILENCED_SYSTEM_CHECKS = ['models.W040']
+
+# Подзапросы пакетного API в потоке теста: соединения других потоков
+# не видят данные незавершенной транзакции TestCase
+API_BATCH_MAX_WORKERS = 1
+
+# Очистка кэша прокси без HTTP и фонового потока
+# (apps.ads.surrogate.outbox)
+SURROGATE_PURGE_BACKEND = 'apps.ads.surrogate.LocmemPurgeBackend'
+SURROGATE_PURGE_ASYNC = False
+
+# Кэш страниц для анонимов отключен: версии категорий увеличиваются
+# после фиксации транзакции, которой в TestCase нет (тесты кэша
+# включают его через override_settings)
+ADS_PAGE_CACHE_TIMEOUT = 0
+ADS_PAGE_CACHE_STALE_TIMEOUT = 0
+
+# Кэш результатов запросов отключен по той же причине: версии в кэше
+# не откатываются вместе с транзакцией теста
+ADS_QUERY_CACHE_TIMEOUT = 0
+
 # Простое кэширование в памяти
 CACHES = {
     'default': {
@@ -102,7 +125,8 @@ LOGGING = {
 REST_FRAMEWORK_TEST = REST_FRAMEWORK.copy()
 REST_FRAMEWORK_TEST.update({
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'api.renderers.ORJSONRenderer',
+        'api.renderers.MessagePackRenderer',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',